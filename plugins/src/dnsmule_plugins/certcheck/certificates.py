@@ -116,15 +116,19 @@ def massage_certificate_stdlib(certificate):
         }
 
 
+def fetch_certificate_stdlib(address: Address, timeout: float):
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    with socket.socket(address.family, socket.SOCK_STREAM) as raw_socket:
+        raw_socket.settimeout(timeout)
+        with ctx.wrap_socket(raw_socket, do_handshake_on_connect=True) as s:
+            s.connect(address.tuple)
+            return massage_certificate_stdlib(s.getpeercert(binary_form=False))
+
+
 def collect_certificate_stdlib(address: Address, timeout: float):
     try:
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        with socket.socket(address.family, socket.SOCK_STREAM) as raw_socket:
-            raw_socket.settimeout(timeout)
-            with ctx.wrap_socket(raw_socket, do_handshake_on_connect=True) as s:
-                s.connect(address.tuple)
-                return massage_certificate_stdlib(s.getpeercert(binary_form=False))
+        return fetch_certificate_stdlib(address, timeout)
     except Exception as e:
         getLogger(LOGGER).debug(
             'CERTS-STDLIB: Failed to get cert for %s:%s (%s)',
@@ -138,6 +142,13 @@ def collect_certificate(
         timeout: float = 1.,
         prefer_stdlib: bool = True,
 ) -> Optional[Certificate]:
+    """
+    Collects a certificate with a single handshake
+
+    With stdlib preferred the cryptography handshake is only attempted
+    if the stdlib handshake failed to verify the certificate.
+    Unreachable addresses are not tried twice.
+    """
     try:
         import cryptography
         use_crypto = True
@@ -145,7 +156,21 @@ def collect_certificate(
         use_crypto = False
     cert = None
     if prefer_stdlib:
-        cert = collect_certificate_stdlib(address, timeout)
+        try:
+            cert = fetch_certificate_stdlib(address, timeout)
+        except ssl.SSLCertVerificationError as e:
+            getLogger(LOGGER).debug(
+                'CERTS-STDLIB: Failed to verify cert for %s:%s (%s)',
+                *address.tuple[0:2],
+                repr(e),
+            )
+        except Exception as e:
+            getLogger(LOGGER).debug(
+                'CERTS-STDLIB: Failed to get cert for %s:%s (%s)',
+                *address.tuple[0:2],
+                repr(e),
+            )
+            return None
     if not cert and use_crypto:
         cert = collect_certificate_cryptography(address, timeout)
     return Certificate(**cert) if cert else None
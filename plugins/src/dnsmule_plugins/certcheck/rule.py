@@ -1,35 +1,190 @@
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, wait
+from logging import getLogger
+from time import time, monotonic
+from typing import List, Optional, Tuple, Iterable, Union
 
-from dnsmule import Result, Record
-from dnsmule.utils import extend_set
+from dnsmule import Result, Record, Domain, Storage
+from dnsmule.utils import extend_set, LRUCache
 from . import certificates
 from .adapter import load_result, save_result
+from .certificates import LOGGER
 
 
 class CertChecker:
+    """
+    Collects certificates from the ports of resolved addresses
+
+    Ports are scanned concurrently in a thread pool shared by all records while the rule is entered.
+    The pool size limits the number of connections open at any time.
+    All records of a domain share one deadline. Connections are given at most the time left until the deadline,
+    ports not yet connected to are skipped after it. Skipped ports and failures of connections
+    cut short by the deadline are not cached.
+
+    Collected certificates are cached by address, port and collection mode.
+    Failures are cached for a shorter time.
+    The cache can be persisted in a storage of its own as results named ``certcheck://address:port/mode``,
+    keeping the entries apart from the scanned domains. The storage is entered with the rule,
+    so with ``scan_parallel`` every worker opens it and it should be shared like ``sqlite`` or ``redis``.
+
+    Can be configured with::
+
+        ports     <list>  Ports to scan (default: 443, 8443)
+        timeout   <float> Socket timeout for a single connection
+        stdlib    <bool>  Prefer the stdlib implementation
+        workers   <int>   Maximum concurrent connections (default: 16)
+        deadline  <float> Maximum seconds spent on a single domain (default: twice the timeout)
+        cache_size    <int>   Maximum number of cached ports (default: 10000)
+        cache_ttl     <float> Seconds to cache certificates (default: 86400)
+        negative_ttl  <float> Seconds to cache failures (default: 3600)
+        storage       <dict>  Storage configuration to persist the cache in (optional)
+    """
     type = 'ip.certs'
 
+    context: dict
+
     def __init__(
             self,
             ports: List[int] = None,
             timeout: float = 1,
             stdlib: bool = False,
+            workers: int = 16,
+            deadline: Optional[float] = None,
+            cache_size: int = 10000,
+            cache_ttl: float = 86400,
+            negative_ttl: float = 3600,
+            storage: Union[Storage, dict] = None,
     ):
         self.ports = [443, 8443] if ports is None else ports
         self.timeout = timeout
         self.stdlib = stdlib
+        self.workers = workers
+        self.deadline = 2 * timeout if deadline is None else deadline
+        self.cache_ttl = cache_ttl
+        self.negative_ttl = negative_ttl
+        if isinstance(storage, dict):
+            from dnsmule import storages
+            from dnsmule.loader import instantiate_wrapper_from_config
+            storage = instantiate_wrapper_from_config(storages, key='storage', config=storage)
+        self.storage: Optional[Storage] = storage
+        self._cache: LRUCache[Tuple[str, int, str], List[certificates.Certificate]] = LRUCache(
+            max_entries=cache_size,
+        )
+        self._current: Optional[Tuple[Result, float]] = None
+
+    def __enter__(self):
+        if self.storage is not None:
+            self.storage.__enter__()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._executor.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        del self._executor
+        self._current = None
+        if self.storage is not None:
+            self.storage.__exit__(exc_type, exc_val, exc_tb)
+
+    def _collect(self, address: str, port: int, deadline: float) -> Optional[List[certificates.Certificate]]:
+        """
+        Collects certificates from a port
+
+        Returns None if the deadline has passed, or if the collection failed
+        without the full timeout as the failure is then not cached.
+        """
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return None
+        certs = certificates.collect_certificates(
+            address,
+            port=port,
+            timeout=min(self.timeout, remaining),
+            prefer_stdlib=self.stdlib,
+        )
+        if not certs and remaining < self.timeout:
+            return None
+        return certs
+
+    @property
+    def mode(self) -> str:
+        return 'stdlib' if self.stdlib else 'cryptography'
+
+    def _deadline(self, result: Result) -> float:
+        """Deadline shared by the records of a domain, which are processed one after another
+        """
+        if self._current is None or self._current[0] is not result:
+            self._current = (result, monotonic() + self.deadline)
+        return self._current[1]
+
+    def _collect_ports(
+            self,
+            address: str,
+            ports: List[int],
+            deadline: float,
+    ) -> Iterable[Tuple[int, List[certificates.Certificate]]]:
+        if not hasattr(self, '_executor'):
+            collected = [(port, self._collect(address, port, deadline)) for port in ports]
+        else:
+            tasks = {self._executor.submit(self._collect, address, port, deadline): port for port in ports}
+            done, not_done = wait(tasks, timeout=max(deadline - monotonic(), 0))
+            for task in not_done:
+                task.cancel()
+            collected = [(tasks[task], task.result()) for task in done]
+        skipped = len(ports) - sum(certs is not None for _, certs in collected)
+        if skipped:
+            getLogger(LOGGER).debug('CERTS: Deadline exceeded for %s (%d ports)', address, skipped)
+        for port, certs in collected:
+            if certs is not None:
+                yield port, certs
+
+    @staticmethod
+    def _storage_name(key: Tuple[str, int, str]) -> Domain:
+        address, port, mode = key
+        return Domain(f'certcheck://{address}:{port}/{mode}')
+
+    def _load(self, key: Tuple[str, int, str]) -> Optional[List[certificates.Certificate]]:
+        stored = self.storage.fetch(self._storage_name(key))
+        if stored is not None and stored.data.get('expires', 0) > time():
+            certs = [certificates.Certificate.from_json(o) for o in stored.data['certificates']]
+            self._cache.set(key, certs, ttl=stored.data['expires'] - time())
+            return certs
+
+    def _save(self, key: Tuple[str, int, str], certs: List[certificates.Certificate], ttl: float):
+        self.storage.store(Result(
+            name=self._storage_name(key),
+            data={
+                'certificates': [cert.to_json() for cert in certs],
+                'expires': time() + ttl,
+            },
+        ))
+
+    def _lookup(self, key: Tuple[str, int, str]) -> Optional[List[certificates.Certificate]]:
+        certs = self._cache.get(key)
+        if certs is None and self.storage is not None:
+            certs = self._load(key)
+        return certs
+
+    def _remember(self, key: Tuple[str, int, str], certs: List[certificates.Certificate]):
+        ttl = self.cache_ttl if certs else self.negative_ttl
+        if ttl > 0:
+            self._cache.set(key, [*certs], ttl=ttl)
+            if self.storage is not None:
+                self._save(key, certs, ttl)
+
+    def _collect_all(self, address: str, deadline: float) -> Iterable[certificates.Certificate]:
+        missing = []
+        for port in self.ports:
+            certs = self._lookup((address, port, self.mode))
+            if certs is None:
+                missing.append(port)
+            else:
+                yield from certs
+        for port, certs in self._collect_ports(address, missing, deadline):
+            self._remember((address, port, self.mode), certs)
+            yield from certs
 
     def __call__(self, record: Record, result: Result):
-        certs = {
-            cert
-            for port in self.ports
-            for cert in certificates.collect_certificates(
-                record.text,
-                port=port,
-                timeout=self.timeout,
-                prefer_stdlib=self.stdlib,
-            )
-        }
+        certs = {*self._collect_all(record.text, self._deadline(result))}
         if certs:
             load_result(result)
             extend_set(result.data, 'resolvedCertificates', *certs)
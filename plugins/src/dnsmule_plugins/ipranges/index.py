@@ -0,0 +1,73 @@
+from bisect import bisect_right
+from collections import Counter
+from ipaddress import ip_address
+from typing import Iterable, Tuple, List, Dict
+
+
+class IpRangeIndex:
+    """
+    Sorted interval index of tagged address ranges
+
+    The ranges of each IP version are split into non-overlapping intervals at every range boundary.
+    Each interval stores the tags of all ranges covering it, so a lookup is a binary search
+    over the interval starts.
+    """
+    _starts: Dict[int, List[int]]
+    _tags: Dict[int, List[Tuple[str, ...]]]
+
+    def __init__(self, ranges: Iterable[Tuple[str, object]]):
+        """
+        :param ranges: Pairs of tag and ``IPv4Network`` or ``IPv6Network``
+        """
+        events: Dict[int, List[Tuple[int, int, str]]] = {4: [], 6: []}
+        for tag, network in ranges:
+            events[network.version].append((int(network.network_address), 1, tag))
+            events[network.version].append((int(network.broadcast_address) + 1, -1, tag))
+        self._starts = {}
+        self._tags = {}
+        for version, version_events in events.items():
+            self._starts[version], self._tags[version] = self._build(version_events)
+
+    @staticmethod
+    def _build(events: List[Tuple[int, int, str]]) -> Tuple[List[int], List[Tuple[str, ...]]]:
+        events.sort()
+        starts = []
+        tags = []
+        active = Counter()
+        i = 0
+        while i < len(events):
+            position = events[i][0]
+            while i < len(events) and events[i][0] == position:
+                _, change, tag = events[i]
+                active[tag] += change
+                if not active[tag]:
+                    del active[tag]
+                i += 1
+            starts.append(position)
+            tags.append((*sorted(active),))
+        return starts, tags
+
+    def lookup(self, address: str) -> Tuple[str, ...]:
+        """
+        Finds the tags of all ranges containing the address
+
+        :param address: IPv4 or IPv6 address
+        :return:        Tags or an empty tuple if the address is invalid or not in any range
+        """
+        try:
+            address = ip_address(address)
+        except ValueError:
+            return ()
+        starts = self._starts[address.version]
+        i = bisect_right(starts, int(address)) - 1
+        if i < 0:
+            return ()
+        return self._tags[address.version][i]
+
+    def __len__(self):
+        return sum(len(starts) for starts in self._starts.values())
+
+
+__all__ = [
+    'IpRangeIndex',
+]
@@ -6,6 +6,7 @@ from logging import getLogger
 from typing import List, Optional, Dict, cast
 
 from dnsmule import Record, Result
+from .index import IpRangeIndex
 from .iprange import IPvXRange
 from .providers import Providers
 
@@ -17,6 +18,7 @@ class IpRangeChecker:
 
     _provider_ranges: Dict[str, List[IPvXRange]]
     _last_fetch: Optional[datetime.datetime] = None
+    _index: Optional[IpRangeIndex] = None
 
     def __init__(
             self,
@@ -49,6 +51,7 @@ class IpRangeChecker:
                         provider: [IPvXRange.create(**item) for item in items]
                         for provider, items in data['items'].items()
                     }
+                    self._index = None
             except (FileNotFoundError, json.JSONDecodeError):
                 """Ignored
                 """
@@ -59,6 +62,17 @@ class IpRangeChecker:
 
     def fetch_provider(self, provider: str):
         self._provider_ranges[provider] = Providers.fetch(provider)
+        self._index = None
+
+    def build_index(self) -> IpRangeIndex:
+        return IpRangeIndex(
+            (
+                f'IP::RANGES::{p_range.service.upper()}::{p_range.region.upper()}',
+                p_range.address,
+            )
+            for p_ranges in self._provider_ranges.values()
+            for p_range in p_ranges
+        )
 
     def fetch_ranges(self):
         tasks = []
@@ -101,15 +115,9 @@ class IpRangeChecker:
 
     def __call__(self, record: Record, result: Result):
         self.check_fetch()
-        address: str = record.text
-        for provider, p_ranges in self._provider_ranges.items():
-            for p_range in p_ranges:
-                if address in p_range:
-                    result.tags.add(
-                        f'IP::RANGES'
-                        f'::{p_range.service.upper()}'
-                        f'::{p_range.region.upper()}'
-                    )
+        if self._index is None:
+            self._index = self.build_index()
+        result.tags.update(self._index.lookup(record.text))
 
 
 __all__ = [
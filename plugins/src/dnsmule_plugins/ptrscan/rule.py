@@ -1,14 +1,58 @@
 import ipaddress
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
 from dnsmule import Record, RRType, Domain, Result
-from dnsmule.utils import extend_set
+from dnsmule.utils import extend_set, LRUCache
 
 
 class PTRScan:
+    """
+    Scans addresses for pointer records
+
+    Resolved pointers are cached by address, addresses without pointers for a shorter time.
+    Failed lookups are not cached if the backend tells them apart from empty answers.
+    In multi-domain scans the addresses of a whole chunk of domains are resolved
+    before the records are processed, concurrently if there is more than one worker.
+
+    Can be configured with::
+
+        cache_size    <int>   Maximum number of cached addresses (default: 10000)
+        cache_ttl     <float> Maximum seconds to cache pointers (default: 3600)
+        negative_ttl  <float> Seconds to cache addresses without pointers (default: 300)
+        workers       <int>   Maximum concurrent lookups when prefetching (default: 1)
+                              Usually the concurrency of the scan, one resolves the addresses in turn
+
+    **Note:** Prefetching with multiple workers queries the backend concurrently
+    """
     type = 'ip.ptr'
 
     context: dict
 
+    def __init__(
+            self,
+            *,
+            cache_size: int = 10000,
+            cache_ttl: float = 3600,
+            negative_ttl: float = 300,
+            workers: int = 1,
+    ):
+        self.cache_ttl = cache_ttl
+        self.negative_ttl = negative_ttl
+        self.workers = workers
+        self._cache: LRUCache[str, List[Record]] = LRUCache(max_entries=cache_size)
+
+    def __enter__(self):
+        if self.workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            self._executor.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if hasattr(self, '_executor'):
+            self._executor.__exit__(exc_type, exc_val, exc_tb)
+            del self._executor
+
     @staticmethod
     def reverse_query(ip: str) -> Domain:
         return Domain(ipaddress.ip_address(ip).reverse_pointer)
@@ -17,22 +61,52 @@ class PTRScan:
     def mule(self):
         return self.context['mule']
 
+    def _ttl(self, ptrs: List[Record]) -> float:
+        if ptrs:
+            return min([self.cache_ttl, *(ptr.ttl for ptr in ptrs if ptr.ttl is not None)])
+        else:
+            return self.negative_ttl
+
+    def lookup(self, address: str) -> List[Record]:
+        ptrs: Optional[List[Record]] = self._cache.get(address)
+        if ptrs is None:
+            ptrs = self.mule.backend.scan_by_type(
+                self.reverse_query(address),
+                RRType.PTR,
+            )[RRType.PTR]
+            if ptrs is None:
+                return []
+            ttl = self._ttl(ptrs)
+            if ttl > 0:
+                self._cache.set(address, ptrs, ttl=ttl)
+        return ptrs
+
+    def _prefetch_one(self, address: str):
+        try:
+            self.lookup(address)
+        except ValueError:
+            """Invalid addresses are reported when processed
+            """
+
+    def prefetch(self, records: List[Record]):
+        addresses = {record.text for record in records}
+        if hasattr(self, '_executor') and len(addresses) > 1:
+            for _ in self._executor.map(self._prefetch_one, addresses):
+                pass
+        else:
+            for address in addresses:
+                self._prefetch_one(address)
+
     def __call__(self, record: Record, result: Result):
         address = record.text
-        ptr_patterns = [
-            '-'.join(reversed(address.split('.'))),
-            '.'.join(reversed(address.split('.'))),
-            address,
-            '-'.join(address.split('.')),
-        ]
-        ptrs = [
-            ptr.text
-            for ptr in self.mule.backend.scan(
-                self.reverse_query(record.text),
-                RRType.PTR,
-            )
-        ]
+        ptrs = [ptr.text for ptr in self.lookup(address)]
         if ptrs:
+            ptr_patterns = [
+                '-'.join(reversed(address.split('.'))),
+                '.'.join(reversed(address.split('.'))),
+                address,
+                '-'.join(address.split('.')),
+            ]
             for ptr in ptrs:
                 for pattern in ptr_patterns:
                     if pattern in ptr:
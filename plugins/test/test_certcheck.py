@@ -1,8 +1,10 @@
 import datetime
+import threading
+import time
 
 import pytest
 
-from dnsmule import Result, Domain
+from dnsmule import Result, Domain, DictStorage, Record, RRType
 from dnsmule_plugins.certcheck import rule
 from dnsmule_plugins.certcheck.certificates import Certificate
 
@@ -37,8 +39,6 @@ def test_call_adds_key(mock_collection, record, result):
 
 def test_call_add_certs(mock_collection, record, result):
     check = rule.CertChecker(ports=[443])
-    record.existing = Result(Domain(''))
-
     cert1 = Certificate(
         version='v3',
         common='d.com',
@@ -57,7 +57,6 @@ def test_call_add_certs(mock_collection, record, result):
         issuer='',
     )
 
-    record.existing.data['resolvedCertificates'] = [cert1.to_json()]
     mock_collection.append(cert2)
     mock_collection.append(cert1)
 
@@ -73,3 +72,147 @@ def test_call_add_certs(mock_collection, record, result):
     check(record, result)
 
     assert len(result.data['resolvedCertificates']) == 2, 'Failed to remove duplicates'
+
+
+def test_call_collects_ports_concurrently(monkeypatch, record, result):
+    barrier = threading.Barrier(3, timeout=1)
+
+    def collect(*_, **__):
+        barrier.wait()
+        return []
+
+    monkeypatch.setattr(rule.certificates, 'collect_certificates', collect)
+    with rule.CertChecker(ports=[1, 2, 3], workers=3) as check:
+        check(record, result)
+
+    assert not barrier.broken, 'Did not collect concurrently'
+
+
+def test_call_skips_certificates_after_deadline(monkeypatch, record, result):
+    release = threading.Event()
+
+    def collect(_, port, **__):
+        if port == 2:
+            release.wait(1)
+        return [Certificate(
+            version='v3',
+            common=f'{port}.com',
+            alts=[],
+            valid_from=datetime.datetime.now(),
+            valid_until=datetime.datetime.now(),
+            issuer='',
+        )]
+
+    monkeypatch.setattr(rule.certificates, 'collect_certificates', collect)
+    with rule.CertChecker(ports=[1, 2], deadline=.1) as check:
+        start = time.perf_counter()
+        check(record, result)
+        elapsed = time.perf_counter() - start
+        release.set()
+
+    assert elapsed < .5, 'Did not respect deadline'
+    assert [cert['common'] for cert in result.data['resolvedCertificates']] == ['1.com']
+
+
+def test_call_shares_deadline_between_records_of_a_domain(monkeypatch, result):
+    release = threading.Event()
+    calls = []
+
+    def collect(address, port, timeout, **__):
+        calls.append((address, port, timeout))
+        release.wait(1)
+        return []
+
+    monkeypatch.setattr(rule.certificates, 'collect_certificates', collect)
+    with rule.CertChecker(ports=[443], timeout=5, deadline=.1) as check:
+        check(Record(result.name, RRType.A, '127.0.0.1'), result)
+        check(Record(result.name, RRType.A, '127.0.0.2'), result)
+        release.set()
+
+    assert [address for address, _, _ in calls] == ['127.0.0.1'], 'Did not skip records after domain deadline'
+    assert calls[0][2] <= .1, 'Did not limit timeout to deadline'
+    assert check._cache.get(('127.0.0.2', 443, check.mode)) is None, 'Cached skipped port'
+
+
+def test_call_does_not_cache_failures_cut_short_by_deadline(monkeypatch, record, result):
+    timeouts = []
+
+    def collect(_, port, timeout, **__):
+        timeouts.append(timeout)
+        return []
+
+    monkeypatch.setattr(rule.certificates, 'collect_certificates', collect)
+    check = rule.CertChecker(ports=[443], timeout=5, deadline=1)
+    check(record, result)
+    assert timeouts[0] < 5
+    assert check._cache.get((record.text, 443, check.mode)) is None, 'Cached failure without full timeout'
+
+    check = rule.CertChecker(ports=[443], timeout=1, deadline=5)
+    check(record, Result(record.name))
+    assert check._cache.get((record.text, 443, check.mode)) == [], 'Did not cache failure with full timeout'
+
+
+@pytest.fixture
+def counting_collection(monkeypatch):
+    calls = []
+
+    def collect(address, port, **__):
+        calls.append((address, port))
+        if port == 443:
+            return [Certificate(
+                version='v3',
+                common='a.com',
+                alts=[],
+                valid_from=datetime.datetime.now(),
+                valid_until=datetime.datetime.now(),
+                issuer='',
+            )]
+        return []
+
+    monkeypatch.setattr(rule.certificates, 'collect_certificates', collect)
+    yield calls
+
+
+def test_call_caches_certificates_by_port(counting_collection, record, result):
+    check = rule.CertChecker(ports=[443, 8443])
+    check(record, result)
+    check(record, result)
+
+    assert len(counting_collection) == 2, 'Did not cache collected ports'
+    assert len(result.data['resolvedCertificates']) == 1
+
+
+def test_call_expires_failures_first(counting_collection, monkeypatch, record, result):
+    now = [1000.]
+    from dnsmule import utils
+    monkeypatch.setattr(utils, 'time', lambda: now[0])
+
+    check = rule.CertChecker(ports=[443, 8443], cache_ttl=100, negative_ttl=10)
+    check(record, result)
+    now[0] += 11
+    check(record, result)
+
+    assert counting_collection[2:] == [(record.text, 8443)], 'Did not expire failure'
+
+
+def test_call_persists_cache_in_own_storage(counting_collection, record, result):
+    storage = DictStorage()
+
+    check = rule.CertChecker(ports=[443, 8443], storage=storage)
+    check.context = {'storage': DictStorage()}
+    check(record, result)
+
+    other = rule.CertChecker(ports=[443, 8443], storage=storage)
+    other_result = Result(Domain('example.com'))
+    other(record, other_result)
+
+    assert len(counting_collection) == 2, 'Did not load persisted cache'
+    assert other_result.data['resolvedCertificates'] == result.data['resolvedCertificates']
+    name = check._storage_name((record.text, 443, check.mode))
+    assert storage.fetch(name) is not None, 'Did not persist'
+    assert check.context['storage'].fetch(name) is None, 'Stored into scan storage'
+
+
+def test_storage_is_loaded_from_config():
+    check = rule.CertChecker(storage={'type': 'dict'})
+    assert isinstance(check.storage, DictStorage)
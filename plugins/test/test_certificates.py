@@ -223,3 +223,35 @@ def test_collect_raising_gets_empty(monkeypatch):
         certs = certificates.collect_certificates(*EXAMPLE_ADDRESS.tuple)
 
     assert len(certs) == 0, 'Failed to pass exceptions'
+
+
+def test_collect_does_not_retry_unreachable(monkeypatch):
+    calls = []
+
+    def unreachable(*_, **__):
+        calls.append('stdlib')
+        raise socket.timeout()
+
+    with monkeypatch.context() as m:
+        m.setattr(certificates, 'fetch_certificate_stdlib', unreachable)
+        m.setattr(certificates, 'collect_certificate_cryptography', lambda *_: calls.append('cryptography'))
+        cert = certificates.collect_certificate(EXAMPLE_ADDRESS, prefer_stdlib=True)
+
+    assert cert is None
+    assert calls == ['stdlib'], 'Retried unreachable address'
+
+
+def test_collect_falls_back_on_verification_failure(monkeypatch):
+    calls = []
+
+    def unverified(*_, **__):
+        calls.append('stdlib')
+        raise ssl.SSLCertVerificationError()
+
+    with monkeypatch.context() as m:
+        m.setitem(sys.modules, 'cryptography', SimpleNamespace())
+        m.setattr(certificates, 'fetch_certificate_stdlib', unverified)
+        m.setattr(certificates, 'collect_certificate_cryptography', lambda *_: calls.append('cryptography'))
+        certificates.collect_certificate(EXAMPLE_ADDRESS, prefer_stdlib=True)
+
+    assert calls == ['stdlib', 'cryptography'], 'Did not fall back'
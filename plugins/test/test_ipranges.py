@@ -1,9 +1,11 @@
 import datetime
-from ipaddress import IPv4Network
+from ipaddress import IPv4Network, IPv6Network, IPv4Address
+from random import Random
 from time import sleep
 
 import pytest
 
+from dnsmule_plugins.ipranges.index import IpRangeIndex
 from dnsmule_plugins.ipranges.iprange import IPvXRange
 from dnsmule_plugins.ipranges.rule import IpRangeChecker
 
@@ -97,3 +99,59 @@ def test_fetcher_for_provider(monkeypatch):
         checker = IpRangeChecker(providers=['mock'])
         checker.fetch_provider('mock')
         assert checker._provider_ranges['mock'] is sentinel, 'Failed to get provider from package or failed to call'
+
+
+def test_index_returns_all_nested_ranges():
+    index = IpRangeIndex([
+        ('outer', IPv4Network('10.0.0.0/8')),
+        ('inner', IPv4Network('10.1.0.0/16')),
+        ('other', IPv4Network('192.168.0.0/24')),
+    ])
+
+    assert index.lookup('10.1.2.3') == ('inner', 'outer')
+    assert index.lookup('10.200.0.1') == ('outer',)
+    assert index.lookup('10.1.255.255') == ('inner', 'outer'), 'Missed range end'
+    assert index.lookup('10.2.0.0') == ('outer',), 'Exceeded range end'
+    assert index.lookup('9.255.255.255') == (), 'Matched before range start'
+    assert index.lookup('192.168.0.255') == ('other',)
+    assert index.lookup('192.168.1.0') == ()
+
+
+def test_index_separates_ip_versions():
+    index = IpRangeIndex([
+        ('v4', IPv4Network('0.0.0.0/0')),
+        ('v6', IPv6Network('2001:db8::/32')),
+    ])
+
+    assert index.lookup('2001:db8::1') == ('v6',)
+    assert index.lookup('::1') == ()
+    assert index.lookup('1.2.3.4') == ('v4',)
+
+
+def test_index_ignores_invalid_addresses():
+    index = IpRangeIndex([('v4', IPv4Network('0.0.0.0/0'))])
+    assert index.lookup('example.com') == ()
+
+
+def test_index_matches_linear_scan():
+    random = Random(1)
+    ranges = [
+        IPvXRange.create(
+            address=f'{IPv4Address(random.getrandbits(32))}/{random.randint(8, 28)}',
+            service=f'service{i % 7}',
+            region=f'region{i % 3}',
+        )
+        for i in range(200)
+    ]
+    rule = IpRangeChecker(providers=[])
+    rule._provider_ranges['test'] = ranges
+    index = rule.build_index()
+
+    for _ in range(200):
+        address = str(IPv4Address(random.getrandbits(32)))
+        expected = {
+            f'IP::RANGES::{r.service.upper()}::{r.region.upper()}'
+            for r in ranges
+            if address in r
+        }
+        assert {*index.lookup(address)} == expected, 'Index differs from linear scan'
@@ -1,3 +1,5 @@
+import threading
+
 import pytest
 
 from dnsmule import DNSMule, Record, RRType, Domain, Rules
@@ -5,6 +7,14 @@ from dnsmule import DictStorage, DataBackend
 from dnsmule_plugins.ptrscan.rule import PTRScan
 
 
+def run_rule(mule, rule, record, result):
+    rule.context = mule.context
+    try:
+        rule(record, result)
+    finally:
+        del rule.context
+
+
 def test_init_no_backend():
     r = PTRScan()
     assert not hasattr(r, '_mule'), 'Had mule on create'
@@ -36,7 +46,7 @@ def test_with_mock_empty_result(record, result):
     rule = PTRScan()
     mule.rules.register(RRType.A, rule)
 
-    mule._run_rule(rule, record, result)
+    run_rule(mule, rule, record, result)
     assert len(result.tags) == 0, 'Identified empty'
     assert 'resolvedPointers' not in result.data, 'Added pointers'
 
@@ -61,7 +71,7 @@ def test_with_mock(record, result):
     rule = PTRScan()
     mule.rules.register(RRType.A, rule)
 
-    mule._run_rule(rule, record, result)
+    run_rule(mule, rule, record, result)
     assert len(result.tags) != 0, 'Failed to identify'
     assert result.tags.pop() == 'IP::PTR::PROVIDER.COM'
     assert result.data['resolvedPointers'] == ['127.0.0.1.provider.com']
@@ -93,7 +103,7 @@ def test_with_mock_no_dupes_and_ptr_appended(ptr, record, result):
     # Adds ptr
     result.data['resolvedPointers'] = ['sample-127.0.0.1.provider.com', 'sample-127.0.0.1.provider.com']
 
-    mule._run_rule(rule, record, result)
+    run_rule(mule, rule, record, result)
     assert len(result.data['resolvedPointers']) == 2, 'Failed to prevent or remove duplicate'
 
 
@@ -111,6 +121,110 @@ def test_with_mock_ptr_no_match(record, result):
     rule = PTRScan()
     mule.rules.register(RRType.A, rule)
 
-    mule._run_rule(rule, record, result)
+    run_rule(mule, rule, record, result)
     assert len(result.tags) == 0, 'Identified'
     assert result.data['resolvedPointers'] == ['aaaa'], 'Failed to add ptr'
+
+
+class CountingBackend(DataBackend):
+
+    def __init__(self):
+        super().__init__()
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def scan(self, domain, *types):
+        if RRType.PTR in types:
+            with self.lock:
+                self.queries.append(domain)
+            if domain == '1.0.0.127.in-addr.arpa':
+                yield Record(Domain(domain), RRType.PTR, '127-0-0-1.provider.com')
+        else:
+            yield Record(Domain(domain), RRType.A, '127.0.0.1')
+            yield Record(Domain(domain), RRType.A, '127.0.0.2')
+
+
+def test_caches_pointers_by_address(record, result):
+    mule = DNSMule(storage=DictStorage(), backend=CountingBackend(), rules=Rules())
+    rule = PTRScan()
+
+    run_rule(mule, rule, record, result)
+    run_rule(mule, rule, record, result)
+
+    assert mule.backend.queries == ['1.0.0.127.in-addr.arpa'], 'Did not cache pointers'
+
+
+def test_caches_missing_pointers(record, result):
+    mule = DNSMule(storage=DictStorage(), backend=CountingBackend(), rules=Rules())
+    rule = PTRScan(negative_ttl=0)
+    record.data = '127.0.0.2'
+
+    run_rule(mule, rule, record, result)
+    run_rule(mule, rule, record, result)
+    assert len(mule.backend.queries) == 2, 'Cached with zero ttl'
+
+    rule = PTRScan()
+    run_rule(mule, rule, record, result)
+    run_rule(mule, rule, record, result)
+    assert len(mule.backend.queries) == 3, 'Did not cache missing pointers'
+
+
+class FailingBackend(CountingBackend):
+
+    def scan_by_type(self, domain, *types):
+        with self.lock:
+            self.queries.append(domain)
+        return {type: None for type in types}
+
+
+def test_does_not_cache_failed_lookups(record, result):
+    mule = DNSMule(storage=DictStorage(), backend=FailingBackend(), rules=Rules())
+    rule = PTRScan()
+
+    run_rule(mule, rule, record, result)
+    run_rule(mule, rule, record, result)
+
+    assert len(mule.backend.queries) == 2, 'Cached failed lookup'
+    assert 'resolvedPointers' not in result.data
+
+
+def test_prefetches_addresses_in_scan_many():
+    mule = DNSMule(storage=DictStorage(), backend=CountingBackend(), rules=Rules())
+    rule = PTRScan()
+    mule.rules.register(RRType.A, rule)
+    looked_up = []
+
+    def prefetch(records):
+        looked_up.extend(record.text for record in records)
+        return PTRScan.prefetch(rule, records)
+
+    rule.prefetch = prefetch
+
+    with mule:
+        results = [*mule.scan_many(['a.example.com', 'b.example.com'], chunk_size=2)]
+
+    assert len(results) == 2
+    assert sorted(looked_up) == ['127.0.0.1', '127.0.0.1', '127.0.0.2', '127.0.0.2'], 'Did not prefetch chunk'
+    assert sorted(mule.backend.queries) == ['1.0.0.127.in-addr.arpa', '2.0.0.127.in-addr.arpa'], 'Did not reuse'
+    assert all('IP::PTR::PROVIDER.COM' in result.tags for result in results)
+
+
+@pytest.mark.parametrize('workers,threaded', [(1, False), (4, True)])
+def test_prefetch_threads_follow_workers(workers, threaded):
+    mule = DNSMule(storage=DictStorage(), backend=CountingBackend(), rules=Rules())
+    rule = PTRScan(workers=workers)
+    mule.rules.register(RRType.A, rule)
+    threads = set()
+    prefetch_one = rule._prefetch_one
+
+    def record_thread(address):
+        threads.add(threading.current_thread())
+        return prefetch_one(address)
+
+    rule._prefetch_one = record_thread
+
+    with mule:
+        [*mule.scan_many(['a.example.com', 'b.example.com'], chunk_size=2)]
+
+    assert (threading.current_thread() not in threads) == threaded, 'Prefetch did not follow workers'
+    assert not hasattr(rule, '_executor'), 'Failed to clean up executor'
@@ -0,0 +1,57 @@
+"""
+Compares extend_set backed by an ordered set to the previous list traversal for results with large fan-in::
+
+    python scripts/benchmark_extend_set.py -n 1000
+"""
+from argparse import ArgumentParser
+from timeit import timeit
+
+from dnsmule.utils import extend_set
+
+
+def legacy_extend_set(data, key, *values):
+    target = []
+    if key in data:
+        values = [*data[key], *values]
+    for v in values:
+        if v not in target:
+            target.append(v)
+    data[key] = target
+
+
+def aliases(count: int):
+    # Every value is added twice like when multiple records point to the same alias
+    return [f'alias-{i % (count // 2)}.example.com' for i in range(count)]
+
+
+def certificates(count: int):
+    return [
+        {'common': f'{i % (count // 2)}.example.com', 'alts': [f'www.{i % (count // 2)}.example.com']}
+        for i in range(count)
+    ]
+
+
+def run(function, values):
+    data = {}
+    for value in values:
+        function(data, 'key', value)
+    return data['key']
+
+
+def main(count: int):
+    print(f'Values added one at a time: {count}')
+    for label, values in [('Aliases', aliases(count)), ('Certificates', certificates(count))]:
+        assert run(legacy_extend_set, values) == run(extend_set, values)
+        legacy = timeit(lambda: run(legacy_extend_set, values), number=1)
+        current = timeit(lambda: run(extend_set, values), number=1)
+        print(f'{label}')
+        print(f'  Legacy:  {legacy:.3f}s')
+        print(f'  Current: {current:.3f}s')
+        print(f'  Speedup: {legacy / current:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmarks extend_set')
+    parser.add_argument('-n', '--values', dest='values', type=int, default=1000, help='number of values added')
+    args = parser.parse_args()
+    main(args.values)
@@ -0,0 +1,57 @@
+"""
+Compares the interval index of the ipranges plugin to a linear scan of the ranges::
+
+    python scripts/benchmark_ipranges.py -r 20000 -n 10000
+"""
+from argparse import ArgumentParser
+from ipaddress import IPv4Address
+from random import Random
+from timeit import timeit
+
+from dnsmule_plugins.ipranges.iprange import IPvXRange
+from dnsmule_plugins.ipranges.rule import IpRangeChecker
+
+
+def linear_lookup(ranges, address):
+    return {
+        f'IP::RANGES::{r.service.upper()}::{r.region.upper()}'
+        for r in ranges
+        if address in r
+    }
+
+
+def main(range_count: int, address_count: int):
+    random = Random(0)
+    ranges = [
+        IPvXRange.create(
+            address=f'{IPv4Address(random.getrandbits(32))}/{random.randint(12, 28)}',
+            service=f'service{i % 20}',
+            region=f'region{i % 30}',
+        )
+        for i in range(range_count)
+    ]
+    addresses = [str(IPv4Address(random.getrandbits(32))) for _ in range(address_count)]
+
+    rule = IpRangeChecker(providers=[])
+    rule._provider_ranges['benchmark'] = ranges
+    build = timeit(lambda: rule.build_index(), number=1)
+    index = rule.build_index()
+
+    linear_addresses = addresses[:max(1, address_count // 100)]
+    linear = timeit(lambda: [linear_lookup(ranges, a) for a in linear_addresses], number=1)
+    linear = linear / len(linear_addresses) * len(addresses)
+    indexed = timeit(lambda: [index.lookup(a) for a in addresses], number=1)
+
+    print(f'Ranges: {range_count}, Addresses: {address_count}')
+    print(f'Build:   {build:.3f}s')
+    print(f'Linear:  {linear:.3f}s (estimated from {len(linear_addresses)} addresses)')
+    print(f'Indexed: {indexed:.3f}s')
+    print(f'Speedup: {linear / indexed:.0f}x')
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmarks ip range lookups')
+    parser.add_argument('-r', '--ranges', dest='ranges', type=int, default=20000, help='number of ranges')
+    parser.add_argument('-n', '--addresses', dest='addresses', type=int, default=10000, help='number of addresses')
+    args = parser.parse_args()
+    main(args.ranges, args.addresses)
@@ -0,0 +1,77 @@
+"""
+Compares the memory use and creation speed of slotted records to the previous dict based records::
+
+    python scripts/benchmark_records.py -n 1000000 -p 10
+"""
+import gc
+import tracemalloc
+from argparse import ArgumentParser
+from timeit import default_timer
+
+from dnsmule import Record, RRType, Domain
+
+
+class LegacyRecord:
+
+    def __init__(self, name, type, data, ttl=None):
+        self.name = name
+        self.type = type
+        self.data = data
+        self.ttl = ttl
+
+    @property
+    def text(self) -> str:
+        if hasattr(self.data, 'decode'):
+            return self.data.decode()
+        else:
+            return f'{self.data}'
+
+
+def generate_rows(record_count: int, per_domain: int):
+    types = [RRType.A, RRType.AAAA, RRType.TXT, RRType.MX, RRType.CNAME]
+    for i in range(record_count):
+        # Names are built like when read from a file, as separate string objects
+        yield f'host-{i // per_domain}.example.com', types[i % len(types)], f'10.0.{i % 256}.{i % 199}'
+
+
+def measure_memory(cls, rows) -> float:
+    """Measures memory of records holding the only references to their data like when streaming a file
+    """
+    gc.collect()
+    tracemalloc.start()
+    records = [cls(Domain(name), type, data) for name, type, data in rows]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / len(records)
+
+
+def measure_speed(cls, rows):
+    rows = [*rows]
+    gc.collect()
+    start = default_timer()
+    records = [cls(Domain(name), type, data) for name, type, data in rows]
+    created = default_timer() - start
+
+    start = default_timer()
+    for _ in range(3):
+        for record in records:
+            _ = record.text
+    text = default_timer() - start
+    return len(records) / created, text
+
+
+def main(record_count: int, per_domain: int):
+    print(f'Records: {record_count}, Records per domain: {per_domain}')
+    print(f'{"":8} {"bytes/record":>12} {"records/s":>12} {"text x3":>8}')
+    for label, cls in [('Legacy', LegacyRecord), ('Slotted', Record)]:
+        size = measure_memory(cls, generate_rows(record_count, per_domain))
+        rate, text = measure_speed(cls, generate_rows(record_count, per_domain))
+        print(f'{label:8} {size:12.1f} {rate:12.0f} {text:7.3f}s')
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmarks record representations')
+    parser.add_argument('-n', '--records', dest='records', type=int, default=1000000, help='number of records')
+    parser.add_argument('-p', '--per-domain', dest='per_domain', type=int, default=10, help='records per domain')
+    args = parser.parse_args()
+    main(args.records, args.per_domain)
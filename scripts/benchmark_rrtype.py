@@ -0,0 +1,38 @@
+"""
+Compares RRType conversions of the first and the last member, which take the same time with lookup tables::
+
+    python scripts/benchmark_rrtype.py -n 100000
+"""
+from argparse import ArgumentParser
+from timeit import repeat
+
+from dnsmule import RRType
+
+CONVERSIONS = [
+    ('to_text', RRType.to_text, RRType.A, RRType.DLV),
+    ('make', RRType.make, 1, 32769),
+    ('from_text', RRType.from_text, 'A', 'DLV'),
+    ('from_any', RRType.from_any, 'A', 'DLV'),
+]
+
+
+def best_time(function, value, number: int) -> float:
+    return min(repeat(lambda: function(value), number=number, repeat=7))
+
+
+def main(number: int):
+    print(f'Conversions: {number}')
+    for label, function, first, last in CONVERSIONS:
+        first_time = best_time(function, first, number)
+        last_time = best_time(function, last, number)
+        print(f'{label}')
+        print(f'  First: {first_time:.3f}s')
+        print(f'  Last:  {last_time:.3f}s')
+        print(f'  Ratio: {last_time / first_time:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmarks RRType conversions')
+    parser.add_argument('-n', '--number', dest='number', type=int, default=100000, help='number of conversions')
+    args = parser.parse_args()
+    main(args.number)
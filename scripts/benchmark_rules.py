@@ -0,0 +1,66 @@
+"""
+Compares rule dispatch with a compiled plan to per-record context injection::
+
+    python scripts/benchmark_rules.py -r 30 -n 100000
+"""
+from argparse import ArgumentParser
+from timeit import timeit
+
+from dnsmule import DNSMule, Rules, RRType, Record, Result, Domain, NoOpBackend, DictStorage
+
+
+def noop(_, __):
+    pass
+
+
+def create_mule(rule_count: int) -> DNSMule:
+    rules = Rules()
+    types = [RRType.A, RRType.AAAA, RRType.CNAME, RRType.TXT, RRType.MX]
+    for i in range(rule_count):
+        rules.register(types[i % len(types)], noop)
+    rules.register_any(noop)
+    return DNSMule(rules=rules, backend=NoOpBackend(), storage=DictStorage())
+
+
+def run_rule(mule: DNSMule, rule, record, result):
+    rule.context = mule.context
+    try:
+        rule(record, result)
+    finally:
+        del rule.context
+
+
+def legacy_run(mule: DNSMule, records, result):
+    for record in records:
+        result.types.add(record.type)
+        for rule in mule.rules.normal.get(record.type, ()):
+            run_rule(mule, rule, record, result)
+        for rule in mule.rules.any:
+            run_rule(mule, rule, record, result)
+
+
+def main(rule_count: int, record_count: int):
+    mule = create_mule(rule_count)
+    types = [*RRType][:20]
+    records = [
+        Record(Domain('example.com'), types[i % len(types)], f'{i}')
+        for i in range(record_count)
+    ]
+    result = Result(Domain('example.com'))
+
+    legacy = timeit(lambda: legacy_run(mule, records, result), number=1)
+    with mule._compiled() as plan:
+        compiled = timeit(lambda: mule._run(plan, records, result), number=1)
+
+    print(f'Rules: {rule_count}, Records: {record_count}')
+    print(f'Legacy:   {legacy:.3f}s')
+    print(f'Compiled: {compiled:.3f}s')
+    print(f'Speedup:  {legacy / compiled:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmarks rule dispatch')
+    parser.add_argument('-r', '--rules', dest='rules', type=int, default=30, help='number of rules')
+    parser.add_argument('-n', '--records', dest='records', type=int, default=100000, help='number of records')
+    args = parser.parse_args()
+    main(args.rules, args.records)
@@ -54,6 +54,7 @@ setup(
             'redis',
             'pymongo',
             'dnspython',
+            'orjson',
         ],
     },
     project_urls={
@@ -5,10 +5,13 @@ from .api import (
     Result,
     Storage,
     Backend,
+    AsyncBackend,
+    WorkQueue,
     Rules,
     DNSMule,
 )
 from .backends import *
+from .checkpoint import Checkpoint
 from .loader import (
     load_config,
     load_config_from_file,
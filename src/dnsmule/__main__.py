@@ -1,42 +1,214 @@
 import argparse
-import json
 import logging
 import sys
+from itertools import islice
+from typing import Iterable, List
+
+from . import load_config_from_file, Checkpoint
+from .output import JSONWriter, NDJSONWriter
+from .utils import load_data, load_stream
+
+
+def read_targets(targets: List[str], files: List[str]) -> Iterable[str]:
+    """Lazily reads targets from arguments, stdin with ``-`` and target files
+    """
+    for target in targets:
+        if target == '-':
+            yield from load_stream(sys.stdin)
+        else:
+            yield target
+    for file in files:
+        yield from load_data(file)
 
-from . import load_config_from_file, RRType
-from .utils import jsonize
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
 
     parser = argparse.ArgumentParser(description='DNSMule')
     parser.add_argument('--config', required=True)
-    parser.add_argument('TARGET', nargs='+')
+    parser.add_argument('TARGET', nargs='*', help='domain to scan or - to read domains from stdin')
+    parser.add_argument(
+        '-f', '--file',
+        dest='files',
+        default=[],
+        action='append',
+        help='file to read domains from (txt or csv[id, value])',
+    )
+    parser.add_argument(
+        '--skip',
+        dest='skip',
+        default=0,
+        type=int,
+        help='number of domains to skip from the start',
+    )
+    parser.add_argument(
+        '--limit',
+        dest='limit',
+        default=-1,
+        type=int,
+        help='maximum number of domains to scan',
+    )
     parser.add_argument(
         '-s', '--silent',
         dest='silent',
         default=False,
         action='store_true',
     )
+    parser.add_argument(
+        '-c', '--concurrency',
+        dest='concurrency',
+        default=1,
+        type=int,
+        help='maximum number of domains queried at once',
+    )
+    parser.add_argument(
+        '--chunk-size',
+        dest='chunk_size',
+        default=1,
+        type=int,
+        help='number of results fetched from and written to storage at once',
+    )
+
+    parser.add_argument(
+        '-w', '--workers',
+        dest='workers',
+        default=0,
+        type=int,
+        help='number of worker processes, scans in this process if not given',
+    )
+    parser.add_argument(
+        '--batch-size',
+        dest='batch_size',
+        default=100,
+        type=int,
+        help='number of domains given to a worker process or pulled from the queue at once',
+    )
+    parser.add_argument(
+        '--format',
+        dest='format',
+        default='json',
+        choices=['json', 'ndjson'],
+        help='output format, ndjson writes one compact result per line',
+    )
+    parser.add_argument(
+        '--flush-count',
+        dest='flush_count',
+        default=1000,
+        type=int,
+        help='number of buffered ndjson results written at once',
+    )
+    parser.add_argument(
+        '--flush-interval',
+        dest='flush_interval',
+        default=1.,
+        type=float,
+        help='maximum seconds between ndjson writes',
+    )
+
+    parser.add_argument(
+        '--checkpoint',
+        dest='checkpoint',
+        default=None,
+        help='file to record completed domains in',
+    )
+    parser.add_argument(
+        '--checkpoint-every',
+        dest='checkpoint_every',
+        default=1000,
+        type=int,
+        help='number of completed domains between checkpoint saves',
+    )
+    parser.add_argument(
+        '--resume',
+        dest='resume',
+        default=False,
+        action='store_true',
+        help='skip domains completed according to the checkpoint',
+    )
+
+    parser.add_argument(
+        '--enqueue',
+        dest='enqueue',
+        default=False,
+        action='store_true',
+        help='push targets to the configured work queue and exit',
+    )
+    parser.add_argument(
+        '--dequeue',
+        dest='dequeue',
+        default=False,
+        action='store_true',
+        help='scan domains pulled from the configured work queue',
+    )
+    parser.add_argument(
+        '--follow',
+        dest='follow',
+        default=False,
+        action='store_true',
+        help='keep polling the work queue when it is empty',
+    )
 
     args = parser.parse_args()
+    if not args.TARGET and not args.files and not args.dequeue:
+        parser.error('no targets given')
+    if args.resume and not args.checkpoint:
+        parser.error('--resume requires --checkpoint')
+    if args.enqueue and args.dequeue:
+        parser.error('--enqueue and --dequeue are mutually exclusive')
     mule = load_config_from_file(args.config)
+    if (args.enqueue or args.dequeue) and mule.queue is None:
+        parser.error('no queue configured')
+
+    targets = islice(
+        read_targets(args.TARGET, args.files),
+        args.skip,
+        args.skip + args.limit if args.limit >= 0 else None,
+    )
+
+    if args.checkpoint:
+        checkpoint = Checkpoint(args.checkpoint, resume=args.resume, save_every=args.checkpoint_every)
+    else:
+        checkpoint = None
+
+    if args.format == 'ndjson':
+        writer = NDJSONWriter(
+            sys.stdout.buffer,
+            flush_count=args.flush_count,
+            flush_interval=args.flush_interval,
+        )
+    else:
+        writer = JSONWriter(sys.stdout.buffer)
 
-    targets = args.TARGET
-    if len(targets) == 1 and targets[0] == '-':
-        targets = sys.stdin.read().splitlines(keepends=False)
+    if args.enqueue:
+        with mule:
+            mule.enqueue(targets)
+        sys.exit(0)
 
-    with mule:
-        for target in targets:
-            result = mule.scan(target)
+    with mule, writer:
+        if args.dequeue:
+            results = mule.scan_queue(
+                batch_size=args.batch_size,
+                concurrency=args.concurrency,
+                chunk_size=args.chunk_size,
+                follow=args.follow,
+            )
+        elif args.workers > 0:
+            results = mule.scan_parallel(
+                args.config,
+                targets,
+                workers=args.workers,
+                concurrency=args.concurrency,
+                chunk_size=args.chunk_size,
+                batch_size=args.batch_size,
+                checkpoint=checkpoint,
+            )
+        else:
+            results = mule.scan_many(
+                targets,
+                concurrency=args.concurrency,
+                chunk_size=args.chunk_size,
+                checkpoint=checkpoint,
+            )
+        for result in results:
             if not args.silent:
-                print(json.dumps(
-                    {
-                        'name': result.name,
-                        'types': [*map(RRType.to_text, result.types)],
-                        'tags': [*result.tags],
-                        'data': jsonize(result.data),
-                    },
-                    indent=4,
-                    ensure_ascii=False,
-                ))
+                writer.write(result)
@@ -1,6 +1,15 @@
-from contextlib import ExitStack
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from sys import intern
+from threading import Lock
 from typing import (
     Iterable,
+    Iterator,
+    AsyncIterator,
+    Tuple,
     Optional,
     Dict,
     List,
@@ -8,17 +17,25 @@ from typing import (
     Any,
     Mapping,
     Union,
+    Callable,
     Protocol,
     NewType,
     cast,
+    TYPE_CHECKING,
 )
 
 from .rrtype import RRType
+from .utils import chunked
+
+if TYPE_CHECKING:  # pragma: nocover
+    from .checkpoint import Checkpoint
 
 Domain = NewType('Domain', str)
 
 
 class Result:
+    __slots__ = ('name', 'types', 'tags', 'data')
+
     name: Domain
     types: Set[RRType]
     tags: Set[str]
@@ -49,26 +66,56 @@ class Result:
 
 
 class Record:
+    """
+    Single DNS record of a domain
+
+    Names are interned to share them between the records of a domain.
+    The text representation is computed once and cached until the data is replaced,
+    subclasses customize it by overriding ``_to_text``.
+    """
+    __slots__ = ('name', 'type', '_data', 'ttl', '_text')
+
     name: Domain
     type: RRType
-    data: Union[bytes, str, Any]
+    ttl: Optional[int]
 
     def __init__(
             self,
             name: Domain,
             type: RRType,
             data: Any,
+            ttl: Optional[int] = None,
     ):
-        self.name = name
+        try:
+            self.name = intern(name)
+        except TypeError:
+            self.name = name
         self.type = type
-        self.data = data
+        self._data = data
+        self.ttl = ttl
+        self._text = None
 
     @property
-    def text(self) -> str:
-        if hasattr(self.data, 'decode'):
-            return self.data.decode()
+    def data(self) -> Union[bytes, str, Any]:
+        return self._data
+
+    @data.setter
+    def data(self, value: Union[bytes, str, Any]):
+        self._data = value
+        self._text = None
+
+    def _to_text(self) -> str:
+        if hasattr(self._data, 'decode'):
+            return self._data.decode()
         else:
-            return f'{self.data}'
+            return f'{self._data}'
+
+    @property
+    def text(self) -> str:
+        text = self._text
+        if text is None:
+            text = self._text = self._to_text()
+        return text
 
     def __eq__(self, other: Any) -> bool:
         return other is self or (
@@ -84,6 +131,22 @@ class Record:
         ).__hash__()
 
 
+class NegativeAnswer(List[Record]):
+    """
+    Empty answer of a query with the time it may be cached for
+
+    The ttl is taken from the SOA record of the authority section
+    as the smaller of its TTL and minimum field.
+    """
+    __slots__ = ('ttl',)
+
+    ttl: int
+
+    def __init__(self, ttl: int):
+        super().__init__()
+        self.ttl = ttl
+
+
 class Storage:
 
     def __enter__(self):
@@ -109,6 +172,34 @@ class Storage:
         :return:       No return
         """
 
+    def fetch_many(self, domains: Iterable[Domain]) -> Dict[Domain, Result]:
+        """
+        Fetches multiple results from backing storage
+
+        Storages should override this if they support batched reads.
+
+        :param domains: Domains to fetch the results for
+        :return:        Existing results by domain, missing domains are omitted
+        """
+        results = {}
+        for domain in domains:
+            result = self.fetch(domain)
+            if result is not None:
+                results[domain] = result
+        return results
+
+    def store_many(self, results: Iterable[Result]) -> None:
+        """
+        Stores multiple results into backing storage
+
+        Storages should override this if they support batched writes.
+
+        :param results: Result instances
+        :return:        No return
+        """
+        for result in results:
+            self.store(result)
+
 
 class Backend:
 
@@ -128,6 +219,117 @@ class Backend:
         :return:        Iterable of found records
         """
 
+    def scan_by_type(self, domain: Domain, *records: RRType) -> Dict[RRType, Optional[List[Record]]]:
+        """
+        Scans a domain for the given record types and groups the records by queried type
+
+        Backends that can tell failed queries apart from empty answers give None for the failed types.
+        Empty answers can be given as a ``NegativeAnswer`` carrying the negative caching time of the zone.
+        By default all types are scanned at once and records of other types than the queried ones,
+        like a CNAME in front of an A record, are given with the first queried type.
+
+        :param domain:  Valid domain name
+        :param records: DNS record types
+        :return:        Records or None for every queried type
+        """
+        return _group_by_type(records, self.scan(domain, *records))
+
+
+def _group_by_type(types: Iterable[RRType], records: Iterable[Record]) -> Dict[RRType, List[Record]]:
+    grouped: Dict[RRType, List[Record]] = {type: [] for type in types}
+    if not grouped:
+        return grouped
+    first = next(iter(grouped.values()))
+    for record in records:
+        grouped.get(record.type, first).append(record)
+    return grouped
+
+
+class WorkQueue:
+    """
+    Queue of domains shared by scanning processes
+
+    Pulled domains are hidden from other consumers until they are acknowledged
+    or their visibility timeout passes, after which they are retried.
+    Domains pulled too many times without acknowledgement are marked as failed.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """No-op
+        """
+
+    def push(self, domains: Iterable[Domain]) -> None:
+        """
+        Adds domains to the queue
+
+        Domains already in the queue are not added again.
+
+        :param domains: Domains to add
+        :return:        No return
+        """
+
+    def pull(self, count: int) -> List[Domain]:
+        """
+        Takes visible domains from the queue
+
+        :param count: Maximum number of domains
+        :return:      Domains or an empty list if no domains are visible
+        """
+
+    def ack(self, domains: Iterable[Domain]) -> None:
+        """
+        Removes completed domains from the queue
+
+        :param domains: Completed domains
+        :return:        No return
+        """
+
+    def release(self, domains: Iterable[Domain]) -> None:
+        """
+        Makes pulled domains visible again immediately
+
+        :param domains: Domains to retry
+        :return:        No return
+        """
+
+    def failed(self) -> List[Domain]:
+        """
+        Lists domains that exceeded the maximum number of attempts
+
+        :return: Failed domains
+        """
+
+
+class AsyncBackend(Backend):
+    """
+    Backend that can also be queried from an asyncio event loop
+
+    The synchronous scan must still be available as rules may query the backend directly.
+    """
+
+    async def scan_async(self, domain: Domain, *records: RRType) -> AsyncIterator[Record]:
+        """
+        Scans a domain for the given record types without blocking the event loop
+
+        :param domain:  Valid domain name
+        :param records: DNS record types
+        :return:        Async iterable of found records
+        """
+
+    async def scan_by_type_async(self, domain: Domain, *records: RRType) -> Dict[RRType, Optional[List[Record]]]:
+        """
+        Scans a domain for the given record types without blocking the event loop
+        and groups the records by queried type like ``scan_by_type``
+
+        :param domain:  Valid domain name
+        :param records: DNS record types
+        :return:        Records or None for every queried type
+        """
+        return _group_by_type(records, [record async for record in self.scan_async(domain, *records)])
+
 
 class _Init(Protocol):
 
@@ -240,27 +442,129 @@ class Rules:
         self.batch.append(rule)
         return rule
 
+    def compile(self, context: Mapping[str, Any]) -> 'RulePlan':
+        """
+        Creates a dispatch plan of the currently registered rules
+
+        :param context: Context to inject into rules
+        :return:        Plan that is entered for the duration of a scan
+        """
+        return RulePlan(self, context)
+
+
+class RulePlan:
+    """
+    Precompiled rule dispatch
+
+    Maps each record type to a flat tuple of the rules run for it, including the rules for any record type.
+    The context is set on every rule once when the plan is entered and removed when it is exited,
+    unless another plan has replaced it in the meantime.
+
+    Rules of a type with a ``combine`` classmethod are replaced with a single rule created from
+    all rules of that type registered for the same record type.
+
+    Rules with a ``prefetch`` method are given the records of multiple domains before the records are processed
+    in multi-domain scans. Only records of the types the rule is registered for are given.
+    """
+    normal: Dict[RRType, Tuple[Rule, ...]]
+    any: Tuple[Rule, ...]
+    batch: Tuple[BatchRule, ...]
+    prefetchers: Tuple[Tuple[Callable[[List[Record]], Any], Optional[Set[RRType]]], ...]
+
+    def __init__(self, rules: Rules, context: Mapping[str, Any]):
+        self.context = context
+        self.any = _combine_rules(rules.any)
+        self.batch = (*rules.batch,)
+        self.normal = {
+            type: (*_combine_rules(group), *self.any)
+            for type, group in rules.normal.items()
+        }
+        self._rules = rules.all
+        prefetch_types: Dict[int, Tuple[Any, Optional[Set[RRType]]]] = {}
+        for type, group in rules.normal.items():
+            for rule in group:
+                if hasattr(rule, 'prefetch'):
+                    prefetch_types.setdefault(id(rule), (rule, set()))[1].add(type)
+        for rule in rules.any:
+            if hasattr(rule, 'prefetch'):
+                prefetch_types[id(rule)] = (rule, None)
+        self.prefetchers = (*(
+            (rule.prefetch, types)
+            for rule, types in prefetch_types.values()
+        ),)
+
+    def __enter__(self):
+        for rule in self._rules:
+            rule.context = self.context
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for rule in self._rules:
+            if getattr(rule, 'context', None) is self.context:
+                del rule.context
+
+    def prefetch(self, records: List[Record]):
+        """Gives records to rules with a prefetch method
+        """
+        for prefetch, types in self.prefetchers:
+            selected = records if types is None else [record for record in records if record.type in types]
+            if selected:
+                prefetch(selected)
+
+    def run_batch(self, records: List[Record], result: Result):
+        """Runs all batch rules for the records of a scan
+        """
+        if records:
+            for rule in self.batch:
+                rule(records, result)
+
+
+def _combine_rules(rules: Iterable[Rule]) -> Tuple[Rule, ...]:
+    combined: List[Union[Rule, List[Rule]]] = []
+    groups: Dict[type, List[Rule]] = {}
+    for rule in rules:
+        if hasattr(type(rule), 'combine'):
+            if type(rule) not in groups:
+                groups[type(rule)] = []
+                combined.append(groups[type(rule)])
+            groups[type(rule)].append(rule)
+        else:
+            combined.append(rule)
+    return (*(
+        type(rule[0]).combine(rule) if isinstance(rule, list) else rule
+        for rule in combined
+    ),)
+
 
 class DNSMule:
     storage: Storage
     backend: Backend
     rules: Rules
+    queue: Optional[WorkQueue]
 
     def __init__(
             self,
             storage: Storage,
             backend: Backend,
             rules: Rules,
+            queue: WorkQueue = None,
     ):
         self.storage = storage
         self.backend = backend
         self.rules = rules
+        self.queue = queue
+        self._plan: Optional[RulePlan] = None
+        self._plan_stack: Optional[ExitStack] = None
+        self._plan_users = 0
+        self._plan_lock = Lock()
 
     def __enter__(self):
         self._stack = ExitStack()
         self._stack.__enter__()
         self._stack.enter_context(self.storage)
         self._stack.enter_context(self.backend)
+        if self.queue is not None:
+            self._stack.enter_context(self.queue)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -275,54 +579,376 @@ class DNSMule:
             'mule': self,
         }
 
-    def _run_rule(
-            self,
-            rule: Union[Rule, BatchRule],
-            record: Union[Record, List[Record]],
-            result: Result,
-    ):
-        rule.context = self.context
+    @contextmanager
+    def _compiled(self) -> Iterator[RulePlan]:
+        """
+        Enters rules and compiles a plan shared by all scans running at once
+
+        The plan is created by the first scan entering and removed when the last scan exits,
+        so that concurrent scans do not remove the rule context from each other.
+        """
+        with self._plan_lock:
+            if self._plan_users == 0:
+                stack = ExitStack()
+                stack.enter_context(self.rules)
+                self._plan = stack.enter_context(self.rules.compile(self.context))
+                self._plan_stack = stack
+            self._plan_users += 1
+            plan = self._plan
         try:
-            rule(record, result)
+            yield plan
         finally:
-            del rule.context
+            with self._plan_lock:
+                self._plan_users -= 1
+                if self._plan_users == 0:
+                    stack = self._plan_stack
+                    self._plan = None
+                    self._plan_stack = None
+                    stack.close()
+
+    @staticmethod
+    def _normal_scan(plan: RulePlan, records: Iterable[Record], result: Result):
+        add_type = result.types.add
+        dispatch = plan.normal.get
+        fallback = plan.any
+        for record in records:
+            add_type(record.type)
+            for rule in dispatch(record.type, fallback):
+                rule(record, result)
+
+    @staticmethod
+    def _batched_scan(plan: RulePlan, records: Iterable[Record], result: Result):
+        add_type = result.types.add
+        dispatch = plan.normal.get
+        fallback = plan.any
+        batch = []
+        for record in records:
+            add_type(record.type)
+            for rule in dispatch(record.type, fallback):
+                rule(record, result)
+            batch.append(record)
+        plan.run_batch(batch, result)
 
-    def _run_rules(self, record: Record, result: Result):
-        for rule in self.rules.normal.get(record.type, ()):
-            self._run_rule(rule, record, result)
-        for rule in self.rules.any:
-            self._run_rule(rule, record, result)
+    def _run(self, plan: RulePlan, records: Iterable[Record], result: Result):
+        if plan.batch:
+            self._batched_scan(plan, records, result)
+        else:
+            self._normal_scan(plan, records, result)
 
-    def _run_batch_rules(self, records: List[Record], result: Result):
-        if records:
-            for rule in self.rules.batch:
-                self._run_rule(rule, records, result)
+    def _process(self, plan: RulePlan, domain: Domain, records: Iterable[Record]) -> Result:
+        result = self.storage.fetch(domain)
+        if result is None:
+            result = Result(name=domain)
+        self._run(plan, records, result)
+        self.storage.store(result)
+        return result
 
-    def _scan(self, domain: Domain, result: Result):
-        for record in self.backend.scan(domain, *self.rules.records):
-            result.types.add(record.type)
-            yield record
+    def scan(self, domain: str) -> Result:
+        domain = cast(Domain, domain)
+        with self._compiled() as plan:
+            return self._process(plan, domain, self.backend.scan(domain, *self.rules.records))
 
-    def _normal_scan(self, domain: Domain, result: Result):
-        for record in self._scan(domain, result):
-            self._run_rules(record, result)
+    def _query(self, domain: Domain, types: Set[RRType]) -> Tuple[Domain, List[Record]]:
+        return domain, [*self.backend.scan(domain, *types)]
 
-    def _batched_scan(self, domain: Domain, result: Result):
-        batch = []
-        for record in self._scan(domain, result):
-            self._run_rules(record, result)
-            batch.append(record)
-        self._run_batch_rules(batch, result)
+    async def _query_async(self, domain: Domain, types: Set[RRType]) -> Tuple[Domain, List[Record]]:
+        if isinstance(self.backend, AsyncBackend):
+            return domain, [record async for record in self.backend.scan_async(domain, *types)]
+        else:
+            return await asyncio.get_running_loop().run_in_executor(None, self._query, domain, types)
 
-    def scan(self, domain: str) -> Result:
+    async def scan_async(self, domain: str) -> Result:
+        """
+        Scans a domain without blocking the event loop
+
+        Synchronous backends are queried in the default executor of the running loop.
+        """
         domain = cast(Domain, domain)
-        with self.rules:
-            result = self.storage.fetch(domain)
-            if result is None:
-                result = Result(name=domain)
-            if self.rules.batch:
-                self._batched_scan(domain, result)
-            else:
-                self._normal_scan(domain, result)
-            self.storage.store(result)
-            return result
+        with self._compiled() as plan:
+            return self._process(plan, *await self._query_async(domain, self.rules.records))
+
+    async def scan_many_async(
+            self,
+            domains: Iterable[str],
+            concurrency: int = 1,
+            chunk_size: int = 1,
+            checkpoint: 'Checkpoint' = None,
+    ) -> AsyncIterator[Result]:
+        """
+        Scans multiple domains concurrently in the running event loop
+
+        This is the asyncio counterpart to ``scan_many``.
+        With an ``AsyncBackend`` all queries share the event loop,
+        otherwise the backend is queried in the default executor of the loop.
+
+        **Note:** Results are yielded in completion order
+
+        **Note:** Rules are entered once for the whole run
+
+        :param domains:     Domains to scan
+        :param concurrency: Maximum number of domains queried at once
+        :param chunk_size:  Number of results fetched and stored at once
+        :param checkpoint:  Checkpoint for skipping and recording completed domains
+        :return:            Async iterator of results
+        """
+        _check_limits(concurrency, chunk_size)
+        with self._compiled() as plan:
+            buffer = _ResultBuffer(self, plan, chunk_size, checkpoint)
+            types = self.rules.records
+            pending: Set[asyncio.Future] = set()
+            try:
+                for chunk in buffer.prefetch(domains):
+                    for domain in chunk:
+                        if len(pending) >= concurrency:
+                            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                            for task in done:
+                                buffer.complete(*task.result())
+                        pending.add(asyncio.ensure_future(self._query_async(domain, types)))
+                    for result in buffer.flush():
+                        yield result
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        buffer.complete(*task.result())
+                    for result in buffer.flush():
+                        yield result
+                for result in buffer.flush(force=True):
+                    yield result
+            finally:
+                for task in pending:
+                    task.cancel()
+                buffer.close()
+
+    def scan_many(
+            self,
+            domains: Iterable[str],
+            concurrency: int = 1,
+            chunk_size: int = 1,
+            checkpoint: 'Checkpoint' = None,
+    ) -> Iterator[Result]:
+        """
+        Scans multiple domains with concurrent backend queries
+
+        Backend queries are run in a thread pool with at most ``concurrency`` domains in flight.
+        The domains are consumed lazily, so the input can be a stream.
+        Rules and storage are only invoked from the calling thread,
+        so only the backend needs to be thread safe.
+
+        Existing results are fetched and new results stored in chunks of ``chunk_size``
+        using ``Storage.fetch_many`` and ``Storage.store_many``.
+        Results are yielded once their chunk has been stored.
+
+        With a checkpoint domains completed in a previous run are skipped
+        and domains are recorded as completed once their results have been stored.
+
+        **Note:** Results are yielded in completion order
+
+        **Note:** Rules are entered once for the whole run
+
+        :param domains:     Domains to scan
+        :param concurrency: Maximum number of domains queried at once
+        :param chunk_size:  Number of results fetched and stored at once
+        :param checkpoint:  Checkpoint for skipping and recording completed domains
+        :return:            Iterator of results
+        """
+        _check_limits(concurrency, chunk_size)
+        with self._compiled() as plan, ThreadPoolExecutor(max_workers=concurrency) as executor:
+            buffer = _ResultBuffer(self, plan, chunk_size, checkpoint)
+            types = self.rules.records
+            pending: Set[Future] = set()
+            try:
+                for chunk in buffer.prefetch(domains):
+                    for domain in chunk:
+                        if len(pending) >= concurrency:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                buffer.complete(*future.result())
+                        pending.add(executor.submit(self._query, domain, types))
+                    yield from buffer.flush()
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        buffer.complete(*future.result())
+                    yield from buffer.flush()
+                yield from buffer.flush(force=True)
+            finally:
+                for future in pending:
+                    future.cancel()
+                buffer.close()
+
+    def scan_parallel(
+            self,
+            file: Union[str, Path],
+            domains: Iterable[str],
+            workers: int = None,
+            concurrency: int = 1,
+            chunk_size: int = 1,
+            batch_size: int = 100,
+            checkpoint: 'Checkpoint' = None,
+    ) -> Iterator[Result]:
+        """
+        Scans multiple domains in worker processes
+
+        Workers are started with the ``spawn`` method, so they do not inherit the threads
+        or open connections of this mule. Each worker loads the config file with ``load_config_from_file``
+        and scans batches of domains with ``scan_many``. Existing results are fetched and the results stored
+        by this mule, so the storage of the config is only used from the calling process.
+        Results rules store for other domains in a worker are stored by this mule with the batch.
+        A batch with a domain of a batch still being scanned is held back until that result is stored.
+        This mule should be loaded from the same config file and entered.
+
+        **Note:** Results are yielded in completion order
+
+        **Note:** Rules are entered for every batch in the workers
+
+        :param file:        Config file for the workers
+        :param domains:     Domains to scan
+        :param workers:     Number of worker processes, defaults to the number of processors
+        :param concurrency: Maximum number of domains queried at once in a worker
+        :param chunk_size:  Number of domains processed at once in a worker
+        :param batch_size:  Number of domains given to a worker at once
+        :param checkpoint:  Checkpoint for skipping and recording completed domains
+        :return:            Iterator of results
+        """
+        from .parallel import scan_parallel
+        return scan_parallel(
+            self,
+            file,
+            domains,
+            workers=workers,
+            concurrency=concurrency,
+            chunk_size=chunk_size,
+            batch_size=batch_size,
+            checkpoint=checkpoint,
+        )
+
+    def enqueue(self, domains: Iterable[str], batch_size: int = 1000) -> int:
+        """
+        Pushes domains to the work queue
+
+        :param domains:    Domains to push
+        :param batch_size: Number of domains pushed at once
+        :return:           Number of domains pushed
+        """
+        count = 0
+        for batch in chunked(map(Domain, domains), batch_size):
+            self.queue.push(batch)
+            count += len(batch)
+        return count
+
+    def scan_queue(
+            self,
+            batch_size: int = 100,
+            concurrency: int = 1,
+            chunk_size: int = 1,
+            follow: bool = False,
+            poll_interval: float = 1.,
+    ) -> Iterator[Result]:
+        """
+        Scans domains pulled from the work queue
+
+        Batches of domains are pulled and scanned with ``scan_many``.
+        Domains are acknowledged once their results have been stored.
+        If the scan fails or is stopped the rest of the batch is released to be retried right away.
+
+        :param batch_size:    Number of domains pulled at once
+        :param concurrency:   Maximum number of domains queried at once
+        :param chunk_size:    Number of results fetched and stored at once
+        :param follow:        Keep polling for more domains when the queue is empty
+        :param poll_interval: Seconds to wait between pulls from an empty queue
+        :return:              Iterator of results
+        """
+        while True:
+            batch = self.queue.pull(batch_size)
+            if not batch:
+                if follow:
+                    time.sleep(poll_interval)
+                    continue
+                break
+            completed = []
+            try:
+                for result in self.scan_many(batch, concurrency=concurrency, chunk_size=chunk_size):
+                    completed.append(result.name)
+                    yield result
+            except BaseException:
+                done = {*completed}
+                remaining = [domain for domain in batch if domain not in done]
+                if remaining:
+                    self.queue.release(remaining)
+                raise
+            finally:
+                if completed:
+                    self.queue.ack(completed)
+
+
+def _check_limits(concurrency: int, chunk_size: int):
+    if concurrency < 1:
+        raise ValueError('Concurrency must be at least one', concurrency)
+    if chunk_size < 1:
+        raise ValueError('Chunk size must be at least one', chunk_size)
+
+
+class _ResultBuffer:
+    """
+    Batches storage access for multi-domain scans
+
+    Existing results are fetched for a whole chunk of domains before they are queried.
+    Rules are run and results stored once a full chunk of domains has been queried.
+    A domain given more than once is fetched once and its later scans update the same result.
+    """
+
+    def __init__(self, mule: DNSMule, plan: RulePlan, chunk_size: int, checkpoint: 'Checkpoint' = None):
+        self.mule = mule
+        self.plan = plan
+        self.chunk_size = chunk_size
+        self.checkpoint = checkpoint
+        self.existing: Dict[Domain, Result] = {}
+        self.expected: Dict[Domain, int] = {}
+        self.queried: List[Tuple[Domain, List[Record]]] = []
+
+    def prefetch(self, domains: Iterable[str]) -> Iterator[List[Domain]]:
+        if self.checkpoint is not None:
+            domains = self.checkpoint.track(domains)
+        for chunk in chunked(map(Domain, domains), self.chunk_size):
+            missing = [domain for domain in dict.fromkeys(chunk) if domain not in self.expected]
+            for domain in chunk:
+                self.expected[domain] = self.expected.get(domain, 0) + 1
+            if missing:
+                self.existing.update(self.mule.storage.fetch_many(missing))
+            yield chunk
+
+    def complete(self, domain: Domain, records: List[Record]):
+        self.queried.append((domain, records))
+
+    def _process(self, domain: Domain, records: List[Record]) -> Result:
+        result = self.existing.get(domain, None)
+        if result is None:
+            result = Result(name=domain)
+        self.mule._run(self.plan, records, result)
+        remaining = self.expected.pop(domain) - 1
+        if remaining:
+            self.expected[domain] = remaining
+            self.existing[domain] = result
+        else:
+            self.existing.pop(domain, None)
+        return result
+
+    def flush(self, force: bool = False) -> List[Result]:
+        if self.queried and (force or len(self.queried) >= self.chunk_size):
+            queried, self.queried = self.queried, []
+            completed = []
+            for chunk in chunked(queried, self.chunk_size):
+                self.plan.prefetch([record for _, records in chunk for record in records])
+                results = [self._process(domain, records) for domain, records in chunk]
+                self.mule.storage.store_many([*{id(result): result for result in results}.values()])
+                if self.checkpoint is not None:
+                    for result in results:
+                        self.checkpoint.complete(result.name)
+                completed.extend(results)
+            return completed
+        return []
+
+    def close(self):
+        self.flush(force=True)
+        if self.checkpoint is not None:
+            self.checkpoint.save()
@@ -1,3 +1,4 @@
+from .cached import CachedBackend
 from .csvfile import CSVBackend
 from .data import DataBackend
 from .doh import DoHBackend
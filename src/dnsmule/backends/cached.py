@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+from functools import partial
+from logging import getLogger
+from pathlib import Path
+from time import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+from ..api import Backend, AsyncBackend, NegativeAnswer, Record, Domain, RRType
+from ..utils import LRUCache
+
+LOGGER = 'dnsmule.backends.cached'
+
+
+class CachedBackend(AsyncBackend):
+    """
+    Caches responses of another backend by queried name and record type
+
+    The record types missing from the cache are queried from the wrapped backend at once
+    and the records returned for each type are cached together.
+    Entries expire after the smallest TTL of the cached records.
+    Records without a TTL use the default ttl. Empty responses are cached for the SOA minimum of the zone
+    given by the ``dnspython`` and ``doh`` backends, or for the negative ttl if the backend does not give it.
+    Failed queries are not cached if the wrapped backend tells them apart from empty responses.
+
+    The wrapped backend is queried asynchronously from ``scan_async`` if it is an ``AsyncBackend``,
+    otherwise it is queried in the default executor of the running loop.
+
+    Can be configured with::
+
+        backend       <dict>  Wrapped backend configuration
+        max_entries   <int>   Maximum number of cached responses (default: 10000)
+        default_ttl   <int>   Seconds to cache records without a TTL (default: 300)
+        negative_ttl  <int>   Seconds to cache empty responses without an SOA (default: 300)
+        min_ttl       <int>   Minimum seconds to cache a response (default: 0)
+        max_ttl       <int>   Maximum seconds to cache a response (default: 86400)
+        file          <str>   File to load the cache from on enter and to save it to on exit (optional)
+
+    Records loaded from the file only retain their text data.
+    """
+    type = 'cached'
+
+    backend: Backend
+
+    def __init__(
+            self,
+            *,
+            backend: Backend,
+            max_entries: int = 10000,
+            default_ttl: int = 300,
+            negative_ttl: int = 300,
+            min_ttl: int = 0,
+            max_ttl: int = 86400,
+            file: Union[str, Path] = None,
+    ):
+        super().__init__()
+        self.backend = backend
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.file = file
+        self._cache: LRUCache[Tuple[Domain, RRType], List[Record]] = LRUCache(max_entries=max_entries)
+
+    @property
+    def stats(self):
+        """Hit, miss, eviction and size statistics
+        """
+        return self._cache.stats
+
+    def __enter__(self):
+        self.backend.__enter__()
+        if self.file is not None and os.path.exists(self.file):
+            self._load()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if self.file is not None:
+                self._save()
+        finally:
+            self.backend.__exit__(exc_type, exc_val, exc_tb)
+
+    def _load(self):
+        with open(self.file, 'r') as f:
+            entries = json.load(f)
+        now = time()
+        for entry in entries:
+            if entry['expires'] <= now:
+                continue
+            key = (Domain(entry['name']), RRType.from_any(entry['type']))
+            records = [
+                Record(Domain(name), RRType.from_any(type), data, ttl)
+                for name, type, data, ttl in entry['records']
+            ]
+            self._cache.set(key, records, ttl=entry['expires'] - now)
+        getLogger(LOGGER).debug('Loaded %d cached responses', len(self._cache))
+
+    def _save(self):
+        entries = [
+            {
+                'name': name,
+                'type': int(type),
+                'expires': expires,
+                'records': [
+                    [record.name, int(record.type), record.text, record.ttl]
+                    for record in records
+                ],
+            }
+            for (name, type), records, expires in self._cache.entries()
+        ]
+        temporary = f'{self.file}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(entries, f)
+        os.replace(temporary, self.file)
+        getLogger(LOGGER).debug('Saved %d cached responses', len(entries))
+
+    def _ttl(self, records: List[Record]) -> float:
+        if records:
+            ttl = min(self.default_ttl if record.ttl is None else record.ttl for record in records)
+        elif isinstance(records, NegativeAnswer):
+            ttl = records.ttl
+        else:
+            ttl = self.negative_ttl
+        return min(max(ttl, self.min_ttl), self.max_ttl)
+
+    def _lookup(self, domain: Domain, types: Iterable[RRType]) -> Tuple[Dict[RRType, List[Record]], List[RRType]]:
+        cached = {}
+        missing = []
+        for type in types:
+            records: Optional[List[Record]] = self._cache.get((domain, type))
+            if records is None:
+                missing.append(type)
+            else:
+                cached[type] = records
+        return cached, missing
+
+    def _update(self, domain: Domain, answers: Dict[RRType, Optional[List[Record]]]):
+        for type, records in answers.items():
+            if records is not None:
+                ttl = self._ttl(records)
+                if ttl > 0:
+                    self._cache.set((domain, type), records, ttl=ttl)
+
+    def scan_by_type(self, domain: Domain, *types: RRType) -> Dict[RRType, Optional[List[Record]]]:
+        cached, missing = self._lookup(domain, types)
+        if missing:
+            answers = self.backend.scan_by_type(domain, *missing)
+            self._update(domain, answers)
+            cached.update(answers)
+        return {type: cached.get(type) for type in types}
+
+    async def scan_by_type_async(self, domain: Domain, *types: RRType) -> Dict[RRType, Optional[List[Record]]]:
+        cached, missing = self._lookup(domain, types)
+        if missing:
+            if isinstance(self.backend, AsyncBackend):
+                answers = await self.backend.scan_by_type_async(domain, *missing)
+            else:
+                answers = await asyncio.get_running_loop().run_in_executor(
+                    None,
+                    partial(self.backend.scan_by_type, domain, *missing),
+                )
+            self._update(domain, answers)
+            cached.update(answers)
+        return {type: cached.get(type) for type in types}
+
+    def scan(self, domain: Domain, *types: RRType) -> Iterable[Record]:
+        answers = self.scan_by_type(domain, *types)
+        for type in types:
+            yield from answers[type] or ()
+
+    async def scan_async(self, domain: Domain, *types: RRType) -> AsyncIterator[Record]:
+        answers = await self.scan_by_type_async(domain, *types)
+        for type in types:
+            for record in answers[type] or ():
+                yield record
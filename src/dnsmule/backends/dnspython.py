@@ -1,18 +1,30 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from logging import getLogger
-from typing import Dict, Any, Callable, Coroutine, Iterable
+from time import monotonic
+from typing import Dict, Any, Callable, Coroutine, Iterable, AsyncIterator, Optional, List
 
+from dns import asyncquery
 from dns.exception import DNSException
 from dns.message import Message, make_query
 from dns.query import udp_with_fallback, https, quic, udp, tcp, tls
+from dns.rcode import Rcode
 from dns.rdata import Rdata
 from dns.rdatatype import RdataType
 from dns.resolver import Resolver
 from dns.rrset import RRset
 
-from ..api import Backend, Record, Domain, RRType
+from .resolvers import ResolverPool
+from ..api import AsyncBackend, NegativeAnswer, Record, Domain, RRType
+from ..utils import RateLimiter
 
 LOGGER = 'dnsmule.backends.dnspython'
 
+FAILURE_RCODES = {Rcode.SERVFAIL, Rcode.REFUSED}
+"""Response codes of overloaded or rate limiting resolvers that are retried
+"""
+
 
 def default_query(query: Message, *args, **kwargs):
     response, used_tcp = udp_with_fallback(query, *args, **kwargs)
@@ -21,6 +33,13 @@ def default_query(query: Message, *args, **kwargs):
     return response
 
 
+async def default_query_async(query: Message, *args, **kwargs):
+    response, used_tcp = await asyncquery.udp_with_fallback(query, *args, **kwargs)
+    if used_tcp:
+        getLogger(LOGGER).debug('Used TCP fallback query\n%s', query)
+    return response
+
+
 def message_to_record(message: Message) -> Iterable[Record]:
     result_set: RRset
     record_data: Rdata
@@ -32,27 +51,50 @@ def message_to_record(message: Message) -> Iterable[Record]:
                 type=rtype,
                 name=Domain(result_set.name.to_text(omit_final_dot=True)),
                 data=record_data,
+                ttl=result_set.ttl,
             )
 
 
+def message_to_answer(message: Optional[Message]) -> Optional[List[Record]]:
+    """
+    Records of a successful response, including empty NOERROR and NXDOMAIN responses, or None for failures
+
+    Empty responses with an SOA record in the authority section are given as a ``NegativeAnswer``.
+    """
+    if message is None or message.rcode() in FAILURE_RCODES:
+        return None
+    records = [*message_to_record(message)]
+    if not records:
+        for result_set in message.authority:
+            if result_set.rdtype == RdataType.SOA and result_set:
+                return NegativeAnswer(min(result_set.ttl, result_set[0].minimum))
+    return records
+
+
 class DNSPythonRecord(Record):
+    __slots__ = ()
+
     data: Rdata
 
-    @property
-    def text(self) -> str:
-        return self.data.to_text().removeprefix('"').removesuffix('"')
+    def _to_text(self) -> str:
+        return self._data.to_text().removeprefix('"').removesuffix('"')
 
     def __getattr__(self, item):
-        return getattr(self.data, item)
+        if item.startswith('_'):
+            raise AttributeError(item)
+        return getattr(self._data, item)
 
 
 Querier = Callable[..., Coroutine[Any, Any, Message]]
 
 
-class DNSPythonBackend(Backend):
+class DNSPythonBackend(AsyncBackend):
     """
     DNSPython backend for querying DNS records
 
+    Supports asyncio through ``scan_async``, which queries all record types of a domain concurrently
+    using the matching ``dns.asyncquery`` querier.
+
     Can be configured with::
 
         timeout     <int>   Timeout for queries
@@ -61,6 +103,34 @@ class DNSPythonBackend(Backend):
                             Default: tcp with udp fallback
         resolver    <str>   Resolver address to use for DNS queries
                             Default: System default from `Resolver().nameservers[0]`
+        resolvers   <list>  Resolver addresses to spread queries over instead of a single resolver
+        strategy    <str>   Resolver selection with multiple resolvers, round-robin or least-latency
+                            Default: round-robin
+        max_failures    <int>   Consecutive failures before a resolver is skipped
+                                Default: 3
+        recovery_time   <float> Seconds an unhealthy resolver is skipped before trying it again
+                                Default: 30
+        parallel_types  <bool>  Query all record types of a domain at the same time
+                                using a thread pool shared by the backend
+                                The pool exists while the backend is entered, otherwise types are queried in turn
+                                Default: false
+        workers     <int>   Maximum threads for parallel type queries
+                            Default: ThreadPoolExecutor default
+        rate        <float> Maximum queries per second
+                            Default: unlimited
+        burst       <int>   Queries allowed at once after being idle
+                            Default: one second worth of queries
+        max_in_flight   <int>   Maximum concurrent queries over all resolvers
+                                Default: unlimited
+        adaptive    <bool>  Lower the rate while timeouts, SERVFAIL or REFUSED responses are frequent
+                            Default: false
+        retries     <int>   Retries for failed queries, each on a different resolver if available
+                            Default: one try on every resolver
+
+    All queries go through the same limiter, including queries from rules like ``PTRScan``.
+    Timeouts and socket errors count as failed queries for the limiter and the resolver pool.
+    Failed queries are logged as errors once they run out of retries.
+    The limiter and per-resolver statistics are available from ``stats``.
     """
     type = 'dnspython'
 
@@ -73,7 +143,17 @@ class DNSPythonBackend(Backend):
         'default': default_query,
     }
 
+    _SUPPORTED_ASYNC_QUERY_TYPES: Dict[str, Querier] = {
+        'tcp': asyncquery.tcp,
+        'udp': asyncquery.udp,
+        'tls': asyncquery.tls,
+        'quic': asyncquery.quic,
+        'https': asyncquery.https,
+        'default': default_query_async,
+    }
+
     _querier: Querier
+    _async_querier: Querier
 
     def __init__(
             self,
@@ -81,34 +161,164 @@ class DNSPythonBackend(Backend):
             timeout: float = 2,
             querier: str = 'default',
             resolver: str = None,
+            resolvers: List[str] = None,
+            strategy: str = 'round-robin',
+            max_failures: int = 3,
+            recovery_time: float = 30.,
+            parallel_types: bool = False,
+            workers: int = None,
+            rate: float = None,
+            burst: int = None,
+            max_in_flight: int = None,
+            adaptive: bool = False,
+            retries: int = None,
     ):
         super(DNSPythonBackend, self).__init__()
         self.timeout = timeout
         self.querier = querier
         self.resolver = resolver
+        self.parallel_types = parallel_types
+        self.workers = workers
+        self.limiter = RateLimiter(
+            rate=rate,
+            burst=burst,
+            max_in_flight=max_in_flight,
+            adaptive=adaptive,
+        )
         self._logger = getLogger(LOGGER)
         try:
             self._querier = DNSPythonBackend._SUPPORTED_QUERY_TYPES[self.querier]
+            self._async_querier = DNSPythonBackend._SUPPORTED_ASYNC_QUERY_TYPES[self.querier]
         except KeyError:
             raise ValueError(f'Invalid query mode ({self.querier})')
-        if not self.resolver:
-            self.resolver = Resolver().nameservers[0]
-        self._logger.debug('Resolver: %s', self.resolver)
+        if resolvers:
+            self.resolvers = [*resolvers]
+            self.resolver = self.resolvers[0]
+        else:
+            if not self.resolver:
+                self.resolver = Resolver().nameservers[0]
+            self.resolvers = [self.resolver]
+        self.pool = ResolverPool(
+            self.resolvers,
+            strategy=strategy,
+            max_failures=max_failures,
+            recovery_time=recovery_time,
+        )
+        self.retries = retries if retries is not None else len(self.resolvers) - 1
+        self._logger.debug('Resolvers: %s', self.resolvers)
+
+    def __enter__(self):
+        if self.parallel_types:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers)
+            self._executor.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.parallel_types:
+            self._executor.__exit__(exc_type, exc_val, exc_tb)
+            del self._executor
+
+    @property
+    def stats(self):
+        return {
+            **self.limiter.stats,
+            'resolvers': self.pool.stats,
+        }
+
+    def _release(self, resolver: str, started: float, success: bool):
+        self.pool.release(resolver, monotonic() - started, success)
+        self.limiter.release(success=success)
+
+    def _handle_response(self, query: Message, resolver: str, started: float, response: Message, attempt: int) -> bool:
+        """Releases the query and returns True if the response should be used
+        """
+        failed = response.rcode() in FAILURE_RCODES
+        self._release(resolver, started, success=not failed)
+        if failed and attempt == self.retries:
+            self._logger.error('%s (%s, %s)\n%s', 'Failed query', resolver, Rcode.to_text(response.rcode()), query)
+        return not failed or attempt == self.retries
+
+    def _handle_error(self, query: Message, resolver: str, started: float, error: Exception, attempt: int):
+        self._release(resolver, started, success=False)
+        if attempt == self.retries:
+            self._logger.error('%s (%s)\n%s', 'Failed query', resolver, query, exc_info=error)
+        else:
+            self._logger.debug('%s (%s)\n%s', 'Retrying query', resolver, query, exc_info=error)
+
+    def _single_query(self, host: str, dns_type: int) -> Optional[Message]:
+        query = make_query(host, RdataType.make(dns_type))
+        tried = []
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            resolver = self.pool.acquire(exclude=tried)
+            tried.append(resolver)
+            started = monotonic()
+            try:
+                response = self._querier(query, resolver, timeout=self.timeout)
+            except (DNSException, OSError) as e:
+                self._handle_error(query, resolver, started, e, attempt)
+                continue
+            except BaseException:
+                self._release(resolver, started, success=False)
+                raise
+            if self._handle_response(query, resolver, started, response, attempt):
+                return response
+
+    def _responses(self, host: str, *types: int) -> Iterable[Optional[Message]]:
+        executor: Optional[ThreadPoolExecutor] = getattr(self, '_executor', None)
+        if executor is not None and len(types) > 1:
+            return executor.map(partial(self._single_query, host), types)
+        else:
+            return map(partial(self._single_query, host), types)
 
     def _dns_query(
             self,
             host: str,
             *types: int,
     ) -> Iterable[Message]:
-        for dns_type in types:
-            query = make_query(host, RdataType.make(dns_type))
-            try:
-                response = self._querier(query, self.resolver, timeout=self.timeout)
+        for response in self._responses(host, *types):
+            if response is not None:
                 yield response
-            except DNSException as e:
-                self._logger.error('%s\n%s', 'Failed query', query, exc_info=e)
 
     def scan(self, target: Domain, *types: RRType) -> Iterable[Record]:
         for message in self._dns_query(target, *types):
             for record in message_to_record(message):
                 yield record
+
+    def scan_by_type(self, target: Domain, *types: RRType) -> Dict[RRType, Optional[List[Record]]]:
+        return {
+            dns_type: message_to_answer(response)
+            for dns_type, response in zip(types, self._responses(target, *types))
+        }
+
+    async def _dns_query_async(self, host: str, dns_type: int) -> Optional[Message]:
+        query = make_query(host, RdataType.make(dns_type))
+        tried = []
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire_async()
+            resolver = self.pool.acquire(exclude=tried)
+            tried.append(resolver)
+            started = monotonic()
+            try:
+                response = await self._async_querier(query, resolver, timeout=self.timeout)
+            except (DNSException, OSError) as e:
+                self._handle_error(query, resolver, started, e, attempt)
+                continue
+            except BaseException:
+                self._release(resolver, started, success=False)
+                raise
+            if self._handle_response(query, resolver, started, response, attempt):
+                return response
+
+    async def scan_by_type_async(self, target: Domain, *types: RRType) -> Dict[RRType, Optional[List[Record]]]:
+        responses = await asyncio.gather(*(self._dns_query_async(target, dns_type) for dns_type in types))
+        return {
+            dns_type: message_to_answer(response)
+            for dns_type, response in zip(types, responses)
+        }
+
+    async def scan_async(self, target: Domain, *types: RRType) -> AsyncIterator[Record]:
+        for message in await asyncio.gather(*(self._dns_query_async(target, dns_type) for dns_type in types)):
+            if message is not None:
+                for record in message_to_record(message):
+                    yield record
@@ -1,9 +1,27 @@
-from http.client import HTTPSConnection
-from json import load
-from typing import Iterable
+from base64 import urlsafe_b64encode
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from http.client import HTTPSConnection, HTTPException
+from json import loads
+from logging import getLogger
+from queue import LifoQueue
+from typing import Iterable, Optional, List, Tuple, Dict
 from urllib.parse import urlencode, urlparse
 
-from ..api import Backend, Record, Domain, RRType
+from ..api import Backend, NegativeAnswer, Record, Domain, RRType
+from ..utils import RateLimiter
+
+LOGGER = 'dnsmule.backends.doh'
+
+FAILURE_STATUSES = {2, 5}
+"""SERVFAIL and REFUSED response codes that are retried
+"""
+
+CONTENT_TYPES = {
+    'json': 'application/dns-json',
+    'wire': 'application/dns-message',
+}
 
 
 class DoHRecord(Record):
@@ -12,6 +30,8 @@ class DoHRecord(Record):
 
     Overrides the text attribute to produce data as the 'data' key from the JSON
     """
+    __slots__ = ()
+
     data: dict
 
     def __init__(self, data: dict):
@@ -19,51 +39,203 @@ class DoHRecord(Record):
             name=Domain(data['name'].removesuffix('.')),
             type=RRType.from_any(data['type']),
             data=data,
+            ttl=data.get('TTL'),
         )
 
-    @property
-    def text(self) -> str:
-        return self.data['data']
+    def _to_text(self) -> str:
+        return self._data['data']
 
 
 class DoHBackend(Backend):
     """
     Queries DoH JSON endpoints like Google has: https://dns.google/resolve?name=example.com&type=1
+    or RFC 8484 endpoints using the binary DNS message format like https://dns.google/dns-query
 
     - https://developers.cloudflare.com/1.1.1.1/encryption/dns-over-https/
     - https://developers.google.com/speed/public-dns/docs/doh
+    - https://www.rfc-editor.org/rfc/rfc8484
+
+    Can be configured with::
 
-    Only config attribute is the URL::
+        url         <str>   Query endpoint address e.g: https://dns.google/resolve
+        format      <str>   Response format, json or wire (default: json)
+                            The wire format requires dnspython to be installed
+        connections <int>   Maximum number of kept-alive connections and concurrent requests (default: 4)
+        timeout     <float> Connection timeout in seconds (default: 5)
+        rate        <float> Maximum queries per second (default: unlimited)
+        burst       <int>   Queries allowed at once after being idle (default: one second worth of queries)
+        adaptive    <bool>  Lower the rate while SERVFAIL, REFUSED or HTTP 429 and 5xx responses are frequent
+        retries     <int>   Retries for failed queries (default: 0)
 
-        url <str>   Query endpoint address e.g: https://dns.google/resolve
+    Record types of a domain are queried concurrently over the pooled connections.
+    Connections closed by the server are reconnected and the request is sent again.
+    Timeouts and other connection errors drop the connection and count as failed queries,
+    which are retried and logged as errors once they run out of retries.
+    The limiter statistics are available from ``stats``.
     """
     type = 'doh'
 
-    def __init__(self, *, url: str):
+    def __init__(
+            self,
+            *,
+            url: str,
+            format: str = 'json',
+            connections: int = 4,
+            timeout: float = 5.,
+            rate: float = None,
+            burst: int = None,
+            adaptive: bool = False,
+            retries: int = 0,
+    ):
         super().__init__()
+        if format not in CONTENT_TYPES:
+            raise ValueError(f'Invalid DoH format ({format})')
+        if connections < 1:
+            raise ValueError('Connections must be at least one', connections)
+        if format == 'wire':
+            import dns.message  # noqa: F401
         self.url = url
+        self.format = format
+        self.connections = connections
+        self.timeout = timeout
+        self.retries = retries
+        self.limiter = RateLimiter(rate=rate, burst=burst, adaptive=adaptive)
+        self._logger = getLogger(LOGGER)
+
+    @property
+    def stats(self):
+        return self.limiter.stats
 
     def __enter__(self):
         self._url = urlparse(self.url)
-        self._client = HTTPSConnection(host=self._url.hostname, port=self._url.port)
+        self._pool = LifoQueue()
+        for _ in range(self.connections):
+            self._pool.put(None)
+        if self.connections > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self.connections)
+            self._executor.__enter__()
         return self
 
-    def __exit__(self, *_):
-        self._client.close()
-        del self._client
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.connections > 1:
+            self._executor.__exit__(exc_type, exc_val, exc_tb)
+            del self._executor
+        while not self._pool.empty():
+            client = self._pool.get_nowait()
+            if client is not None:
+                client.close()
+        del self._pool
 
-    def scan(self, domain: Domain, *types: RRType) -> Iterable[Record]:
-        domain = domain.encode('idna').decode()
-        for type in types:
-            params = urlencode({
+    def _connect(self) -> HTTPSConnection:
+        return HTTPSConnection(host=self._url.hostname, port=self._url.port, timeout=self.timeout)
+
+    @contextmanager
+    def _connection(self, fresh: bool = False):
+        """Takes a connection from the pool, waiting if all are in use, and discards it on errors
+        """
+        client = self._pool.get()
+        try:
+            if client is not None and fresh:
+                client.close()
+                client = None
+            if client is None:
+                client = self._connect()
+            yield client
+        except BaseException:
+            if client is not None:
+                client.close()
+                client = None
+            raise
+        finally:
+            self._pool.put(client)
+
+    def _send(self, path: str, headers: Dict[str, str], fresh: bool = False) -> Tuple[int, bytes]:
+        with self._connection(fresh=fresh) as client:
+            client.request('GET', path, headers=headers)
+            response = client.getresponse()
+            try:
+                return response.status, response.read()
+            finally:
+                response.close()
+
+    def _get(self, params: str) -> Tuple[int, bytes]:
+        path = f'{self._url.path or "/"}?{params}'
+        headers = {'Accept': CONTENT_TYPES[self.format]}
+        try:
+            return self._send(path, headers)
+        except (ConnectionError, HTTPException) as e:
+            self._logger.debug('Reconnecting to %s', self._url.hostname, exc_info=e)
+            return self._send(path, headers, fresh=True)
+
+    def _params(self, domain: str, type: RRType) -> str:
+        if self.format == 'wire':
+            from dns.message import make_query
+            query = make_query(domain, int(type))
+            query.id = 0
+            return urlencode({'dns': urlsafe_b64encode(query.to_wire()).rstrip(b'=').decode()})
+        else:
+            return urlencode({
                 'name': domain,
                 'type': int(type),
             })
-            self._client.request('GET', f'{self.url}?{params}')
-            response = self._client.getresponse()
+
+    def _parse(self, body: bytes) -> Tuple[List[Record], int]:
+        if self.format == 'wire':
+            from dns.message import from_wire
+            from .dnspython import message_to_answer
+            message = from_wire(body)
+            answer = message_to_answer(message)
+            return [] if answer is None else answer, message.rcode()
+        else:
+            data = loads(body)
+            records = [DoHRecord(result) for result in data.get('Answer', [])]
+            if not records:
+                for soa in data.get('Authority', []):
+                    if soa.get('type') == int(RRType.SOA):
+                        minimum = int(soa['data'].split()[-1])
+                        records = NegativeAnswer(min(soa.get('TTL', minimum), minimum))
+                        break
+            return records, data.get('Status')
+
+    def _query(self, domain: str, type: RRType) -> Optional[List[Record]]:
+        """Records of the answer, or None if the query failed
+        """
+        params = self._params(domain, type)
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
             try:
-                data = load(response)
-                for result in data.get('Answer', []):
-                    yield DoHRecord(result)
-            finally:
-                response.close()
+                status, body = self._get(params)
+            except (OSError, HTTPException) as e:
+                self.limiter.release(success=False)
+                if attempt == self.retries:
+                    self._logger.error('Failed query (%s): %s', e.__class__.__name__, params, exc_info=e)
+                    return None
+                self._logger.debug('Retrying query (%s): %s', e.__class__.__name__, params, exc_info=e)
+                continue
+            except BaseException:
+                self.limiter.release(success=False)
+                raise
+            records, code = self._parse(body) if status < 400 else (None, None)
+            overloaded = status == 429 or status >= 500 or code in FAILURE_STATUSES
+            self.limiter.release(success=not overloaded)
+            if not overloaded or attempt == self.retries:
+                if overloaded or records is None:
+                    self._logger.error('Failed query (HTTP %s, Status %s): %s', status, code, params)
+                    return None
+                return records
+
+    def _answers(self, domain: Domain, *types: RRType) -> Iterable[Optional[List[Record]]]:
+        domain = domain.encode('idna').decode()
+        if self.connections > 1 and len(types) > 1:
+            return self._executor.map(partial(self._query, domain), types)
+        else:
+            return map(partial(self._query, domain), types)
+
+    def scan(self, domain: Domain, *types: RRType) -> Iterable[Record]:
+        for records in self._answers(domain, *types):
+            if records is not None:
+                for record in records:
+                    yield record
+
+    def scan_by_type(self, domain: Domain, *types: RRType) -> Dict[RRType, Optional[List[Record]]]:
+        return dict(zip(types, self._answers(domain, *types)))
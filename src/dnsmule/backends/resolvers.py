@@ -0,0 +1,134 @@
+from itertools import count
+from threading import Lock
+from time import monotonic
+from typing import List, Dict, Any, Optional, Collection
+
+
+class ResolverStats:
+    """
+    Health and latency of a single resolver in a pool
+    """
+
+    LATENCY_WEIGHT = .3
+    """Weight of new samples in the moving average of latency
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+        self.queries = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self.unhealthy_until: Optional[float] = None
+
+    def healthy(self, now: float) -> bool:
+        return self.unhealthy_until is None or self.unhealthy_until <= now
+
+    def record(self, latency: float):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += (latency - self.latency) * self.LATENCY_WEIGHT
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'queries': self.queries,
+            'failures': self.failures,
+            'in_flight': self.in_flight,
+            'latency': self.latency,
+            'healthy': self.healthy(monotonic()),
+        }
+
+
+class ResolverPool:
+    """
+    Thread safe pool of resolvers with load balancing and failover
+
+    Resolvers are selected in turns with ``round-robin``
+    or by the lowest average latency weighted by in-flight queries with ``least-latency``.
+
+    A resolver failing ``max_failures`` times in a row is skipped for ``recovery_time`` seconds,
+    after which it is tried again and kept if the query succeeds.
+    If all resolvers are unhealthy the one that recovers first is used.
+    """
+
+    STRATEGIES = ('round-robin', 'least-latency')
+
+    def __init__(
+            self,
+            addresses: List[str],
+            strategy: str = 'round-robin',
+            max_failures: int = 3,
+            recovery_time: float = 30.,
+    ):
+        if not addresses:
+            raise ValueError('No resolvers')
+        if strategy not in ResolverPool.STRATEGIES:
+            raise ValueError(f'Invalid resolver strategy ({strategy})')
+        self.addresses = [*addresses]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.recovery_time = recovery_time
+        self._resolvers = {address: ResolverStats(address) for address in self.addresses}
+        self._turns = count()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self.addresses)
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {address: resolver.to_dict() for address, resolver in self._resolvers.items()}
+
+    def _candidates(self, exclude: Collection[str], now: float) -> List[ResolverStats]:
+        available = [self._resolvers[address] for address in self.addresses if address not in exclude]
+        if not available:
+            available = [*self._resolvers.values()]
+        healthy = [resolver for resolver in available if resolver.healthy(now)]
+        if healthy:
+            return healthy
+        return [min(available, key=lambda resolver: resolver.unhealthy_until)]
+
+    def acquire(self, exclude: Collection[str] = ()) -> str:
+        """
+        Selects a resolver for a query
+
+        :param exclude: Resolvers already tried for the query, used only if there are no other resolvers
+        :return:        Resolver address to be released after the query
+        """
+        with self._lock:
+            candidates = self._candidates(exclude, monotonic())
+            if self.strategy == 'round-robin' or len(candidates) == 1:
+                resolver = candidates[next(self._turns) % len(candidates)]
+            else:
+                resolver = min(
+                    candidates,
+                    key=lambda candidate: (candidate.latency or 0) * (1 + candidate.in_flight),
+                )
+            resolver.in_flight += 1
+            resolver.queries += 1
+            return resolver.address
+
+    def release(self, address: str, latency: float, success: bool):
+        """
+        Records the outcome of a query
+
+        :param address: Resolver address from acquire
+        :param latency: Seconds the query took
+        :param success: False for timeouts and server failures
+        """
+        with self._lock:
+            resolver = self._resolvers[address]
+            resolver.in_flight -= 1
+            resolver.record(latency)
+            if success:
+                resolver.consecutive_failures = 0
+                resolver.unhealthy_until = None
+            else:
+                resolver.failures += 1
+                resolver.consecutive_failures += 1
+                if resolver.consecutive_failures >= self.max_failures:
+                    resolver.unhealthy_until = monotonic() + self.recovery_time
+
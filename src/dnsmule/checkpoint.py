@@ -0,0 +1,100 @@
+import json
+import os
+from bisect import insort
+from collections import deque
+from pathlib import Path
+from time import monotonic
+from typing import Union, Iterable, Iterator, Dict, Deque, List
+
+from .api import Domain
+
+
+class Checkpoint:
+    """
+    Records the completed targets of a multi-domain scan
+
+    Targets are identified by their position in the input.
+    Completed targets are stored as an offset below which every target is complete
+    and a sorted list of the completed targets after the offset.
+
+    The checkpoint is saved to the file every ``save_every`` completed targets,
+    every ``save_interval`` seconds when targets complete and when the scan ends.
+
+    **Note:** Resuming requires the same input in the same order
+    """
+    offset: int
+    completed: List[int]
+
+    def __init__(
+            self,
+            file: Union[str, Path],
+            resume: bool = False,
+            save_every: int = 1000,
+            save_interval: float = 10.,
+    ):
+        self.file = file
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self.offset = 0
+        self.completed = []
+        self._completed = set()
+        self._pending: Dict[Domain, Deque[int]] = {}
+        self._unsaved = 0
+        self._last_save = monotonic()
+        if resume and os.path.exists(file):
+            self.load()
+
+    def load(self):
+        with open(self.file, 'r') as f:
+            data = json.load(f)
+        self.offset = data['offset']
+        self.completed = sorted(data['completed'])
+        self._completed = {*self.completed}
+
+    def save(self):
+        temporary = f'{self.file}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'offset': self.offset, 'completed': self.completed}, f)
+        os.replace(temporary, self.file)
+        self._unsaved = 0
+        self._last_save = monotonic()
+
+    def is_complete(self, index: int) -> bool:
+        return index < self.offset or index in self._completed
+
+    def track(self, domains: Iterable[str]) -> Iterator[Domain]:
+        """
+        Skips completed targets and tracks the positions of the remaining ones
+
+        :param domains: Scan input
+        :return:        Targets not yet completed
+        """
+        for index, domain in enumerate(domains):
+            if not self.is_complete(index):
+                domain = Domain(domain)
+                self._pending.setdefault(domain, deque()).append(index)
+                yield domain
+
+    def complete(self, domain: Domain):
+        """Marks the earliest pending target for the domain as completed
+        """
+        indices = self._pending[domain]
+        index = indices.popleft()
+        if not indices:
+            del self._pending[domain]
+        if index == self.offset:
+            self.offset += 1
+            while self.completed and self.completed[0] == self.offset:
+                self._completed.discard(self.completed.pop(0))
+                self.offset += 1
+        else:
+            insort(self.completed, index)
+            self._completed.add(index)
+        self._unsaved += 1
+        if self._unsaved >= self.save_every or monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+
+__all__ = [
+    'Checkpoint',
+]
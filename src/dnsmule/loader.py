@@ -3,9 +3,10 @@ from pathlib import Path
 from typing import cast, Union, IO
 
 from . import backends
+from . import queues
 from . import rules
 from . import storages
-from .api import Backend, Storage, Rules, DNSMule, Rule, BatchRule
+from .api import Backend, Storage, Rules, DNSMule, Rule, BatchRule, WorkQueue
 from .rrtype import RRType
 
 
@@ -26,6 +27,30 @@ def instantiate_from_config(*sources: object, config: dict) -> object:
     return type(**config.get('config', {}))
 
 
+def instantiate_wrapper_from_config(*sources: object, key: str, config: dict) -> object:
+    """
+    Instantiates a type that can wrap another instance of the same kind
+
+    Any nested configuration under the given key is instantiated first::
+
+        type: buffered
+        config:
+          storage:
+            type: sqlite
+            config: { }
+    """
+    params = config.get('config', {})
+    if isinstance(params.get(key, None), dict):
+        config = {
+            **config,
+            'config': {
+                **params,
+                key: instantiate_wrapper_from_config(*sources, key=key, config=params[key]),
+            },
+        }
+    return instantiate_from_config(*sources, config=config)
+
+
 def instantiate_rules_from_config(*sources: object, config: list) -> Rules:
     ruleset = Rules()
     for item in config:
@@ -58,17 +83,19 @@ def load_config(config: dict) -> DNSMule:
     return DNSMule(
         storage=cast(
             Storage,
-            instantiate_from_config(
+            instantiate_wrapper_from_config(
                 storages,
                 *plugins,
+                key='storage',
                 config=config['storage'],
             )
         ),
         backend=cast(
             Backend,
-            instantiate_from_config(
+            instantiate_wrapper_from_config(
                 backends,
                 *plugins,
+                key='backend',
                 config=config['backend'],
             )
         ),
@@ -77,6 +104,14 @@ def load_config(config: dict) -> DNSMule:
             *plugins,
             config=config['rules'],
         ),
+        queue=cast(
+            WorkQueue,
+            instantiate_from_config(
+                queues,
+                *plugins,
+                config=config['queue'],
+            )
+        ) if 'queue' in config else None,
     )
 
 
@@ -0,0 +1,102 @@
+import json
+from time import monotonic
+from typing import BinaryIO, Dict, Any, List
+
+from .api import Result, RRType
+from .utils import jsonize
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def result_to_json(result: Result) -> Dict[str, Any]:
+    return {
+        'name': result.name,
+        'types': [*map(RRType.to_text, result.types)],
+        'tags': [*result.tags],
+        'data': jsonize(result.data),
+    }
+
+
+def dumps_compact(value: Any) -> bytes:
+    """Serializes a value into a single line of JSON using orjson if it is available
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=str, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class NDJSONWriter:
+    """
+    Buffered writer for newline delimited JSON results
+
+    Results are written as one compact JSON object per line.
+    The buffer is flushed once it has ``flush_count`` results
+    or ``flush_interval`` seconds have passed since the last flush when a result is written.
+    """
+    _buffer: List[bytes]
+
+    def __init__(self, stream: BinaryIO, flush_count: int = 1000, flush_interval: float = 1.):
+        self.stream = stream
+        self.flush_count = flush_count
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._last_flush = monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+
+    def write(self, result: Result):
+        self._buffer.append(dumps_compact(result_to_json(result)))
+        if len(self._buffer) >= self.flush_count or monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._buffer.append(b'')
+            self.stream.write(b'\n'.join(self._buffer))
+            self._buffer.clear()
+        self.stream.flush()
+        self._last_flush = monotonic()
+
+
+class JSONWriter:
+    """
+    Writes results as indented JSON objects
+
+    The stream is flushed after every result, so results show up as they complete.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+
+    def write(self, result: Result):
+        self.stream.write(json.dumps(
+            result_to_json(result),
+            indent=4,
+            ensure_ascii=False,
+        ).encode('utf-8'))
+        self.stream.write(b'\n')
+        self.stream.flush()
+
+    def flush(self):
+        self.stream.flush()
+
+
+__all__ = [
+    'result_to_json',
+    'dumps_compact',
+    'NDJSONWriter',
+    'JSONWriter',
+]
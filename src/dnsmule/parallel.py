@@ -0,0 +1,133 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from multiprocessing import get_context
+from multiprocessing.util import Finalize
+from pathlib import Path
+from typing import Iterable, Iterator, Dict, List, Set, Tuple, Union, Optional
+
+from .api import DNSMule, Storage, Domain, Result
+from .checkpoint import Checkpoint
+from .utils import chunked
+
+
+class _ShardStorage(Storage):
+    """
+    Storage of a worker process
+
+    Existing results are given by the parent process, which also stores the results.
+    Results stored by rules for other domains are returned to the parent process with the batch.
+    """
+
+    def __init__(self):
+        self.existing: Dict[Domain, Result] = {}
+        self.written: Dict[Domain, Result] = {}
+
+    def fetch(self, domain: Domain) -> Optional[Result]:
+        result = self.written.get(domain, None)
+        if result is None:
+            result = self.existing.get(domain, None)
+        return result
+
+    def fetch_many(self, domains: Iterable[Domain]) -> Dict[Domain, Result]:
+        found = {}
+        for domain in domains:
+            result = self.fetch(domain)
+            if result is not None:
+                found[domain] = result
+        return found
+
+    def store(self, result: Result) -> None:
+        self.written[result.name] = result
+
+    def store_many(self, results: Iterable[Result]) -> None:
+        for result in results:
+            self.store(result)
+
+
+_worker: Optional[DNSMule] = None
+_worker_options: dict = {}
+
+
+def _init_worker(file: Union[str, Path], concurrency: int, chunk_size: int):
+    global _worker
+    from .loader import load_config_from_file
+    _worker = load_config_from_file(file)
+    _worker.storage = _ShardStorage()
+    _worker.__enter__()
+    _worker_options.update(concurrency=concurrency, chunk_size=chunk_size)
+    Finalize(_worker, _worker.__exit__, args=(None, None, None), exitpriority=10)
+
+
+def _scan_batch(domains: List[Domain], existing: Dict[Domain, Result]) -> Tuple[List[Result], List[Result]]:
+    """Scans a batch of domains and returns their results and the other results stored by rules
+    """
+    _worker.storage.existing = existing
+    try:
+        results = [*_worker.scan_many(domains, **_worker_options)]
+        scanned = {result.name for result in results}
+        return results, [result for result in _worker.storage.written.values() if result.name not in scanned]
+    finally:
+        _worker.storage.existing = {}
+        _worker.storage.written = {}
+
+
+def scan_parallel(
+        mule: DNSMule,
+        file: Union[str, Path],
+        domains: Iterable[str],
+        workers: int = None,
+        concurrency: int = 1,
+        chunk_size: int = 1,
+        batch_size: int = 100,
+        checkpoint: Checkpoint = None,
+) -> Iterator[Result]:
+    if batch_size < 1:
+        raise ValueError('Batch size must be at least one', batch_size)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if checkpoint is not None:
+        domains = checkpoint.track(domains)
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(file, concurrency, chunk_size),
+    )
+    pending: Set[Future] = set()
+    submitted: Dict[Future, List[Domain]] = {}
+    scanning: Set[Domain] = set()
+
+    def complete(done: Iterable[Future]) -> Iterator[Result]:
+        for future in done:
+            scanning.difference_update(submitted.pop(future))
+            results, written = future.result()
+            mule.storage.store_many([*written, *results])
+            if checkpoint is not None:
+                for result in results:
+                    checkpoint.complete(result.name)
+            yield from results
+
+    try:
+        for batch in chunked(map(Domain, domains), batch_size):
+            # A batch with a domain still being scanned waits for its result to be stored
+            while pending and (len(pending) >= 2 * workers or not scanning.isdisjoint(batch)):
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from complete(done)
+            future = executor.submit(_scan_batch, batch, mule.storage.fetch_many(batch))
+            submitted[future] = batch
+            scanning.update(batch)
+            pending.add(future)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from complete(done)
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+        if checkpoint is not None:
+            checkpoint.save()
+
+
+__all__ = [
+    'scan_parallel',
+]
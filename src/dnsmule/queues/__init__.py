@@ -0,0 +1,2 @@
+from .db_redis import RedisQueue
+from .db_sqlite import SQLiteQueue
@@ -0,0 +1,105 @@
+from time import time
+from typing import Iterable, List
+
+from ..api import WorkQueue, Domain
+from ..utils import chunked
+
+PULL_SCRIPT = """
+local visible = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+local pulled = {}
+for _, name in ipairs(visible) do
+    local attempts = redis.call('HINCRBY', KEYS[2], name, 1)
+    if attempts > tonumber(ARGV[4]) then
+        redis.call('ZREM', KEYS[1], name)
+        redis.call('HDEL', KEYS[2], name)
+        redis.call('SADD', KEYS[3], name)
+    else
+        redis.call('ZADD', KEYS[1], ARGV[3], name)
+        table.insert(pulled, name)
+    end
+end
+return pulled
+"""
+
+
+class RedisQueue(WorkQueue):
+    """
+    Work queue in Redis for scanning with multiple processes on multiple hosts
+
+    Queued domains are kept in a sorted set scored by the time they become visible.
+    Pulling moves the score of a domain past the visibility timeout and acknowledging removes it.
+
+    Can be configured with::
+
+        key                 <str>   Prefix for the queue keys (default: dnsmule:queue)
+        visibility_timeout  <float> Seconds a pulled domain is hidden before it is retried (default: 300)
+        max_attempts        <int>   Attempts before a domain is marked as failed (default: 3)
+
+    Any other configuration is passed to the Redis client like for the ``RedisStorage``.
+    """
+    type = 'redis'
+
+    def __init__(
+            self,
+            *,
+            key: str = 'dnsmule:queue',
+            visibility_timeout: float = 300,
+            max_attempts: int = 3,
+            **config,
+    ):
+        super().__init__()
+        self.key = key
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.config = config
+
+    @property
+    def _keys(self):
+        return [f'{self.key}:pending', f'{self.key}:attempts', f'{self.key}:failed']
+
+    def __enter__(self):
+        import redis
+        self._client = redis.Redis(**self.config, decode_responses=True)
+        self._client.ping()
+        self._pull = self._client.register_script(PULL_SCRIPT)
+        return self
+
+    def __exit__(self, *_):
+        self._client.close()
+        del self._pull
+        del self._client
+
+    def push(self, domains: Iterable[Domain]) -> None:
+        for chunk in chunked(domains, 1000):
+            self._client.zadd(self._keys[0], {domain: 0 for domain in chunk}, nx=True)
+
+    def pull(self, count: int) -> List[Domain]:
+        now = time()
+        return [
+            Domain(name)
+            for name in self._pull(
+                keys=self._keys,
+                args=[now, count, now + self.visibility_timeout, self.max_attempts],
+            )
+        ]
+
+    def ack(self, domains: Iterable[Domain]) -> None:
+        domains = [*domains]
+        if domains:
+            pipeline = self._client.pipeline(transaction=True)
+            pipeline.zrem(self._keys[0], *domains)
+            pipeline.hdel(self._keys[1], *domains)
+            pipeline.execute()
+
+    def release(self, domains: Iterable[Domain]) -> None:
+        domains = [*domains]
+        if domains:
+            self._client.zadd(self._keys[0], {domain: 0 for domain in domains}, xx=True)
+
+    def failed(self) -> List[Domain]:
+        return sorted(Domain(name) for name in self._client.smembers(self._keys[2]))
+
+
+__all__ = [
+    'RedisQueue',
+]
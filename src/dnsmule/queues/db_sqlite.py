@@ -0,0 +1,149 @@
+from time import time
+from typing import Iterable, List
+
+from ..api import WorkQueue, Domain
+from ..utils import chunked
+
+
+class SQLiteQueue(WorkQueue):
+    """
+    Work queue in a SQLite database for scanning with multiple processes on a single host
+
+    Can be configured with::
+
+        database            <str>   Database file
+        visibility_timeout  <float> Seconds a pulled domain is hidden before it is retried (default: 300)
+        max_attempts        <int>   Attempts before a domain is marked as failed (default: 3)
+
+    Any other configuration is passed to ``sqlite3.connect``.
+    """
+    type = 'sqlite'
+
+    MAX_VARIABLES = 999
+    """Maximum number of host parameters in a single statement for old SQLite versions
+    """
+
+    def __init__(self, *, visibility_timeout: float = 300, max_attempts: int = 3, **config):
+        super().__init__()
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.config = config
+
+    def __enter__(self):
+        import sqlite3
+        self._client = sqlite3.connect(**{'timeout': 30, **self.config}, isolation_level=None)
+        self.create_schema()
+        return self
+
+    def __exit__(self, *_):
+        self._client.close()
+        del self._client
+
+    def create_schema(self):
+        self._client.executescript(
+            # language=sqlite
+            """
+            CREATE TABLE IF NOT EXISTS queue (
+                name CHAR(255) PRIMARY KEY,
+                visible_at REAL NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS queue_visible ON queue (failed, visible_at);
+            """
+        )
+
+    def push(self, domains: Iterable[Domain]) -> None:
+        self._client.execute('BEGIN IMMEDIATE')
+        try:
+            self._client.executemany(
+                # language=sqlite
+                """
+                INSERT OR IGNORE INTO queue ( name ) 
+                VALUES (?)
+                """,
+                ((domain,) for domain in domains),
+            )
+            self._client.execute('COMMIT')
+        except BaseException:
+            self._client.execute('ROLLBACK')
+            raise
+
+    def pull(self, count: int) -> List[Domain]:
+        now = time()
+        self._client.execute('BEGIN IMMEDIATE')
+        try:
+            self._client.execute(
+                # language=sqlite
+                """
+                UPDATE queue
+                SET failed = 1
+                WHERE failed = 0 AND visible_at <= ? AND attempts >= ?
+                """,
+                (now, self.max_attempts),
+            )
+            names = [
+                row[0]
+                for row in self._client.execute(
+                    # language=sqlite
+                    """
+                    SELECT name
+                    FROM queue
+                    WHERE failed = 0 AND visible_at <= ?
+                    ORDER BY visible_at
+                    LIMIT ?
+                    """,
+                    (now, count),
+                )
+            ]
+            self._client.executemany(
+                # language=sqlite
+                """
+                UPDATE queue
+                SET visible_at = ?, attempts = attempts + 1
+                WHERE name = ?
+                """,
+                ((now + self.visibility_timeout, name) for name in names),
+            )
+            self._client.execute('COMMIT')
+        except BaseException:
+            self._client.execute('ROLLBACK')
+            raise
+        return [Domain(name) for name in names]
+
+    def _update_many(self, statement: str, domains: Iterable[Domain]):
+        self._client.execute('BEGIN IMMEDIATE')
+        try:
+            for chunk in chunked(domains, self.MAX_VARIABLES):
+                self._client.execute(statement.format(', '.join('?' * len(chunk))), chunk)
+            self._client.execute('COMMIT')
+        except BaseException:
+            self._client.execute('ROLLBACK')
+            raise
+
+    def ack(self, domains: Iterable[Domain]) -> None:
+        # language=sqlite
+        self._update_many('DELETE FROM queue WHERE name IN ({})', domains)
+
+    def release(self, domains: Iterable[Domain]) -> None:
+        # language=sqlite
+        self._update_many('UPDATE queue SET visible_at = 0 WHERE failed = 0 AND name IN ({})', domains)
+
+    def failed(self) -> List[Domain]:
+        return [
+            Domain(row[0])
+            for row in self._client.execute(
+                # language=sqlite
+                """
+                SELECT name 
+                FROM queue
+                WHERE failed = 1
+                ORDER BY name
+                """
+            )
+        ]
+
+
+__all__ = [
+    'SQLiteQueue',
+]
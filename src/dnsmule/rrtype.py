@@ -1,5 +1,5 @@
 from enum import IntEnum
-from typing import Any, Union
+from typing import Any, Union, Dict
 
 
 class RRType(IntEnum):
@@ -14,28 +14,33 @@ class RRType(IntEnum):
 
     @classmethod
     def to_text(cls, value: Union['RRType', int]) -> str:
-        RRType._check_range(value)
-        for k, v in cls.__members__.items():
-            if v == value:
-                return k
-        return str(value)
+        try:
+            text = _TEXT_BY_VALUE.get(value)
+        except TypeError:
+            text = None
+        if text is None:
+            RRType._check_range(value)
+            return str(value)
+        return text
 
     @classmethod
     def from_text(cls, value: str) -> Union['RRType', int]:
-        value = value.upper()
-        for v in cls.__members__.keys():
-            # Could be str derivative with different hash
-            if value == v:
-                return cls.__members__[v]
-        return cls.make(int(value))
+        # Upper returns a plain str, so str derivatives with a different hash are found too
+        member = _MEMBER_BY_TEXT.get(value.upper())
+        if member is None:
+            return cls.make(int(value))
+        return member
 
     @classmethod
     def make(cls, value: int):
-        RRType._check_range(value)
-        for v in cls.__members__.values():
-            if v == value:
-                return v
-        return value
+        try:
+            member = _MEMBER_BY_VALUE.get(value)
+        except TypeError:
+            member = None
+        if member is None:
+            RRType._check_range(value)
+            return value
+        return member
 
     @classmethod
     def from_any(cls, value: Union[int, str, Any]) -> Union['RRType', int]:
@@ -45,7 +50,7 @@ class RRType(IntEnum):
             return cls.from_text(str(value))
 
     def __str__(self):
-        return RRType.to_text(self)
+        return self._name_
 
     def __repr__(self):
         return self.__str__()
@@ -506,6 +511,25 @@ class RRType(IntEnum):
     """
 
 
+_MEMBER_BY_VALUE: Dict[int, RRType] = {}
+"""Lookup table from values to members
+"""
+
+_MEMBER_BY_TEXT: Dict[str, RRType] = {**RRType.__members__}
+"""Lookup table from names to members
+"""
+
+_TEXT_BY_VALUE: Dict[int, str] = {}
+"""Lookup table from values to names, using the first name of aliased values
+"""
+
+for _name, _member in RRType.__members__.items():
+    _MEMBER_BY_VALUE.setdefault(int(_member), _member)
+    _TEXT_BY_VALUE.setdefault(int(_member), _name)
+
+del _name, _member
+
+
 __all__ = [
     'RRType',
 ]
@@ -1,7 +1,12 @@
 import re
 from datetime import datetime
 from types import SimpleNamespace
-from typing import TypedDict, List, Union
+from typing import TypedDict, List, Union, Iterable, Optional, Pattern, Tuple, Dict
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # pragma: nocover
+    import sre_parse
 
 from .api import Record, Result, RRType, Domain
 from .utils import extend_set, extend_list
@@ -47,6 +52,8 @@ class RegexRule:
 
     You must provide either a label or a group for each pattern.
 
+    All regex rules registered for a record type are combined into a single ``RegexEngine`` for scans.
+
     **Tags**::
 
         UPPER(DNS::REGEX::$name::$label or group)
@@ -76,15 +83,118 @@ class RegexRule:
         if patterns is None:
             patterns = [{'label': label, 'regex': regex, 'group': group}]
         self.patterns = [{**p, 'regex': re.compile(p['regex'])} for p in patterns]
+        self._matchers = [
+            (
+                pattern['regex'],
+                f'DNS::REGEX::{self.name}::{label}'.upper() if (label := pattern.get('label', None)) else None,
+                f'DNS::REGEX::{self.name}::'.upper(),
+                pattern.get('group', None),
+            )
+            for pattern in self.patterns
+        ]
+
+    @classmethod
+    def combine(cls, rules: List['RegexRule']) -> 'RegexEngine':
+        return RegexEngine(rules)
 
     def __call__(self, record: Record, result: Result):
-        for pattern in self.patterns:
-            if m := pattern['regex'].search(record.text):
-                if label := pattern.get('label', None):
-                    tag = f'DNS::REGEX::{self.name}::{label}'
-                else:
-                    tag = f'DNS::REGEX::{self.name}::{m.group(pattern["group"])}'
-                result.tags.add(tag.upper())
+        text = record.text
+        for regex, tag, prefix, group in self._matchers:
+            if m := regex.search(text):
+                result.tags.add(tag or prefix + f'{m.group(group)}'.upper())
+
+
+def _required_literal(pattern: Pattern) -> Optional[str]:
+    """
+    Finds the longest literal that must be present in any match of the pattern
+
+    Only consecutive literals at the top level of the pattern are considered.
+
+    :param pattern: Compiled pattern
+    :return:        Literal or None if one could not be determined
+    """
+    if pattern.flags & (re.IGNORECASE | re.VERBOSE) or not isinstance(pattern.pattern, str):
+        return None
+    longest = ''
+    current = ''
+    for op, value in sre_parse.parse(pattern.pattern, pattern.flags):
+        if op == sre_parse.LITERAL:
+            current += chr(value)
+            if len(current) > len(longest):
+                longest = current
+        else:
+            current = ''
+    return longest or None
+
+
+def _trie_pattern(node: dict) -> str:
+    """Creates a pattern from a trie of literals that prefers the longest literal
+    """
+    branches = [re.escape(c) + _trie_pattern(child) for c, child in sorted(node.items()) if c]
+    if not branches:
+        return ''
+    if len(branches) == 1 and '' not in node:
+        return branches[0]
+    pattern = f'(?:{"|".join(branches)})'
+    return f'{pattern}?' if '' in node else pattern
+
+
+class RegexEngine:
+    """
+    Matches the patterns of multiple regex rules with one pass over the record text
+
+    The required literals of all patterns are found with one prefilter built from a trie of the literals
+    and only patterns with their literal present in the text are searched.
+    Patterns without a required literal are always searched.
+    """
+    _prefilter: Optional[Pattern]
+    _candidates: Dict[str, Tuple[int, ...]]
+
+    def __init__(self, rules: Iterable[RegexRule]):
+        self.rules = [*rules]
+        self._matchers = [matcher for rule in self.rules for matcher in rule._matchers]
+        literals: Dict[str, List[int]] = {}
+        self._always = []
+        for i, (regex, *_) in enumerate(self._matchers):
+            if literal := _required_literal(regex):
+                literals.setdefault(literal, []).append(i)
+            else:
+                self._always.append(i)
+        # The prefilter matches the longest literal at each position,
+        # so every literal that is a prefix of the matched one is also present
+        self._candidates = {
+            literal: tuple(
+                i
+                for other, indices in literals.items()
+                if literal.startswith(other)
+                for i in indices
+            )
+            for literal in literals
+        }
+        if literals:
+            trie = {}
+            for literal in literals:
+                node = trie
+                for c in literal:
+                    node = node.setdefault(c, {})
+                node[''] = {}
+            self._prefilter = re.compile(f'(?=({_trie_pattern(trie)}))')
+        else:
+            self._prefilter = None
+
+    def _find_candidates(self, text: str) -> Iterable[int]:
+        candidates = {*self._always}
+        if self._prefilter is not None:
+            for m in self._prefilter.finditer(text):
+                candidates.update(self._candidates[m.group(1)])
+        return sorted(candidates)
+
+    def __call__(self, record: Record, result: Result):
+        text = record.text
+        for i in self._find_candidates(text):
+            regex, tag, prefix, group = self._matchers[i]
+            if m := regex.search(text):
+                result.tags.add(tag or prefix + f'{m.group(group)}'.upper())
 
 
 class TimestampRule:
@@ -95,9 +205,16 @@ class TimestampRule:
 
     - last_scan <timestamp>
     - scans     <array of timestamps>
+
+    Can be configured with::
+
+        max_scans   <int>   Number of most recent scans kept in the history (default: unlimited)
     """
     type = 'timestamp'
 
+    def __init__(self, *, max_scans: int = None):
+        self.max_scans = max_scans
+
     def __enter__(self):
         self._stamp = datetime.now().isoformat()
         self._seen = {*()}
@@ -111,7 +228,7 @@ class TimestampRule:
         domain = result.name
         if domain not in self._seen:
             self._seen.add(domain)
-            extend_list(result.data, 'scans', self._stamp)
+            extend_list(result.data, 'scans', self._stamp, limit=self.max_scans)
             result.data['last_scan'] = self._stamp
 
 
@@ -171,6 +288,7 @@ class DynamicRule:
 __all__ = [
     'MismatchRule',
     'RegexRule',
+    'RegexEngine',
     'TimestampRule',
     'DynamicRule',
 ]
@@ -1,3 +1,5 @@
+from .buffered import BufferedStorage
+from .cached import CachedStorage
 from .db_mongo import MongoStorage
 from .db_mysql import MySQLStorage
 from .db_redis import RedisStorage, RedisJSONStorage
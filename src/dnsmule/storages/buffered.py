@@ -0,0 +1,192 @@
+from logging import getLogger
+from threading import Thread, Condition, Lock
+from time import perf_counter
+from typing import Optional, Dict, Iterable, Set
+
+from ..api import Storage, Domain, Result
+
+LOGGER = 'dnsmule.storages.buffered'
+
+
+class BufferedStorage(Storage):
+    """
+    Write-behind buffer in front of another storage
+
+    Stored results are queued and written to the wrapped storage in bulk from a background thread
+    once ``max_items`` results are pending or ``max_delay`` seconds have passed.
+    Fetching a domain with a pending write returns the pending result.
+    All pending results are flushed on exit.
+
+    Can be configured with::
+
+        storage     <dict>  Wrapped storage configuration
+        max_items   <int>   Pending results that trigger a flush (default: 1000)
+        max_delay   <float> Seconds between time based flushes (default: 1)
+
+    Producers are blocked if ``max_items`` results are pending while a flush is in progress.
+
+    **Note:** The wrapped storage is used from the background thread,
+    SQLite requires ``check_same_thread: false`` for this.
+    """
+    type = 'buffered'
+
+    storage: Storage
+
+    def __init__(
+            self,
+            *,
+            storage: Storage,
+            max_items: int = 1000,
+            max_delay: float = 1.,
+    ):
+        super().__init__()
+        if max_items < 1:
+            raise ValueError('Max items must be at least one', max_items)
+        self.storage = storage
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self._condition = Condition(Lock())
+        self._storage_lock = Lock()
+        self._pending: Dict[Domain, Result] = {}
+        self._flushing: Dict[Domain, Result] = {}
+        self._checked_out: Set[Domain] = {*()}
+        self._running = False
+        self.flushes = 0
+        self.flushed = 0
+        self.errors = 0
+        self.last_flush_latency = 0.
+        self.total_flush_latency = 0.
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Queue depth and flush statistics
+        """
+        with self._condition:
+            return {
+                'pending': len(self._pending),
+                'flushing': len(self._flushing),
+                'flushes': self.flushes,
+                'flushed': self.flushed,
+                'errors': self.errors,
+                'last_flush_latency': self.last_flush_latency,
+                'total_flush_latency': self.total_flush_latency,
+            }
+
+    def __enter__(self):
+        self.storage.__enter__()
+        self._running = True
+        self._thread = Thread(target=self._run, name='dnsmule-buffered-storage', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            with self._condition:
+                self._running = False
+                self._condition.notify_all()
+            self._thread.join()
+            del self._thread
+            self._flush(final=True)
+        finally:
+            self.storage.__exit__(exc_type, exc_val, exc_tb)
+
+    @property
+    def _flushable(self) -> int:
+        return len(self._pending) - len(self._checked_out)
+
+    def _should_flush(self) -> bool:
+        return not self._running or self._flushable >= self.max_items
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(self._should_flush, timeout=self.max_delay)
+                if not self._running:
+                    return
+            try:
+                self._flush()
+            except Exception as e:
+                getLogger(LOGGER).error('Failed to flush results, retrying', exc_info=e)
+                with self._condition:
+                    self._condition.wait(timeout=self.max_delay)
+
+    def _flush(self, final: bool = False):
+        with self._condition:
+            for domain in [*self._pending]:
+                if final or domain not in self._checked_out:
+                    self._flushing[domain] = self._pending.pop(domain)
+            if final:
+                self._checked_out.clear()
+            if not self._flushing:
+                return
+            self._condition.notify_all()
+        start = perf_counter()
+        try:
+            with self._storage_lock:
+                self.storage.store_many(self._flushing.values())
+        except Exception:
+            with self._condition:
+                self.errors += 1
+                self._pending = {**self._flushing, **self._pending}
+                self._flushing = {}
+                self._condition.notify_all()
+            raise
+        latency = perf_counter() - start
+        with self._condition:
+            self.flushes += 1
+            self.flushed += len(self._flushing)
+            self.last_flush_latency = latency
+            self.total_flush_latency += latency
+            self._flushing = {}
+            self._condition.notify_all()
+
+    def _queue(self, result: Result):
+        self._pending[result.name] = result
+        self._checked_out.discard(result.name)
+
+    def _check_out(self, domain: Domain) -> Optional[Result]:
+        self._condition.wait_for(lambda: domain not in self._flushing)
+        if domain in self._pending:
+            # Results being modified are not flushed until they are stored again
+            self._checked_out.add(domain)
+            return self._pending[domain]
+
+    def store(self, result: Result) -> None:
+        with self._condition:
+            if result.name not in self._pending:
+                self._condition.wait_for(lambda: not self._running or self._flushable < self.max_items)
+            self._queue(result)
+            if self._should_flush():
+                self._condition.notify_all()
+
+    def store_many(self, results: Iterable[Result]) -> None:
+        for result in results:
+            self.store(result)
+
+    def fetch(self, domain: Domain) -> Optional[Result]:
+        with self._condition:
+            result = self._check_out(domain)
+        if result is None:
+            with self._storage_lock:
+                result = self.storage.fetch(domain)
+        return result
+
+    def fetch_many(self, domains: Iterable[Domain]) -> Dict[Domain, Result]:
+        results = {}
+        missing = []
+        with self._condition:
+            for domain in domains:
+                result = self._check_out(domain)
+                if result is None:
+                    missing.append(domain)
+                else:
+                    results[domain] = result
+        if missing:
+            with self._storage_lock:
+                results.update(self.storage.fetch_many(missing))
+        return results
+
+
+__all__ = [
+    'BufferedStorage',
+]
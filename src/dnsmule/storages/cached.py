@@ -0,0 +1,114 @@
+from json import dumps
+from typing import Optional, Dict, Iterable
+
+from ..api import Storage, Domain, Result
+from ..utils import LRUCache, jsonize
+
+
+class CachedStorage(Storage):
+    """
+    Read-through LRU cache in front of another storage
+
+    Fetched results are served from memory until evicted or expired.
+    Stores are written through to the wrapped storage and update the cache.
+
+    Can be configured with::
+
+        storage      <dict>  Wrapped storage configuration
+        max_entries  <int>   Maximum number of cached results (default: 10000)
+        max_bytes    <int>   Maximum approximate size of cached results in bytes (default: unlimited)
+        ttl          <float> Seconds a cached result is valid (default: forever)
+
+    The size of a result is approximated by the length of its JSON representation.
+
+    **Note:** Cached results are shared, changes to a fetched result are visible to later fetches
+    """
+    type = 'cached'
+
+    storage: Storage
+
+    def __init__(
+            self,
+            *,
+            storage: Storage,
+            max_entries: Optional[int] = 10000,
+            max_bytes: Optional[int] = None,
+            ttl: Optional[float] = None,
+    ):
+        super().__init__()
+        self.storage = storage
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._cache: LRUCache[Domain, Result] = LRUCache(
+            max_entries=max_entries,
+            max_size=max_bytes,
+            ttl=ttl,
+        )
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss, eviction and size statistics
+        """
+        return self._cache.stats
+
+    def __enter__(self):
+        self.storage.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.storage.__exit__(exc_type, exc_val, exc_tb)
+
+    def _sizeof(self, result: Result) -> int:
+        if self.max_bytes is None:
+            return 0
+        return len(result.name) + len(dumps(
+            [
+                [*result.types],
+                [*result.tags],
+                jsonize(result.data),
+            ],
+            default=str,
+            ensure_ascii=False,
+        ))
+
+    def _cache_result(self, result: Result):
+        self._cache.set(result.name, result, size=self._sizeof(result))
+
+    def store(self, result: Result) -> None:
+        self.storage.store(result)
+        self._cache_result(result)
+
+    def store_many(self, results: Iterable[Result]) -> None:
+        results = [*results]
+        self.storage.store_many(results)
+        for result in results:
+            self._cache_result(result)
+
+    def fetch(self, domain: Domain) -> Optional[Result]:
+        result = self._cache.get(domain)
+        if result is None:
+            result = self.storage.fetch(domain)
+            if result is not None:
+                self._cache_result(result)
+        return result
+
+    def fetch_many(self, domains: Iterable[Domain]) -> Dict[Domain, Result]:
+        results = {}
+        missing = []
+        for domain in domains:
+            result = self._cache.get(domain)
+            if result is None:
+                missing.append(domain)
+            else:
+                results[domain] = result
+        if missing:
+            for domain, result in self.storage.fetch_many(missing).items():
+                self._cache_result(result)
+                results[domain] = result
+        return results
+
+
+__all__ = [
+    'CachedStorage',
+]
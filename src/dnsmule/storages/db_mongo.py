@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Iterable, Dict
 
 from ..api import Storage, Domain, Result, RRType
 from ..utils import jsonize
@@ -43,28 +43,57 @@ class MongoStorage(Storage):
     def _collection(self):
         return self._client[self.database][self.collection]
 
+    @staticmethod
+    def _to_document(result: Result) -> dict:
+        return {
+            'domain': result.name,
+            'types': sorted(RRType.to_text(value) for value in result.types),
+            'tags': sorted(result.tags),
+            'data': jsonize(result.data),
+        }
+
+    @staticmethod
+    def _from_document(domain: Domain, json_data: dict) -> Result:
+        return Result(
+            name=domain,
+            types={RRType.from_any(value) for value in json_data['types']},
+            tags={*json_data['tags']},
+            data=json_data['data'],
+        )
+
     def store(self, result: Result) -> None:
         self._collection.replace_one(
             {'domain': result.name},
-            {
-                'domain': result.name,
-                'types': sorted(RRType.to_text(value) for value in result.types),
-                'tags': sorted(result.tags),
-                'data': jsonize(result.data),
-            },
+            self._to_document(result),
             True,
         )
 
     def fetch(self, domain: Domain) -> Optional[Result]:
         json_data = self._collection.find_one({'domain': domain})
         if json_data:
-            return Result(
-                name=domain,
-                types={RRType.from_any(value) for value in json_data['types']},
-                tags={*json_data['tags']},
-                data=json_data['data'],
+            return self._from_document(domain, json_data)
+
+    def store_many(self, results: Iterable[Result]) -> None:
+        from pymongo import ReplaceOne
+        operations = [
+            ReplaceOne(
+                {'domain': result.name},
+                self._to_document(result),
+                upsert=True,
             )
+            for result in results
+        ]
+        if operations:
+            self._collection.bulk_write(operations, ordered=False)
 
+    def fetch_many(self, domains: Iterable[Domain]) -> Dict[Domain, Result]:
+        domains = [*domains]
+        if not domains:
+            return {}
+        return {
+            json_data['domain']: self._from_document(json_data['domain'], json_data)
+            for json_data in self._collection.find({'domain': {'$in': domains}})
+        }
 
 __all__ = [
     'MongoStorage',
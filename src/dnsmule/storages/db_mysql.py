@@ -1,5 +1,5 @@
 from json import dumps, loads
-from typing import Optional
+from typing import Optional, Dict, List
 
 from .key_value import AbstractKVStorage
 
@@ -84,3 +84,44 @@ class MySQLStorage(AbstractKVStorage):
                 return loads(result[0])
         finally:
             c.close()
+
+    def _set_many(self, values: Dict[str, dict]) -> None:
+        c = self._client.cursor()
+        try:
+            # Executemany rewrites this into a single multi-row insert
+            c.executemany(
+                # language=mysql
+                """
+                INSERT INTO results ( name, data ) 
+                VALUES (%(name)s, %(data)s)
+                ON DUPLICATE KEY UPDATE data = VALUES(data)
+                """,
+                [
+                    {
+                        'name': key,
+                        'data': dumps(value),
+                    }
+                    for key, value in values.items()
+                ],
+            )
+        finally:
+            c.close()
+
+    def _get_many(self, keys: List[str]) -> List[Optional[dict]]:
+        c = self._client.cursor()
+        try:
+            c.execute(
+                # language=mysql
+                """
+                SELECT name, data 
+                FROM results
+                WHERE name IN %(names)s
+                """,
+                {
+                    'names': keys,
+                },
+            )
+            found = dict(c.fetchall())
+            return [loads(found[key]) if key in found else None for key in keys]
+        finally:
+            c.close()
@@ -1,5 +1,5 @@
 from json import loads, dumps
-from typing import Optional
+from typing import Optional, Dict, List
 
 from .key_value import AbstractKVStorage
 
@@ -25,6 +25,12 @@ class RedisStorage(AbstractKVStorage):
         if result:
             return loads(result)
 
+    def _set_many(self, values: Dict[str, dict]) -> None:
+        self._client.mset({key: dumps(value) for key, value in values.items()})
+
+    def _get_many(self, keys: List[str]) -> List[Optional[dict]]:
+        return [loads(result) if result else None for result in self._client.mget(keys)]
+
 
 class RedisJSONStorage(RedisStorage):
     type = 'redis.json'
@@ -34,3 +40,12 @@ class RedisJSONStorage(RedisStorage):
 
     def _get(self, key: str) -> Optional[dict]:
         return self._client.json().get(key)
+
+    def _set_many(self, values: Dict[str, dict]) -> None:
+        pipeline = self._client.pipeline(transaction=False)
+        for key, value in values.items():
+            pipeline.json().set(key, '$', value)
+        pipeline.execute()
+
+    def _get_many(self, keys: List[str]) -> List[Optional[dict]]:
+        return [result[0] if result else None for result in self._client.json().mget(keys, '$')]
@@ -1,12 +1,17 @@
 from json import loads, dumps
-from typing import Optional
+from typing import Optional, Dict, List
 
 from .key_value import AbstractKVStorage
+from ..utils import chunked
 
 
 class SQLiteStorage(AbstractKVStorage):
     type = 'sqlite'
 
+    MAX_VARIABLES = 999
+    """Maximum number of host parameters in a single statement for old SQLite versions
+    """
+
     def __init__(self, **config):
         super().__init__()
         self.config = config
@@ -67,3 +72,30 @@ class SQLiteStorage(AbstractKVStorage):
             result = cursor.fetchone()
             if result:
                 return loads(result[0])
+
+    def _set_many(self, values: Dict[str, dict]) -> None:
+        with self._client:
+            self._client.executemany(
+                # language=sqlite
+                """
+                INSERT OR REPLACE INTO results ( name, data ) 
+                VALUES (?, ?)
+                """,
+                ((key, dumps(value)) for key, value in values.items()),
+            )
+
+    def _get_many(self, keys: List[str]) -> List[Optional[dict]]:
+        found = {}
+        with self._client:
+            for chunk in chunked(keys, self.MAX_VARIABLES):
+                cursor = self._client.execute(
+                    # language=sqlite
+                    f"""
+                    SELECT name, data
+                    FROM results
+                    WHERE name IN ({', '.join('?' for _ in chunk)})
+                    """,
+                    chunk,
+                )
+                found.update(cursor.fetchall())
+        return [loads(found[key]) if key in found else None for key in keys]
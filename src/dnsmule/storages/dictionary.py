@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Iterable, Dict
 
 from ..api import Storage, Domain, Result
 
@@ -17,6 +17,12 @@ class DictStorage(Storage):
         if domain in self._dict:
             return self._dict[domain]
 
+    def store_many(self, results: Iterable[Result]) -> None:
+        self._dict.update((result.name, result) for result in results)
+
+    def fetch_many(self, domains: Iterable[Domain]) -> Dict[Domain, Result]:
+        return {domain: self._dict[domain] for domain in domains if domain in self._dict}
+
 
 __all__ = [
     'DictStorage',
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Iterable, Dict, List
 
 from ..api import Storage, Domain, Result, RRType
 from ..utils import jsonize
@@ -11,22 +11,43 @@ class AbstractKVStorage(Storage):
         super().__init__()
         self.config = config
 
-    def store(self, result: Result):
-        self._set(result.name, {
+    @staticmethod
+    def _serialize(result: Result) -> dict:
+        return {
             'types': sorted(RRType.to_text(value) for value in result.types),
             'tags': sorted(result.tags),
-            'data': result.data,
-        })
+            'data': jsonize(result.data),
+        }
+
+    @staticmethod
+    def _deserialize(domain: Domain, json_data: dict) -> Result:
+        return Result(
+            name=domain,
+            types={RRType.from_any(value) for value in json_data['types']},
+            tags={*json_data['tags']},
+            data=jsonize(json_data['data']),
+        )
+
+    def store(self, result: Result):
+        self._set(result.name, self._serialize(result))
 
     def fetch(self, domain: Domain) -> Optional[Result]:
         json_data = self._get(domain)
         if json_data:
-            return Result(
-                name=domain,
-                types={RRType.from_any(value) for value in json_data['types']},
-                tags={*json_data['tags']},
-                data=jsonize(json_data['data']),
-            )
+            return self._deserialize(domain, json_data)
+
+    def store_many(self, results: Iterable[Result]) -> None:
+        values = {result.name: self._serialize(result) for result in results}
+        if values:
+            self._set_many(values)
+
+    def fetch_many(self, domains: Iterable[Domain]) -> Dict[Domain, Result]:
+        domains = [*domains]
+        return {
+            domain: self._deserialize(domain, json_data)
+            for domain, json_data in zip(domains, self._get_many(domains) if domains else [])
+            if json_data
+        }
 
     def _set(self, key: str, value: dict) -> None:
         """Implement
@@ -35,3 +56,14 @@ class AbstractKVStorage(Storage):
     def _get(self, key: str) -> Optional[dict]:
         """Implement
         """
+
+    def _set_many(self, values: Dict[str, dict]) -> None:
+        """Override for batched writes
+        """
+        for key, value in values.items():
+            self._set(key, value)
+
+    def _get_many(self, keys: List[str]) -> List[Optional[dict]]:
+        """Override for batched reads, must return values in the same order as keys
+        """
+        return [self._get(key) for key in keys]
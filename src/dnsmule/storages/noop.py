@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Iterable, Dict
 
 from ..api import Storage, Result, Domain
 
@@ -16,3 +16,12 @@ class NoOpStorage(Storage):
     def store(self, result: Result) -> None:
         """Discards all results
         """
+
+    def fetch_many(self, domains: Iterable[Domain]) -> Dict[Domain, Result]:
+        """always returns nothing
+        """
+        return {}
+
+    def store_many(self, results: Iterable[Result]) -> None:
+        """Discards all results
+        """
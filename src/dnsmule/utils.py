@@ -1,5 +1,10 @@
+import asyncio
+from collections import OrderedDict
+from itertools import islice
 from pathlib import Path
-from typing import Union, TypeVar, Any, Dict, Tuple, Iterable
+from threading import Lock, Condition
+from time import time, monotonic
+from typing import Union, TypeVar, Any, Dict, Tuple, Iterable, List, Optional, Generic
 
 K = TypeVar('K')
 V = TypeVar('V')
@@ -14,6 +19,14 @@ def join_values(a: Dict[K, V], b: Dict[K, R]) -> Iterable[Tuple[V, R]]:
             yield v, b[k]
 
 
+def chunked(iterable: Iterable[V], size: int) -> Iterable[List[V]]:
+    """Lazily splits an iterable into lists of at most the given size
+    """
+    iterator = iter(iterable)
+    while chunk := [*islice(iterator, size)]:
+        yield chunk
+
+
 def csv_stripped(line):
     return line[1].strip()
 
@@ -22,7 +35,31 @@ def txt_stripped(line):
     return line.strip()
 
 
-def load_data(file: Union[str, Path], limit: int = -1):
+def load_stream(stream: Iterable[str], csv: bool = False, limit: int = -1, skip: int = 0):
+    """
+    Lazily loads target data from lines of text
+
+    Lines are read one at a time, so the stream can be larger than memory.
+    Empty targets are ignored.
+
+    :param stream: Lines of text e.g. an open file
+    :param csv:    Whether the lines are of the form ``index,target``
+    :param limit:  Maximum number of targets, all targets if ``limit < 0``
+    :param skip:   Number of targets to skip before the first returned one
+    """
+    if csv:
+        import csv as _csv
+        data = map(csv_stripped, _csv.reader(stream))
+    else:
+        data = map(txt_stripped, stream)
+    data = filter(None, data)
+    if limit < 0:
+        yield from islice(data, skip, None)
+    else:
+        yield from islice(data, skip, skip + limit)
+
+
+def load_data(file: Union[str, Path], limit: int = -1, skip: int = 0):
     """
     Loads target data from either a .csv or .txt file
 
@@ -37,21 +74,14 @@ def load_data(file: Union[str, Path], limit: int = -1):
     * target2
 
     If the given ``limit < 0`` then all data is returned.
+    The first ``skip`` targets are skipped.
     """
     file = Path(file)
     with open(file, 'r') as f:
-        if file.suffix == '.csv':
-            import csv
-            data = map(csv_stripped, csv.reader(f))
-        else:
-            data = map(txt_stripped, f)
-        if limit < 0:
-            yield from data
-        else:
-            yield from (value for _, value in zip(range(limit), data))
+        yield from load_stream(f, csv=file.suffix == '.csv', limit=limit, skip=skip)
 
 
-def left_merge(a: Dict[str, Any], b: Dict[str, Any]):
+def left_merge(a: Dict[str, Any], b: Dict[str, Any], mutable: bool = False):
     """
     Left merge two dicts
 
@@ -69,12 +99,21 @@ def left_merge(a: Dict[str, Any], b: Dict[str, Any]):
 
     **Note:** Merging immutable collections does not preserve instance reference
 
+    With ``mutable`` tuples and frozensets on the left are converted into a list or set once,
+    after which merges into them are amortized appends instead of copies.
+
     :raises TypeError: If value types are incompatible
     """
     for k in b:
         if k not in a:
             a[k] = b[k]
-        elif not isinstance(b[k], type(a[k])) and not (
+            continue
+        if mutable:
+            if type(a[k]) is tuple:
+                a[k] = [*a[k]]
+            elif type(a[k]) is frozenset:
+                a[k] = {*a[k]}
+        if not isinstance(b[k], type(a[k])) and not (
                 isinstance(a[k], (list, set, tuple, frozenset))
                 and isinstance(b[k], (list, set, tuple, frozenset))
         ):
@@ -85,11 +124,11 @@ def left_merge(a: Dict[str, Any], b: Dict[str, Any]):
             elif isinstance(a[k], tuple):
                 a[k] = (*a[k], b[k])
             elif isinstance(a[k], frozenset):
-                a[k] = frozenset((*a[k], b[k]))
+                a[k] = a[k].union((b[k],))
             else:
                 raise TypeError(f'Value types for key {k} are incompatible a: {type(a[k])} b: {type(a[k])}')
         elif isinstance(a[k], dict):
-            left_merge(a[k], b[k])
+            left_merge(a[k], b[k], mutable=mutable)
         elif isinstance(a[k], list):
             a[k].extend(b[k])
         elif isinstance(a[k], set):
@@ -97,36 +136,161 @@ def left_merge(a: Dict[str, Any], b: Dict[str, Any]):
         elif isinstance(a[k], tuple):
             a[k] = (*a[k], *b[k])
         elif isinstance(a[k], frozenset):
-            a[k] = frozenset((*a[k], *b[k]))
+            a[k] = a[k].union(b[k])
         else:
             a[k] += b[k]
 
 
-def extend_set(data: Dict[str, Any], key: str, *values: Any):
+def _set_key(value: Any) -> Any:
+    """Returns the value itself if hashable, otherwise a hashable key of its contents
     """
-    Appends values to a list based set in a dictionary
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        if isinstance(value, dict):
+            return dict, frozenset((_set_key(k), _set_key(v)) for k, v in value.items())
+        elif isinstance(value, (set, frozenset)):
+            return set, frozenset(_set_key(item) for item in value)
+        elif isinstance(value, (list, tuple)):
+            return type(value), tuple(_set_key(item) for item in value)
+        raise
 
-    **Note:** This is inefficient as it uses list traversal to check duplicates
 
-    **Note:** This also de-duplicates the existing collection
+class OrderedSet(list):
     """
-    target = []
-    if key in data:
-        values = [*data[key], *values]
-    for v in values:
-        if v not in target:
-            target.append(v)
-    data[key] = target
+    List that keeps only the first occurrence of each value
 
+    Membership checks and additions are constant time through a companion set of keys.
+    Unhashable values like dicts are compared by their contents.
 
-def extend_list(data: Dict[str, Any], key: str, *values: Any):
+    Reads, comparisons and serialization behave like a list, so the values are stored as a JSON list.
+    Removing values rebuilds the keys and is linear.
+    """
+    __slots__ = ('_keys',)
+
+    def __init__(self, values: Iterable[Any] = ()):
+        super().__init__()
+        self._keys = set()
+        self.update(values)
+
+    def __reduce__(self):
+        return OrderedSet, ([*self],)
+
+    def _rebuild(self):
+        self._keys = {_set_key(value) for value in self}
+
+    def add(self, value: Any) -> bool:
+        """
+        Appends a value if it is not present yet
+
+        :return: True if the value was added
+        """
+        key = _set_key(value)
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        super().append(value)
+        return True
+
+    def update(self, *iterables: Iterable[Any]) -> None:
+        """Appends all new values from the iterables in order
+        """
+        keys = self._keys
+        append = super().append
+        for values in iterables:
+            for value in values:
+                key = _set_key(value)
+                if key not in keys:
+                    keys.add(key)
+                    append(value)
+
+    def append(self, value: Any) -> None:
+        self.add(value)
+
+    def extend(self, values: Iterable[Any]) -> None:
+        self.update(values)
+
+    def __iadd__(self, values: Iterable[Any]):
+        self.update(values)
+        return self
+
+    def __contains__(self, value: Any) -> bool:
+        try:
+            return _set_key(value) in self._keys
+        except TypeError:
+            return False
+
+    def insert(self, index: int, value: Any) -> None:
+        key = _set_key(value)
+        if key not in self._keys:
+            self._keys.add(key)
+            super().insert(index, value)
+
+    def _deduplicate(self):
+        values = [*self]
+        super().clear()
+        self._keys = set()
+        self.update(values)
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._deduplicate()
+
+    def __imul__(self, count: int):
+        super().__imul__(count)
+        self._deduplicate()
+        return self
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._rebuild()
+
+    def remove(self, value: Any) -> None:
+        super().remove(value)
+        self._keys.discard(_set_key(value))
+
+    def pop(self, index: int = -1) -> Any:
+        value = super().pop(index)
+        self._keys.discard(_set_key(value))
+        return value
+
+    def clear(self) -> None:
+        super().clear()
+        self._keys.clear()
+
+    def copy(self) -> 'OrderedSet':
+        return OrderedSet(self)
+
+
+def extend_set(data: Dict[str, Any], key: str, *values: Any):
+    """
+    Appends values to an insertion ordered set in a dictionary
+
+    Existing collections are converted into an ``OrderedSet`` once, de-duplicating them,
+    after which appending is constant time per value.
+    """
+    target = data.get(key, None)
+    if not isinstance(target, OrderedSet):
+        target = OrderedSet(target if target is not None else ())
+        data[key] = target
+    target.update(values)
+
+
+def extend_list(data: Dict[str, Any], key: str, *values: Any, limit: Optional[int] = None):
     """
     Appends values to a list in a dictionary
+
+    Existing lists are extended in place and other collections are converted into a list once.
+    With ``limit`` only the last ``limit`` values are kept.
     """
-    if key in data:
-        data[key] = [*data[key], *values]
-    else:
-        data[key] = [*values]
+    target = data.get(key, None)
+    if not isinstance(target, list):
+        target = [*target] if target is not None else []
+        data[key] = target
+    target.extend(values)
+    if limit is not None and len(target) > limit:
+        del target[:len(target) - limit]
 
 
 def jsonize(value):
@@ -150,11 +314,253 @@ def jsonize(value):
         return value
 
 
+class LRUCache(Generic[K, V]):
+    """
+    Thread safe least recently used cache with optional expiry
+
+    Entries are evicted in least recently used order once there are more than ``max_entries`` entries
+    or their combined size exceeds ``max_size``. The size of an entry is given when it is set.
+
+    Expiry uses wall clock time so expiry times can be persisted.
+    """
+
+    def __init__(
+            self,
+            max_entries: Optional[int] = None,
+            max_size: Optional[int] = None,
+            ttl: Optional[float] = None,
+    ):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = Lock()
+        self._data: 'OrderedDict[K, Tuple[V, Optional[float], int]]' = OrderedDict()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'size': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+    def _remove(self, key: K):
+        _, _, size = self._data.pop(key)
+        self.size -= size
+
+    def get(self, key: K, default: Any = None) -> Union[V, Any]:
+        with self._lock:
+            if key in self._data:
+                value, expires, _ = self._data[key]
+                if expires is None or expires > time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None, size: int = 0):
+        """
+        Adds or replaces an entry
+
+        :param key:   Key
+        :param value: Value
+        :param ttl:   Seconds until expiry, defaults to the cache ttl
+        :param size:  Size of the entry
+        """
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, time() + ttl if ttl is not None else None, size)
+            self.size += size
+            while self._data and (
+                    self.max_entries is not None and len(self._data) > self.max_entries
+                    or self.max_size is not None and self.size > self.max_size
+            ):
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+
+    def pop(self, key: K, default: Any = None) -> Union[V, Any]:
+        with self._lock:
+            if key in self._data:
+                value, _, _ = self._data[key]
+                self._remove(key)
+                return value
+            return default
+
+    def entries(self) -> List[Tuple[K, V, Optional[float]]]:
+        """Returns all live entries as tuples of key, value and expiry timestamp
+        """
+        now = time()
+        with self._lock:
+            return [
+                (key, value, expires)
+                for key, (value, expires, _) in self._data.items()
+                if expires is None or expires > now
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+
+class RateLimiter:
+    """
+    Thread safe token bucket limiting the rate and concurrency of operations
+
+    Tokens are added at ``rate`` per second up to ``burst`` and every operation takes one token.
+    At most ``max_in_flight`` operations are allowed between acquiring and releasing.
+    Without a rate or a maximum the respective limit is not applied.
+
+    With ``adaptive`` the outcomes reported on release are counted in windows of ``window`` operations.
+    The rate is halved, down to ``min_rate``, when the failure ratio of a window exceeds ``max_failure_ratio``
+    and otherwise increased by a tenth of the configured rate until it is restored.
+    """
+
+    POLL_INTERVAL = .01
+    """Seconds between async acquire attempts while waiting for operations to be released
+    """
+
+    def __init__(
+            self,
+            rate: Optional[float] = None,
+            burst: Optional[int] = None,
+            max_in_flight: Optional[int] = None,
+            adaptive: bool = False,
+            min_rate: Optional[float] = None,
+            window: int = 100,
+            max_failure_ratio: float = .05,
+    ):
+        if adaptive and rate is None:
+            raise ValueError('Adaptive rate limiting requires a rate')
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate or 1))
+        self.max_in_flight = max_in_flight
+        self.adaptive = adaptive
+        self.min_rate = min_rate if min_rate is not None else (rate / 100 if rate else None)
+        self.window = window
+        self.max_failure_ratio = max_failure_ratio
+        self.in_flight = 0
+        self.successes = 0
+        self.failures = 0
+        self.waits = 0
+        self.backoffs = 0
+        self._window_failures = 0
+        self._window_total = 0
+        self._tokens = float(self.burst)
+        self._updated = monotonic()
+        self._condition = Condition()
+
+    @property
+    def stats(self) -> Dict[str, Union[int, float, None]]:
+        with self._condition:
+            return {
+                'rate': self.rate,
+                'in_flight': self.in_flight,
+                'successes': self.successes,
+                'failures': self.failures,
+                'waits': self.waits,
+                'backoffs': self.backoffs,
+            }
+
+    def _try_acquire(self) -> Optional[float]:
+        """Returns zero when acquired, otherwise seconds to wait or None if waiting for a release
+        """
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            return None
+        if self.rate is not None:
+            now = monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self.in_flight += 1
+        return 0
+
+    def acquire(self):
+        """Blocks until an operation is allowed
+        """
+        with self._condition:
+            delay = self._try_acquire()
+            if delay != 0:
+                self.waits += 1
+                while delay != 0:
+                    self._condition.wait(delay)
+                    delay = self._try_acquire()
+
+    async def acquire_async(self):
+        """Waits in the event loop until an operation is allowed
+        """
+        waited = False
+        while True:
+            with self._condition:
+                delay = self._try_acquire()
+                if delay == 0:
+                    if waited:
+                        self.waits += 1
+                    return
+            waited = True
+            await asyncio.sleep(delay if delay is not None else self.POLL_INTERVAL)
+
+    def release(self, success: bool = True):
+        """
+        Ends an acquired operation
+
+        :param success: False if the operation failed in a way that indicates overload e.g. timeouts
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if success:
+                self.successes += 1
+            else:
+                self.failures += 1
+            if self.adaptive:
+                self._adapt(success)
+            self._condition.notify()
+
+    def _adapt(self, success: bool):
+        self._window_total += 1
+        if not success:
+            self._window_failures += 1
+        if self._window_total >= self.window:
+            if self._window_failures / self._window_total > self.max_failure_ratio:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.backoffs += 1
+            elif self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+            self._window_failures = 0
+            self._window_total = 0
+
+
 __all__ = [
     'load_data',
+    'load_stream',
     'left_merge',
     'extend_set',
+    'OrderedSet',
     'extend_list',
     'join_values',
+    'chunked',
     'jsonize',
+    'LRUCache',
+    'RateLimiter',
 ]
@@ -0,0 +1,247 @@
+import asyncio
+
+import pytest
+
+from dnsmule import Domain, RRType, Record, Backend, AsyncBackend, load_config
+from dnsmule.api import NegativeAnswer
+from dnsmule.backends import CachedBackend, NoOpBackend
+
+
+class CountingBackend(Backend):
+
+    def __init__(self, records=None):
+        super().__init__()
+        self.records = records or {}
+        self.queries = []
+        self.calls = 0
+
+    def scan(self, domain, *types):
+        self.calls += 1
+        for type in types:
+            self.queries.append((domain, type))
+            for record in self.records.get((domain, type), []):
+                yield record
+
+
+@pytest.fixture
+def inner():
+    return CountingBackend({
+        (Domain('example.com'), RRType.A): [
+            Record(Domain('example.com'), RRType.A, '127.0.0.1', ttl=60),
+            Record(Domain('example.com'), RRType.A, '127.0.0.2', ttl=30),
+        ],
+        (Domain('example.com'), RRType.TXT): [
+            Record(Domain('example.com'), RRType.TXT, 'hello'),
+        ],
+    })
+
+
+@pytest.fixture
+def now(monkeypatch):
+    from dnsmule import utils
+    from dnsmule.backends import cached
+    now = [1000.]
+    monkeypatch.setattr(utils, 'time', lambda: now[0])
+    monkeypatch.setattr(cached, 'time', lambda: now[0])
+    return now
+
+
+def test_caches_by_name_and_type(inner):
+    backend = CachedBackend(backend=inner)
+
+    first = [*backend.scan(Domain('example.com'), RRType.A, RRType.TXT)]
+    second = [*backend.scan(Domain('example.com'), RRType.A, RRType.TXT, RRType.MX)]
+
+    assert first == second[:3], 'Returned different records'
+    assert inner.queries == [
+        (Domain('example.com'), RRType.A),
+        (Domain('example.com'), RRType.TXT),
+        (Domain('example.com'), RRType.MX),
+    ], 'Did not serve from cache'
+
+
+def test_queries_missing_types_at_once(inner):
+    backend = CachedBackend(backend=inner)
+    [*backend.scan(Domain('example.com'), RRType.A)]
+    records = [*backend.scan(Domain('example.com'), RRType.A, RRType.TXT, RRType.MX)]
+
+    assert inner.calls == 2, 'Did not query missing types at once'
+    assert inner.queries[1:] == [
+        (Domain('example.com'), RRType.TXT),
+        (Domain('example.com'), RRType.MX),
+    ], 'Queried cached type'
+    assert [record.text for record in records] == ['127.0.0.1', '127.0.0.2', 'hello']
+
+
+class FailingBackend(CountingBackend):
+
+    def scan_by_type(self, domain, *types):
+        self.queries.extend((domain, type) for type in types)
+        return {type: None if type == RRType.A else [] for type in types}
+
+
+def test_does_not_cache_failed_queries():
+    inner = FailingBackend()
+    backend = CachedBackend(backend=inner)
+    assert [*backend.scan(Domain('example.com'), RRType.A, RRType.MX)] == []
+    [*backend.scan(Domain('example.com'), RRType.A, RRType.MX)]
+
+    assert inner.queries.count((Domain('example.com'), RRType.A)) == 2, 'Cached failed query'
+    assert inner.queries.count((Domain('example.com'), RRType.MX)) == 1, 'Did not cache empty response'
+
+
+class AsyncCountingBackend(AsyncBackend):
+
+    def __init__(self):
+        self.queries = []
+
+    def scan(self, domain, *types):
+        pytest.fail('Called synchronous scan')
+
+    async def scan_async(self, domain, *types):
+        self.queries.append(types)
+        yield Record(domain, RRType.A, '127.0.0.1', ttl=60)
+
+
+def test_forwards_async_backend():
+    inner = AsyncCountingBackend()
+    backend = CachedBackend(backend=inner)
+
+    async def scan():
+        return [
+            [record async for record in backend.scan_async(Domain('example.com'), RRType.A, RRType.TXT)]
+            for _ in range(2)
+        ]
+
+    first, second = asyncio.run(scan())
+    assert [record.text for record in first] == ['127.0.0.1']
+    assert first == second, 'Returned different records'
+    assert inner.queries == [(RRType.A, RRType.TXT)], 'Did not serve from cache'
+
+
+def test_scan_async_queries_sync_backend(inner):
+    backend = CachedBackend(backend=inner)
+
+    async def scan():
+        return [record async for record in backend.scan_async(Domain('example.com'), RRType.A, RRType.TXT)]
+
+    records = asyncio.run(scan())
+    assert [record.text for record in records] == ['127.0.0.1', '127.0.0.2', 'hello']
+    assert inner.calls == 1
+
+
+def test_expires_after_smallest_ttl(inner, now):
+    backend = CachedBackend(backend=inner)
+    [*backend.scan(Domain('example.com'), RRType.A)]
+
+    now[0] += 29
+    [*backend.scan(Domain('example.com'), RRType.A)]
+    assert len(inner.queries) == 1, 'Expired too early'
+
+    now[0] += 2
+    [*backend.scan(Domain('example.com'), RRType.A)]
+    assert len(inner.queries) == 2, 'Did not expire'
+
+
+def test_uses_default_ttl_for_records_without_ttl(inner, now):
+    backend = CachedBackend(backend=inner, default_ttl=10)
+    [*backend.scan(Domain('example.com'), RRType.TXT)]
+    now[0] += 11
+    [*backend.scan(Domain('example.com'), RRType.TXT)]
+
+    assert len(inner.queries) == 2, 'Did not use default ttl'
+
+
+def test_caches_negative_responses(inner, now):
+    backend = CachedBackend(backend=inner, negative_ttl=5)
+    [*backend.scan(Domain('example.com'), RRType.MX)]
+    [*backend.scan(Domain('example.com'), RRType.MX)]
+    assert len(inner.queries) == 1, 'Did not cache negative response'
+
+    now[0] += 6
+    [*backend.scan(Domain('example.com'), RRType.MX)]
+    assert len(inner.queries) == 2, 'Did not expire negative response'
+
+
+class SOABackend(CountingBackend):
+
+    def scan_by_type(self, domain, *types):
+        self.queries.extend((domain, type) for type in types)
+        return {type: NegativeAnswer(10) for type in types}
+
+
+def test_caches_negative_responses_for_soa_minimum(now):
+    inner = SOABackend()
+    backend = CachedBackend(backend=inner, negative_ttl=300)
+    [*backend.scan(Domain('example.com'), RRType.MX)]
+    now[0] += 9
+    [*backend.scan(Domain('example.com'), RRType.MX)]
+    assert len(inner.queries) == 1, 'Expired too early'
+
+    now[0] += 2
+    [*backend.scan(Domain('example.com'), RRType.MX)]
+    assert len(inner.queries) == 2, 'Did not use SOA minimum'
+
+
+def test_zero_ttl_is_not_cached(inner):
+    backend = CachedBackend(backend=inner, negative_ttl=0)
+    [*backend.scan(Domain('example.com'), RRType.MX)]
+    [*backend.scan(Domain('example.com'), RRType.MX)]
+
+    assert len(inner.queries) == 2, 'Cached zero ttl response'
+
+
+def test_is_size_bounded(inner):
+    backend = CachedBackend(backend=inner, max_entries=2)
+    [*backend.scan(Domain('example.com'), RRType.A, RRType.TXT, RRType.MX)]
+
+    assert backend.stats['entries'] == 2, 'Exceeded size'
+    assert backend.stats['evictions'] == 1, 'Did not evict'
+
+
+def test_persists_to_file(inner, tmp_path):
+    file = tmp_path / 'cache.json'
+    with CachedBackend(backend=inner, file=file) as backend:
+        [*backend.scan(Domain('example.com'), RRType.A)]
+
+    assert file.exists(), 'Did not save cache'
+
+    other = CountingBackend()
+    with CachedBackend(backend=other, file=file) as backend:
+        records = [*backend.scan(Domain('example.com'), RRType.A)]
+
+    assert not other.queries, 'Did not load cache'
+    assert [record.text for record in records] == ['127.0.0.1', '127.0.0.2']
+    assert [record.ttl for record in records] == [60, 30]
+
+
+def test_does_not_load_expired_entries(inner, now, tmp_path):
+    file = tmp_path / 'cache.json'
+    with CachedBackend(backend=inner, file=file) as backend:
+        [*backend.scan(Domain('example.com'), RRType.A)]
+
+    now[0] += 31
+    with CachedBackend(backend=NoOpBackend(), file=file) as backend:
+        assert len(backend._cache) == 0, 'Loaded expired entries'
+
+
+def test_loads_from_config():
+    mule = load_config({
+        'backend': {
+            'type': 'cached',
+            'config': {
+                'negative_ttl': 60,
+                'backend': {
+                    'type': 'noop',
+                },
+            },
+        },
+        'storage': {
+            'type': 'noop',
+        },
+        'rules': [],
+    })
+
+    assert isinstance(mule.backend, CachedBackend), 'Failed to load wrapper'
+    assert isinstance(mule.backend.backend, NoOpBackend), 'Failed to load wrapped backend'
+    assert mule.backend.negative_ttl == 60
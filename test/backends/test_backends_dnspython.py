@@ -1,9 +1,13 @@
+import asyncio
+import threading
+import time
+
 import pytest
 from dns.exception import DNSException
 from dns.message import make_query, from_text
 from dns.rdatatype import RdataType
 
-from dnsmule import Backend, RRType, Domain
+from dnsmule import Backend, AsyncBackend, RRType, Domain
 from dnsmule.backends import dnspython
 from dnsmule.backends.dnspython import DNSPythonBackend, message_to_record, DNSPythonRecord, default_query
 
@@ -376,3 +380,368 @@ def test_dnspython_dns_query_error_handling_to_log(logger):
 
 def test_backend_is_backend():
     assert issubclass(DNSPythonBackend, Backend), 'Did not inherit from backend'
+
+
+def test_backend_is_async_backend():
+    assert issubclass(DNSPythonBackend, AsyncBackend), 'Did not inherit from async backend'
+
+
+@pytest.mark.parametrize('querier', [*DNSPythonBackend._SUPPORTED_QUERY_TYPES])
+def test_supported_async_queriers(querier):
+    backend = DNSPythonBackend(querier=querier)
+    assert backend._async_querier is DNSPythonBackend._SUPPORTED_ASYNC_QUERY_TYPES[querier]
+
+
+def collect_async(backend, *types):
+    async def collect():
+        return [record async for record in backend.scan_async(Domain('example.com'), *types)]
+
+    return asyncio.run(collect())
+
+
+def test_dnspython_async_query_produces_records_for_all_types():
+    queried = []
+    answers = {
+        'A': '127.0.0.1',
+        'TXT': '"a"',
+    }
+
+    async def querier(query, *_, **__):
+        rdtype = RdataType.to_text(query.question[0].rdtype)
+        queried.append(rdtype)
+        return from_text(
+            'id 54307'
+            '\nopcode QUERY'
+            '\nrcode NOERROR'
+            '\nflags QR RD RA'
+            '\n;QUESTION'
+            f'\nexample.com. IN {rdtype}'
+            '\n;ANSWER'
+            f'\nexample.com. 2563 IN {rdtype} {answers[rdtype]}'
+            '\n;AUTHORITY'
+            '\n;ADDITIONAL'
+        )
+
+    backend = DNSPythonBackend()
+    backend._async_querier = querier
+    records = collect_async(backend, RRType.A, RRType.TXT)
+
+    assert sorted(queried) == ['A', 'TXT'], 'Failed to query all types'
+    assert {record.type for record in records} == {RRType.A, RRType.TXT}, 'Failed to produce records'
+
+
+def test_dnspython_async_queries_types_concurrently():
+    active = []
+    peak = []
+
+    async def querier(*_, **__):
+        active.append(None)
+        peak.append(len(active))
+        await asyncio.sleep(.01)
+        active.pop()
+        raise DNSException()
+
+    backend = DNSPythonBackend()
+    backend._async_querier = querier
+    collect_async(backend, RRType.A, RRType.TXT, RRType.MX)
+
+    assert max(peak) == 3, 'Did not query concurrently'
+
+
+def test_dnspython_async_error_handling_to_log(logger):
+    logger.mock_in_module(dnspython)
+
+    async def timeout(*_, **__):
+        raise DNSException()
+
+    backend = DNSPythonBackend()
+    backend._async_querier = timeout
+
+    assert collect_async(backend, RRType.A) == [], 'Produced records from failed query'
+    assert 'error' in logger.result, 'Failed to log result'
+
+
+def test_dnspython_parallel_types_queries_concurrently():
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def querier(*_, **__):
+        with lock:
+            active.append(None)
+            peak.append(len(active))
+        time.sleep(.05)
+        with lock:
+            active.pop()
+        raise DNSException()
+
+    with DNSPythonBackend(parallel_types=True) as backend:
+        backend._querier = querier
+        assert [*backend.scan(Domain('example.com'), RRType.A, RRType.TXT, RRType.MX)] == []
+
+    assert max(peak) == 3, 'Did not query concurrently'
+
+
+def test_dnspython_parallel_types_produces_records():
+    response = from_text(
+        'id 54307'
+        '\nopcode QUERY'
+        '\nrcode NOERROR'
+        '\nflags QR RD RA'
+        '\n;QUESTION'
+        '\nexample.com. IN A'
+        '\n;ANSWER'
+        '\nexample.com. 2563 IN A 127.0.0.1'
+        '\n;AUTHORITY'
+        '\n;ADDITIONAL'
+    )
+    with DNSPythonBackend(parallel_types=True) as backend:
+        backend._querier = lambda *_, **__: response
+        records = [*backend.scan(Domain('example.com'), RRType.A, RRType.TXT)]
+
+    assert len(records) == 2, 'Failed to merge answers'
+    assert not hasattr(backend, '_executor'), 'Failed to clean up executor'
+
+
+def test_dnspython_parallel_types_without_enter_queries_in_turn():
+    backend = DNSPythonBackend(parallel_types=True)
+    backend._querier = lambda *_, **__: from_text(A_RESPONSE)
+    records = [*backend.scan(Domain('example.com'), RRType.A, RRType.TXT)]
+
+    assert len(records) == 2, 'Failed to query without executor'
+
+
+def servfail_then(response_text):
+    responses = [
+        from_text(
+            'id 54307'
+            '\nopcode QUERY'
+            '\nrcode SERVFAIL'
+            '\nflags QR RD RA'
+            '\n;QUESTION'
+            '\nexample.com. IN A'
+            '\n;ANSWER'
+            '\n;AUTHORITY'
+            '\n;ADDITIONAL'
+        ),
+        from_text(response_text),
+    ]
+    return responses
+
+
+A_RESPONSE = (
+    'id 54307'
+    '\nopcode QUERY'
+    '\nrcode NOERROR'
+    '\nflags QR RD RA'
+    '\n;QUESTION'
+    '\nexample.com. IN A'
+    '\n;ANSWER'
+    '\nexample.com. 2563 IN A 127.0.0.1'
+    '\n;AUTHORITY'
+    '\n;ADDITIONAL'
+)
+
+
+def test_dnspython_retries_servfail():
+    responses = servfail_then(A_RESPONSE)
+    backend = DNSPythonBackend(retries=1)
+    backend._querier = lambda *_, **__: responses.pop(0)
+    records = [*backend.scan(Domain('example.com'), RRType.A)]
+    assert len(records) == 1, 'Did not retry'
+    assert backend.stats['failures'] == 1
+    assert backend.stats['successes'] == 1
+
+
+def test_dnspython_retries_timeouts(logger):
+    logger.mock_in_module(dnspython)
+    calls = []
+
+    def timeout(*_, **__):
+        calls.append(None)
+        raise DNSException()
+
+    backend = DNSPythonBackend(retries=2)
+    backend._querier = timeout
+    assert [*backend.scan(Domain('example.com'), RRType.A)] == []
+    assert len(calls) == 3
+    assert logger.result.count('error') == 1, 'Should log once after running out of retries'
+    assert backend.stats['in_flight'] == 0
+
+
+def test_dnspython_socket_errors_count_as_failures():
+    responses = [TimeoutError('timed out'), from_text(A_RESPONSE)]
+
+    def querier(*_, **__):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    backend = DNSPythonBackend(retries=1)
+    backend._querier = querier
+    assert len([*backend.scan(Domain('example.com'), RRType.A)]) == 1, 'Did not retry'
+    assert backend.stats['failures'] == 1, 'Timeout was not a failure'
+    assert backend.stats['in_flight'] == 0
+
+
+def test_dnspython_async_socket_errors_count_as_failures():
+    async def querier(*_, **__):
+        raise ConnectionRefusedError()
+
+    backend = DNSPythonBackend(retries=1)
+    backend._async_querier = querier
+    assert collect_async(backend, RRType.A) == []
+    assert backend.stats['failures'] == 2, 'Socket error was not a failure'
+
+
+def test_dnspython_servfail_without_retries_is_logged(logger):
+    logger.mock_in_module(dnspython)
+    responses = servfail_then(A_RESPONSE)
+    backend = DNSPythonBackend()
+    backend._querier = lambda *_, **__: responses.pop(0)
+    assert [*backend.scan(Domain('example.com'), RRType.A)] == []
+    assert 'error' in logger.result, 'Failure was silent'
+
+
+def test_dnspython_scan_by_type_tells_failures_from_empty_answers():
+    responses = {
+        RdataType.A: servfail_then(A_RESPONSE)[0],
+        RdataType.TXT: from_text(
+            'id 54307'
+            '\nopcode QUERY'
+            '\nrcode NXDOMAIN'
+            '\nflags QR RD RA'
+            '\n;QUESTION'
+            '\nexample.com. IN TXT'
+            '\n;ANSWER'
+            '\n;AUTHORITY'
+            '\n;ADDITIONAL'
+        ),
+        RdataType.MX: None,
+    }
+
+    def querier(query, *_, **__):
+        response = responses[query.question[0].rdtype]
+        if response is None:
+            raise DNSException()
+        return response
+
+    backend = DNSPythonBackend()
+    backend._querier = querier
+    assert backend.scan_by_type(Domain('example.com'), RRType.A, RRType.TXT, RRType.MX) == {
+        RRType.A: None,
+        RRType.TXT: [],
+        RRType.MX: None,
+    }
+
+
+def test_dnspython_empty_answer_carries_soa_negative_ttl():
+    response = from_text(
+        'id 54307'
+        '\nopcode QUERY'
+        '\nrcode NXDOMAIN'
+        '\nflags QR RD RA'
+        '\n;QUESTION'
+        '\nexample.com. IN TXT'
+        '\n;ANSWER'
+        '\n;AUTHORITY'
+        '\nexample.com. 900 IN SOA ns.example.com. admin.example.com. 1 7200 3600 1209600 60'
+        '\n;ADDITIONAL'
+    )
+    answer = dnspython.message_to_answer(response)
+    assert answer == []
+    assert answer.ttl == 60, 'Did not use SOA minimum'
+
+
+def test_dnspython_async_retries_servfail():
+    responses = servfail_then(A_RESPONSE)
+
+    async def querier(*_, **__):
+        return responses.pop(0)
+
+    backend = DNSPythonBackend(retries=1)
+    backend._async_querier = querier
+    assert len(collect_async(backend, RRType.A)) == 1, 'Did not retry'
+
+
+def test_dnspython_max_in_flight_limits_parallel_types():
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def querier(*_, **__):
+        with lock:
+            active.append(None)
+            peak.append(len(active))
+        time.sleep(.02)
+        with lock:
+            active.pop()
+        raise DNSException()
+
+    with DNSPythonBackend(parallel_types=True, max_in_flight=2) as backend:
+        backend._querier = querier
+        assert [*backend.scan(Domain('example.com'), RRType.A, RRType.TXT, RRType.MX)] == []
+
+    assert max(peak) == 2, 'Did not limit concurrent queries'
+
+
+def test_resolvers_are_accepted_as_kwarg():
+    backend = DNSPythonBackend(resolvers=['1.1.1.1', '2.2.2.2'])
+    assert backend.resolvers == ['1.1.1.1', '2.2.2.2']
+    assert backend.resolver == '1.1.1.1'
+    assert backend.retries == 1, 'Should default to trying every resolver'
+
+
+def test_dnspython_fails_over_to_other_resolver():
+    queried = []
+
+    def querier(_, resolver, **__):
+        queried.append(resolver)
+        if resolver == '1.1.1.1':
+            raise DNSException()
+        return from_text(A_RESPONSE)
+
+    backend = DNSPythonBackend(resolvers=['1.1.1.1', '2.2.2.2'])
+    backend._querier = querier
+    records = [*backend.scan(Domain('example.com'), RRType.A)]
+    assert queried == ['1.1.1.1', '2.2.2.2']
+    assert len(records) == 1, 'Did not fail over'
+    assert backend.stats['resolvers']['1.1.1.1']['failures'] == 1
+    assert backend.stats['resolvers']['2.2.2.2']['failures'] == 0
+
+
+def test_dnspython_skips_unhealthy_resolver():
+    queried = []
+
+    def querier(_, resolver, **__):
+        queried.append(resolver)
+        if resolver == '1.1.1.1':
+            raise DNSException()
+        return from_text(A_RESPONSE)
+
+    backend = DNSPythonBackend(resolvers=['1.1.1.1', '2.2.2.2'], max_failures=1)
+    backend._querier = querier
+    for _ in range(4):
+        assert len([*backend.scan(Domain('example.com'), RRType.A)]) == 1
+    assert queried.count('1.1.1.1') == 1, 'Did not skip unhealthy resolver'
+
+
+def test_dnspython_async_spreads_queries_over_resolvers():
+    queried = []
+
+    async def querier(_, resolver, **__):
+        queried.append(resolver)
+        return from_text(A_RESPONSE)
+
+    backend = DNSPythonBackend(resolvers=['1.1.1.1', '2.2.2.2'])
+    backend._async_querier = querier
+    collect_async(backend, RRType.A, RRType.A, RRType.A, RRType.A)
+    assert sorted(queried) == ['1.1.1.1', '1.1.1.1', '2.2.2.2', '2.2.2.2']
+
+
+def test_dnspython_record_has_slots_and_caches_text():
+    record = next(iter(message_to_record(from_text(A_RESPONSE))))
+    assert not hasattr(record, '__dict__')
+    assert record.text is record.text
+    assert record.address == '127.0.0.1', 'Should fall through to rdata attributes'
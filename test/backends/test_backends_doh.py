@@ -8,6 +8,7 @@ from dnsmule import DoHBackend, RRType, Domain
 @pytest.fixture
 def mock_client():
     class Response:
+        status = 200
         data = {
             "Status": 0,
             "TC": False,
@@ -39,6 +40,7 @@ def mock_client():
             return None
 
     class Mock:
+        closed = False
 
         def request(self, *_, **__):
             return None
@@ -46,14 +48,31 @@ def mock_client():
         def getresponse(self, *_, **__):
             return Response()
 
+        def close(self):
+            self.closed = True
+
     yield Mock()
 
 
 @pytest.fixture
-def backend(mock_client):
-    backend = DoHBackend(url='https://local')
-    backend._client = mock_client
-    yield backend
+def make_backend(mock_client):
+    backends = []
+
+    def make(**config):
+        backend = DoHBackend(**{'url': 'https://local', **config})
+        backend._connect = lambda: mock_client
+        backends.append(backend.__enter__())
+        return backend
+
+    yield make
+
+    for instance in backends:
+        instance.__exit__(None, None, None)
+
+
+@pytest.fixture
+def backend(make_backend):
+    yield make_backend()
 
 
 def test_doh_resolvers_domain_and_produces_result(backend):
@@ -69,3 +88,228 @@ def test_doh_record_domain_no_trailing_dot(backend):
 def test_doh_record_has_text_content(backend):
     record = next(iter(backend.scan(Domain('example.com'), RRType.A)))
     assert isinstance(record.text, str), 'Not text content'
+
+
+def test_doh_retries_servfail(mock_client, monkeypatch, make_backend):
+    statuses = [2, 0]
+
+    def getresponse(*_, **__):
+        response = type(mock_client).getresponse(mock_client)
+        response.data = {**response.data, 'Status': statuses.pop(0)}
+        return response
+
+    monkeypatch.setattr(mock_client, 'getresponse', getresponse)
+    backend = make_backend(retries=1)
+    records = [*backend.scan(Domain('example.com'), RRType.A)]
+    assert len(records) == 1
+    assert backend.stats['failures'] == 1
+
+
+def test_doh_http_error_is_not_retried(mock_client, monkeypatch, logger, make_backend):
+    from dnsmule.backends import doh
+    logger.mock_in_module(doh)
+    calls = []
+
+    def getresponse(*_, **__):
+        calls.append(None)
+        response = type(mock_client).getresponse(mock_client)
+        response.status = 400
+        return response
+
+    monkeypatch.setattr(mock_client, 'getresponse', getresponse)
+    backend = make_backend(retries=3)
+    assert [*backend.scan(Domain('example.com'), RRType.A)] == []
+    assert len(calls) == 1
+    assert 'error' in logger.result
+
+
+def test_doh_invalid_format_raises():
+    with pytest.raises(ValueError):
+        DoHBackend(url='https://local', format='xml')
+
+
+def test_doh_reuses_connections(make_backend):
+    connects = []
+    backend = make_backend(connections=1)
+    connect = backend._connect
+    backend._connect = lambda: connects.append(None) or connect()
+    for _ in range(3):
+        assert len([*backend.scan(Domain('example.com'), RRType.A)]) == 1
+    assert len(connects) == 1, 'Did not reuse connection'
+
+
+def test_doh_reconnects_closed_connection(mock_client, monkeypatch, make_backend):
+    from http.client import RemoteDisconnected
+    failures = [RemoteDisconnected('closed')]
+    connects = []
+
+    def request(*_, **__):
+        if failures:
+            raise failures.pop()
+
+    monkeypatch.setattr(mock_client, 'request', request)
+    backend = make_backend(connections=1)
+    backend._connect = lambda: connects.append(None) or mock_client
+    assert len([*backend.scan(Domain('example.com'), RRType.A)]) == 1, 'Did not retry after reconnect'
+    assert len(connects) == 2
+    assert mock_client.closed, 'Did not close broken connection'
+
+
+def test_doh_timeout_is_retried(mock_client, monkeypatch, make_backend):
+    failures = [TimeoutError('timed out')]
+    connects = []
+
+    def request(*_, **__):
+        if failures:
+            raise failures.pop()
+
+    monkeypatch.setattr(mock_client, 'request', request)
+    backend = make_backend(connections=1, retries=1)
+    backend._connect = lambda: connects.append(None) or mock_client
+    assert len([*backend.scan(Domain('example.com'), RRType.A)]) == 1, 'Did not retry after timeout'
+    assert len(connects) == 2, 'Did not drop timed out connection'
+    assert backend.stats['failures'] == 1, 'Did not count timeout as failure'
+
+
+def test_doh_timeout_returns_no_records(mock_client, monkeypatch, logger, make_backend):
+    from dnsmule.backends import doh
+    logger.mock_in_module(doh)
+
+    def request(*_, **__):
+        raise TimeoutError('timed out')
+
+    monkeypatch.setattr(mock_client, 'request', request)
+    backend = make_backend(retries=2)
+    assert [*backend.scan(Domain('example.com'), RRType.A)] == []
+    assert backend.stats['failures'] == 3
+    assert 'error' in logger.result
+
+
+def test_doh_scan_by_type_gives_none_for_failures(mock_client, monkeypatch, make_backend):
+    def request(_, path, **__):
+        if 'type=16' in path:
+            raise TimeoutError('timed out')
+
+    monkeypatch.setattr(mock_client, 'request', request)
+    backend = make_backend(connections=1)
+    answers = backend.scan_by_type(Domain('example.com'), RRType.A, RRType.TXT)
+    assert len(answers[RRType.A]) == 1
+    assert answers[RRType.TXT] is None, 'Failure was an empty answer'
+
+
+def test_doh_empty_answer_carries_soa_negative_ttl(mock_client, monkeypatch, make_backend):
+    def getresponse(*_, **__):
+        response = type(mock_client).getresponse(mock_client)
+        response.data = {
+            'Status': 3,
+            'Authority': [{
+                'name': 'example.com.',
+                'type': 6,
+                'TTL': 30,
+                'data': 'ns.example.com. admin.example.com. 1 7200 3600 1209600 60',
+            }],
+        }
+        return response
+
+    monkeypatch.setattr(mock_client, 'getresponse', getresponse)
+    answer = make_backend().scan_by_type(Domain('example.com'), RRType.A)[RRType.A]
+    assert answer == []
+    assert answer.ttl == 30, 'Did not use SOA TTL'
+
+
+def test_doh_queries_types_concurrently(mock_client, monkeypatch, make_backend):
+    import threading
+    import time
+    lock = threading.Lock()
+    active = []
+    peak = []
+    getresponse = mock_client.getresponse
+
+    def slow(*_, **__):
+        with lock:
+            active.append(None)
+            peak.append(len(active))
+        time.sleep(.02)
+        with lock:
+            active.pop()
+        return getresponse()
+
+    monkeypatch.setattr(mock_client, 'getresponse', slow)
+    backend = make_backend(connections=3)
+    records = [*backend.scan(Domain('example.com'), RRType.A, RRType.TXT, RRType.MX)]
+    assert len(records) == 3
+    assert max(peak) == 3, 'Did not query concurrently'
+
+
+def test_doh_wire_format(mock_client, monkeypatch, make_backend):
+    pytest.importorskip('dns')
+    from base64 import urlsafe_b64decode
+    from dns.message import from_text, from_wire
+    sent = []
+
+    class Response:
+        status = 200
+
+        @staticmethod
+        def read():
+            query = sent[-1]
+            return from_text(
+                f'id {query.id}'
+                '\nopcode QUERY'
+                '\nrcode NOERROR'
+                '\nflags QR RD RA'
+                '\n;QUESTION'
+                '\nexample.com. IN A'
+                '\n;ANSWER'
+                '\nexample.com. 300 IN A 127.0.0.1'
+                '\n;AUTHORITY'
+                '\n;ADDITIONAL'
+            ).to_wire()
+
+        def close(self):
+            return None
+
+    def request(method, path, headers=None):
+        assert method == 'GET'
+        assert headers['Accept'] == 'application/dns-message'
+        data = path.split('dns=', 1)[1]
+        sent.append(from_wire(urlsafe_b64decode(data + '=' * (-len(data) % 4))))
+
+    monkeypatch.setattr(mock_client, 'request', request)
+    monkeypatch.setattr(mock_client, 'getresponse', lambda *_, **__: Response())
+    backend = make_backend(format='wire')
+    records = [*backend.scan(Domain('example.com'), RRType.A)]
+    assert sent[0].id == 0, 'Should use zero id for cacheability'
+    assert [record.text for record in records] == ['127.0.0.1']
+    assert records[0].ttl == 300
+
+
+def test_doh_wire_format_empty_answer_carries_soa_negative_ttl(mock_client, monkeypatch, make_backend):
+    pytest.importorskip('dns')
+    from dns.message import from_text
+
+    class Response:
+        status = 200
+
+        @staticmethod
+        def read():
+            return from_text(
+                'id 0'
+                '\nopcode QUERY'
+                '\nrcode NXDOMAIN'
+                '\nflags QR RD RA'
+                '\n;QUESTION'
+                '\nexample.com. IN A'
+                '\n;ANSWER'
+                '\n;AUTHORITY'
+                '\nexample.com. 900 IN SOA ns.example.com. admin.example.com. 1 7200 3600 1209600 60'
+                '\n;ADDITIONAL'
+            ).to_wire()
+
+        def close(self):
+            return None
+
+    monkeypatch.setattr(mock_client, 'getresponse', lambda *_, **__: Response())
+    answer = make_backend(format='wire').scan_by_type(Domain('example.com'), RRType.A)[RRType.A]
+    assert answer == []
+    assert answer.ttl == 60, 'Did not use SOA minimum'
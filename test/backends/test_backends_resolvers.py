@@ -0,0 +1,84 @@
+import pytest
+
+from dnsmule.backends import resolvers
+from dnsmule.backends.resolvers import ResolverPool
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.]
+    monkeypatch.setattr(resolvers, 'monotonic', lambda: now[0])
+    yield now
+
+
+def test_pool_requires_resolvers():
+    with pytest.raises(ValueError):
+        ResolverPool([])
+
+
+def test_pool_invalid_strategy_raises():
+    with pytest.raises(ValueError):
+        ResolverPool(['a'], strategy='random')
+
+
+def test_pool_round_robin():
+    pool = ResolverPool(['a', 'b', 'c'])
+    selected = []
+    for _ in range(6):
+        address = pool.acquire()
+        selected.append(address)
+        pool.release(address, .1, True)
+    assert selected == ['a', 'b', 'c', 'a', 'b', 'c']
+
+
+def test_pool_least_latency():
+    pool = ResolverPool(['a', 'b'], strategy='least-latency')
+    for address, latency in [('a', .25), ('b', .1)]:
+        assert pool.acquire(exclude=[x for x in 'ab' if x != address]) == address
+        pool.release(address, latency, True)
+    assert pool.acquire() == 'b'
+    assert pool.acquire() == 'b'
+    assert pool.acquire() == 'a', 'Should weigh latency by in-flight queries'
+
+
+def test_pool_least_latency_tries_unknown_resolvers_first():
+    pool = ResolverPool(['a', 'b'], strategy='least-latency')
+    pool.release(pool.acquire(exclude=['b']), .1, True)
+    assert pool.acquire() == 'b'
+
+
+def test_pool_exclude_falls_back_to_all():
+    pool = ResolverPool(['a'])
+    assert pool.acquire(exclude=['a']) == 'a'
+
+
+def test_pool_marks_unhealthy_and_recovers(clock):
+    pool = ResolverPool(['a', 'b'], max_failures=2, recovery_time=10)
+    for _ in range(2):
+        pool.acquire(exclude=['b'])
+        pool.release('a', 1, False)
+    assert not pool.stats['a']['healthy']
+    assert [pool.acquire() for _ in range(3)] == ['b', 'b', 'b']
+    clock[0] += 10
+    assert pool.stats['a']['healthy']
+    assert 'a' in [pool.acquire() for _ in range(2)], 'Should try the resolver again after recovery'
+
+
+def test_pool_all_unhealthy_uses_first_to_recover(clock):
+    pool = ResolverPool(['a', 'b'], max_failures=1, recovery_time=10)
+    pool.acquire(exclude=['b'])
+    pool.release('a', 1, False)
+    clock[0] += 1
+    pool.acquire(exclude=['a'])
+    pool.release('b', 1, False)
+    assert pool.acquire() == 'a'
+
+
+def test_pool_stats():
+    pool = ResolverPool(['a', 'b'])
+    pool.release(pool.acquire(), .2, True)
+    pool.release(pool.acquire(), .4, False)
+    pool.acquire()
+    stats = pool.stats
+    assert stats['a'] == {'queries': 2, 'failures': 0, 'in_flight': 1, 'latency': .2, 'healthy': True}
+    assert stats['b'] == {'queries': 1, 'failures': 1, 'in_flight': 0, 'latency': .4, 'healthy': True}
@@ -1,6 +1,6 @@
 import pytest
 
-from dnsmule import RegexRule, Record, RRType, Domain
+from dnsmule import RegexRule, RegexEngine, Rules, Record, Result, RRType, Domain
 
 
 @pytest.fixture
@@ -54,3 +54,58 @@ def test_regex_rule_simple_string_group_match(record, result):
     rule(record, result)
 
     assert 'DNS::REGEX::TEST::SAMPLE' in result.tags
+
+
+@pytest.fixture
+def rules():
+    yield [
+        RegexRule(name='first', patterns=[
+            {'regex': '^google-site-verification=', 'label': 'google'},
+            {'regex': '^google-site', 'label': 'google-prefix'},
+            {'regex': 'v=spf1 .*include:(?P<include>[^ ]+)', 'group': 'include'},
+        ]),
+        RegexRule(name='second', patterns=[
+            {'regex': 'verification|validation', 'label': 'any'},
+            {'regex': '(?i)MS=', 'label': 'microsoft'},
+            {'regex': 'site', 'label': 'site'},
+        ]),
+    ]
+
+
+@pytest.mark.parametrize('text', [
+    'google-site-verification=abc',
+    'google-site',
+    'v=spf1 include:_spf.google.com ~all',
+    'ms=ms12345',
+    'apple-domain-validation=abc',
+    'nothing to see here',
+    '',
+])
+def test_regex_engine_matches_rules(rules, text):
+    record = Record(name=Domain('example.com'), type=RRType.TXT, data=text)
+    expected = Result(name=Domain('example.com'))
+    actual = Result(name=Domain('example.com'))
+
+    for rule in rules:
+        rule(record, expected)
+    RegexRule.combine(rules)(record, actual)
+
+    assert actual.tags == expected.tags, 'Engine produced different tags'
+
+
+def test_regex_engine_only_searches_candidates(rules):
+    engine = RegexRule.combine(rules)
+
+    assert [*engine._find_candidates('nothing to see here')] == [4], 'Searched patterns without their literal'
+    assert [*engine._find_candidates('google-site-verification=abc')] == [0, 1, 3, 4, 5], 'Missed prefix literals'
+
+
+def test_regex_rules_are_combined_for_scan(rules):
+    ruleset = Rules()
+    for rule in rules:
+        ruleset.register(RRType.TXT, rule)
+
+    plan = ruleset.compile({})
+
+    assert len(plan.normal[RRType.TXT]) == 1, 'Did not combine rules'
+    assert isinstance(plan.normal[RRType.TXT][0], RegexEngine), 'Did not combine rules'
@@ -32,3 +32,18 @@ def test_timestamp_rule_does_not_append_twice(record, result):
         rule(record, result)
 
     assert len(result.data['scans']) == 1
+
+
+def test_timestamp_rule_keeps_max_scans(record, result):
+    rule = TimestampRule(max_scans=3)
+
+    scans = ['1', '2', '3']
+    result.data['scans'] = scans
+
+    with rule:
+        rule(record, result)
+
+    assert len(scans) == 3, 'Failed to limit history'
+    assert scans[:2] == ['2', '3'], 'Did not drop oldest scan'
+    assert scans[-1] == result.data['last_scan']
+    assert result.data['scans'] is scans, 'Should update history in place'
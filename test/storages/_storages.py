@@ -18,6 +18,23 @@ class StoragesTestBase(ABC):
         storage.store(r)
         assert storage.fetch(r.name) == r, 'Failed to return result with data'
 
+    def test_store_many_and_fetch_many(self, storage, generate_result):
+        results = [generate_result() for _ in range(5)]
+        for i, r in enumerate(results):
+            r.data['i'] = i
+        storage.store_many(results)
+        assert storage.fetch_many([r.name for r in results]) == {r.name: r for r in results}, 'Failed to return results'
+
+    def test_fetch_many_omits_missing(self, storage, generate_result):
+        r1 = generate_result()
+        r2 = generate_result()
+        storage.store(r1)
+        assert storage.fetch_many([r1.name, r2.name]) == {r1.name: r1}, 'Failed to omit missing result'
+
+    def test_fetch_many_and_store_many_empty(self, storage):
+        storage.store_many([])
+        assert storage.fetch_many([]) == {}, 'Failed to handle empty input'
+
 
 # noinspection PyMethodMayBeStatic
 class ContainerStorageTestBase(StoragesTestBase, ABC):
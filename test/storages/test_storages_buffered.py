@@ -0,0 +1,114 @@
+import time
+
+import pytest
+
+from _storages import StoragesTestBase
+from dnsmule import load_config, Domain, Result
+from dnsmule.storages import BufferedStorage, DictStorage
+
+
+class TestBufferedStorage(StoragesTestBase):
+
+    @pytest.fixture
+    def storage(self):
+        with BufferedStorage(storage=DictStorage(), max_items=2, max_delay=.01) as instance:
+            yield instance
+
+
+@pytest.fixture
+def slow_storage():
+    with BufferedStorage(storage=DictStorage(), max_items=100, max_delay=60) as instance:
+        yield instance
+
+
+def test_pending_result_is_visible(slow_storage):
+    result = Result(Domain('example.com'))
+    slow_storage.store(result)
+
+    assert slow_storage.storage.fetch(result.name) is None, 'Flushed too early'
+    assert slow_storage.fetch(result.name) is result, 'Did not return pending result'
+    assert slow_storage.fetch_many([result.name]) == {result.name: result}, 'Did not return pending result'
+    assert slow_storage.stats['pending'] == 1, 'Did not report queue depth'
+
+
+def test_flushes_on_exit():
+    storage = BufferedStorage(storage=DictStorage(), max_items=100, max_delay=60)
+    with storage:
+        storage.store_many([Result(Domain('a.example.com')), Result(Domain('b.example.com'))])
+
+    assert storage.storage.fetch_many([Domain('a.example.com'), Domain('b.example.com')]).keys() == {
+        'a.example.com',
+        'b.example.com',
+    }, 'Did not flush on exit'
+    assert storage.stats['pending'] == 0, 'Left pending results'
+    assert storage.stats['flushed'] == 2, 'Did not count flushed results'
+
+
+def test_flushes_on_max_items():
+    with BufferedStorage(storage=DictStorage(), max_items=2, max_delay=60) as storage:
+        storage.store(Result(Domain('a.example.com')))
+        storage.store(Result(Domain('b.example.com')))
+        for _ in range(100):
+            if storage.stats['flushes']:
+                break
+            time.sleep(.01)
+        assert storage.storage.fetch(Domain('a.example.com')) is not None, 'Did not flush'
+        assert storage.stats['last_flush_latency'] >= 0, 'Did not record latency'
+
+
+def test_flushes_on_max_delay():
+    with BufferedStorage(storage=DictStorage(), max_items=100, max_delay=.01) as storage:
+        storage.store(Result(Domain('a.example.com')))
+        time.sleep(.1)
+        assert storage.storage.fetch(Domain('a.example.com')) is not None, 'Did not flush'
+
+
+def test_checked_out_result_is_not_flushed_until_stored(slow_storage):
+    result = Result(Domain('example.com'))
+    slow_storage.store(result)
+    slow_storage.fetch(result.name)
+    slow_storage._flush()
+
+    assert slow_storage.storage.fetch(result.name) is None, 'Flushed result being modified'
+
+    slow_storage.store(result)
+    slow_storage._flush()
+
+    assert slow_storage.storage.fetch(result.name) is result, 'Failed to flush stored result'
+
+
+def test_failed_flush_keeps_results(slow_storage):
+    def fail(*_):
+        raise RuntimeError()
+
+    slow_storage.storage.store_many = fail
+    slow_storage.store(Result(Domain('example.com')))
+
+    with pytest.raises(RuntimeError):
+        slow_storage._flush()
+
+    assert slow_storage.stats['pending'] == 1, 'Lost result'
+    assert slow_storage.stats['errors'] == 1, 'Did not count error'
+    del slow_storage.storage.store_many
+
+
+def test_loads_from_config():
+    mule = load_config({
+        'storage': {
+            'type': 'buffered',
+            'config': {
+                'max_items': 10,
+                'storage': {
+                    'type': 'dict',
+                },
+            },
+        },
+        'backend': {
+            'type': 'noop',
+        },
+        'rules': [],
+    })
+
+    assert isinstance(mule.storage, BufferedStorage), 'Failed to load wrapper'
+    assert isinstance(mule.storage.storage, DictStorage), 'Failed to load wrapped storage'
+    assert mule.storage.max_items == 10, 'Failed to pass config'
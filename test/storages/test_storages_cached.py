@@ -0,0 +1,109 @@
+import pytest
+
+from _storages import StoragesTestBase
+from dnsmule import load_config, Domain, Result
+from dnsmule.storages import CachedStorage, DictStorage
+
+
+class TestCachedStorage(StoragesTestBase):
+
+    @pytest.fixture
+    def storage(self):
+        with CachedStorage(storage=DictStorage(), max_entries=3) as instance:
+            yield instance
+
+
+class CountingStorage(DictStorage):
+
+    def __init__(self):
+        super().__init__()
+        self.fetches = 0
+
+    def fetch(self, domain):
+        self.fetches += 1
+        return super().fetch(domain)
+
+
+@pytest.fixture
+def storage():
+    with CachedStorage(storage=CountingStorage(), max_entries=2) as instance:
+        yield instance
+
+
+def test_fetch_is_served_from_cache(storage):
+    result = Result(Domain('example.com'))
+    storage.storage.store(result)
+
+    assert storage.fetch(result.name) is result
+    assert storage.fetch(result.name) is result
+    assert storage.storage.fetches == 1, 'Did not serve from cache'
+    assert storage.stats['hits'] == 1, 'Did not count hit'
+    assert storage.stats['misses'] == 1, 'Did not count miss'
+
+
+def test_store_writes_through(storage):
+    result = Result(Domain('example.com'))
+    storage.store(result)
+
+    assert storage.storage.fetch(result.name) is result, 'Did not write through'
+    assert storage.fetch(result.name) is result
+    assert storage.storage.fetches == 1, 'Did not cache stored result'
+
+
+def test_evicts_least_recently_used(storage):
+    a, b, c = (Result(Domain(f'{name}.example.com')) for name in 'abc')
+    storage.store_many([a, b])
+    storage.fetch(a.name)
+    storage.store(c)
+
+    assert storage.stats['evictions'] == 1, 'Did not evict'
+    storage.storage.fetches = 0
+    for result in (a, c, b):
+        storage.fetch(result.name)
+    assert storage.storage.fetches == 1, 'Evicted wrong entry'
+
+
+def test_evicts_by_size():
+    with CachedStorage(storage=DictStorage(), max_entries=None, max_bytes=100) as storage:
+        for i in range(10):
+            result = Result(Domain(f'{i}.example.com'))
+            result.data['value'] = 'a' * 20
+            storage.store(result)
+        assert storage.stats['size'] <= 100, 'Exceeded size'
+        assert storage.stats['evictions'] > 0, 'Did not evict'
+
+
+def test_expires_entries(monkeypatch):
+    from dnsmule import utils
+    now = [1000.]
+    monkeypatch.setattr(utils, 'time', lambda: now[0])
+
+    with CachedStorage(storage=CountingStorage(), ttl=10) as storage:
+        storage.store(Result(Domain('example.com')))
+        storage.fetch(Domain('example.com'))
+        now[0] += 11
+        storage.fetch(Domain('example.com'))
+
+    assert storage.storage.fetches == 1, 'Did not expire'
+    assert storage.stats['expirations'] == 1, 'Did not count expiration'
+
+
+def test_loads_from_config():
+    mule = load_config({
+        'storage': {
+            'type': 'cached',
+            'config': {
+                'max_entries': 5,
+                'storage': {
+                    'type': 'dict',
+                },
+            },
+        },
+        'backend': {
+            'type': 'noop',
+        },
+        'rules': [],
+    })
+
+    assert isinstance(mule.storage, CachedStorage), 'Failed to load wrapper'
+    assert isinstance(mule.storage.storage, DictStorage), 'Failed to load wrapped storage'
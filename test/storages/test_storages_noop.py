@@ -5,3 +5,9 @@ def test_storages_noop_storage_returns_none():
     storage = NoOpStorage()
     storage.store(Result(name=Domain('a')))
     assert storage.fetch(Domain('a')) is None, 'Should return None'
+
+
+def test_storages_noop_storage_many_returns_nothing():
+    storage = NoOpStorage()
+    storage.store_many([Result(name=Domain('a'))])
+    assert storage.fetch_many([Domain('a')]) == {}, 'Should return nothing'
@@ -0,0 +1,83 @@
+import pickle
+
+import pytest
+
+from dnsmule import Record, Result, Domain, RRType, Backend
+
+
+def test_record_and_result_have_no_instance_dict():
+    record = Record(Domain('example.com'), RRType.A, '127.0.0.1')
+    result = Result(Domain('example.com'))
+    assert not hasattr(record, '__dict__')
+    assert not hasattr(result, '__dict__')
+    with pytest.raises(AttributeError):
+        record.extra = True
+    with pytest.raises(AttributeError):
+        result.extra = True
+
+
+def test_record_interns_names():
+    a = Record(Domain(''.join(['example', '.com'])), RRType.A, '127.0.0.1')
+    b = Record(Domain(''.join(['example.', 'com'])), RRType.TXT, 'text')
+    assert a.name is b.name
+
+
+def test_record_text_is_cached():
+    class Data:
+        calls = 0
+
+        def __str__(self):
+            Data.calls += 1
+            return 'data'
+
+    record = Record(Domain('example.com'), RRType.TXT, Data())
+    assert record.text == 'data'
+    assert record.text == 'data'
+    assert Data.calls == 1
+
+
+def test_record_text_is_reset_with_data():
+    record = Record(Domain('example.com'), RRType.A, '127.0.0.1')
+    assert record.text == '127.0.0.1'
+    record.data = b'127.0.0.2'
+    assert record.text == '127.0.0.2'
+
+
+def test_record_subclass_text():
+    class UpperRecord(Record):
+        __slots__ = ()
+
+        def _to_text(self) -> str:
+            return self.data.upper()
+
+    record = UpperRecord(Domain('example.com'), RRType.TXT, 'text')
+    assert record.text == 'TEXT'
+    assert not hasattr(record, '__dict__')
+
+
+def test_record_and_result_pickle():
+    record = Record(Domain('example.com'), RRType.A, '127.0.0.1', ttl=300)
+    result = Result(Domain('example.com'), types=[RRType.A], tags=['TAG'], data={'key': 'value'})
+    assert record.text == '127.0.0.1'
+
+    copied_record = pickle.loads(pickle.dumps(record))
+    copied_result = pickle.loads(pickle.dumps(result))
+
+    assert copied_record == record
+    assert copied_record.ttl == 300
+    assert copied_record.text == '127.0.0.1'
+    assert copied_result == result
+
+
+def test_backend_scan_by_type_groups_records_by_queried_type():
+    class CNAMEBackend(Backend):
+
+        def scan(self, domain, *types):
+            yield Record(domain, RRType.CNAME, 'www.example.com')
+            yield Record(domain, RRType.TXT, 'hello')
+            yield Record(domain, RRType.A, '127.0.0.1')
+
+    answers = CNAMEBackend().scan_by_type(Domain('example.com'), RRType.A, RRType.TXT, RRType.MX)
+    assert [record.text for record in answers[RRType.A]] == ['www.example.com', '127.0.0.1']
+    assert [record.text for record in answers[RRType.TXT]] == ['hello']
+    assert answers[RRType.MX] == []
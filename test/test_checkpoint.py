@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from dnsmule import Checkpoint, DNSMule, Rules, DictStorage, NoOpBackend, Domain
+
+
+@pytest.fixture
+def file(tmp_path):
+    yield tmp_path / 'checkpoint.json'
+
+
+def test_checkpoint_compacts_completed_into_offset(file):
+    checkpoint = Checkpoint(file)
+    domains = [*checkpoint.track(['a', 'b', 'c', 'd'])]
+
+    checkpoint.complete(domains[1])
+    checkpoint.complete(domains[3])
+    assert checkpoint.offset == 0
+    assert checkpoint.completed == [1, 3]
+
+    checkpoint.complete(domains[0])
+    assert checkpoint.offset == 2, 'Did not compact'
+    assert checkpoint.completed == [3]
+
+
+def test_checkpoint_tracks_duplicates(file):
+    checkpoint = Checkpoint(file)
+    [*checkpoint.track(['a', 'a', 'b'])]
+
+    checkpoint.complete(Domain('a'))
+    checkpoint.complete(Domain('a'))
+
+    assert checkpoint.offset == 2
+
+
+def test_checkpoint_resumes_from_file(file):
+    file.write_text(json.dumps({'offset': 2, 'completed': [3]}))
+
+    checkpoint = Checkpoint(file, resume=True)
+
+    assert [*checkpoint.track(['a', 'b', 'c', 'd', 'e'])] == ['c', 'e']
+
+
+def test_checkpoint_does_not_resume_by_default(file):
+    file.write_text(json.dumps({'offset': 2, 'completed': [3]}))
+
+    checkpoint = Checkpoint(file)
+
+    assert [*checkpoint.track(['a', 'b'])] == ['a', 'b']
+
+
+def test_checkpoint_saves_every_n(file):
+    checkpoint = Checkpoint(file, save_every=2, save_interval=60)
+    domains = [*checkpoint.track(['a', 'b', 'c'])]
+
+    checkpoint.complete(domains[0])
+    assert not file.exists(), 'Saved early'
+
+    checkpoint.complete(domains[1])
+    assert json.loads(file.read_text()) == {'offset': 2, 'completed': []}
+
+
+def test_scan_many_records_and_skips_completed(file):
+    mule = DNSMule(rules=Rules(), backend=NoOpBackend(), storage=DictStorage())
+
+    with mule:
+        first = [*mule.scan_many(['a', 'b', 'c'], checkpoint=Checkpoint(file))]
+    with mule:
+        second = [*mule.scan_many(['a', 'b', 'c', 'd'], checkpoint=Checkpoint(file, resume=True))]
+
+    assert len(first) == 3
+    assert [result.name for result in second] == ['d'], 'Did not skip completed'
+    assert json.loads(file.read_text()) == {'offset': 4, 'completed': []}
+
+
+def test_scan_many_async_records_completed(file):
+    import asyncio
+
+    mule = DNSMule(rules=Rules(), backend=NoOpBackend(), storage=DictStorage())
+
+    async def scan():
+        return [result async for result in mule.scan_many_async(['a', 'b'], checkpoint=Checkpoint(file))]
+
+    with mule:
+        results = asyncio.run(scan())
+
+    assert len(results) == 2
+    assert json.loads(file.read_text()) == {'offset': 2, 'completed': []}
@@ -1,8 +1,11 @@
+import asyncio
+import threading
+import time
 from typing import Any
 
 import pytest
 
-from dnsmule import DNSMule, RRType, Backend, Rules, Record, Result, DictStorage, Domain
+from dnsmule import DNSMule, RRType, Backend, AsyncBackend, Rules, Record, Result, DictStorage, Domain
 
 
 class SimpleBackend(Backend):
@@ -123,3 +126,263 @@ def test_mule_scan_any_record_rule_runs(mule, domain, tag):
 
     stored_result: Result = mule.storage.fetch(Domain(domain))
     assert stored_result.tags == {tag, 'any'}, 'Failed to run RRType.ANY rule'
+
+
+def test_mule_scan_any_record_rule_runs_for_unregistered_type(record):
+    record.type = RRType.A
+    mule = DNSMule(
+        rules=Rules(),
+        backend=SimpleBackend(record),
+        storage=DictStorage(),
+    )
+    mule.rules.register(RRType.TXT, lambda _, sr: sr.tags.add('txt'))
+    mule.rules.register_any(rule=lambda _, sr: sr.tags.add('any'))
+
+    with mule:
+        result = mule.scan(record.name)
+
+    assert result.tags == {'any'}, 'Failed to dispatch unregistered type'
+
+
+def test_mule_scan_sets_rule_context_for_scan(mule, domain, record):
+    contexts = []
+
+    def rule(_, __):
+        contexts.append(rule.context)
+
+    mule.rules.register(record.type, rule)
+
+    with mule:
+        mule.scan(domain)
+
+    assert contexts[0]['mule'] is mule, 'Did not set context'
+    assert not hasattr(rule, 'context'), 'Did not remove context'
+
+
+def test_rules_compile_flattens_any_rules():
+    rules = Rules()
+    first = rules.register(RRType.TXT, lambda *_: None)
+    second = rules.register_any(lambda *_: None)
+
+    plan = rules.compile({})
+
+    assert plan.normal == {RRType.TXT: (first, second)}
+    assert plan.any == (second,)
+
+
+class SlowBackend(Backend):
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def scan(self, domain, *_):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(.01)
+        with self.lock:
+            self.active -= 1
+        yield Record(name=domain, type=RRType.TXT, data='test')
+
+
+def test_mule_scan_many_returns_all_results(mule, tag):
+    domains = [f'{i}.example.com' for i in range(10)]
+    mule.backend = SlowBackend()
+
+    with mule:
+        results = [*mule.scan_many(domains, concurrency=4)]
+
+    assert sorted(result.name for result in results) == sorted(domains), 'Failed to scan all domains'
+    assert all(result.tags == {tag} for result in results), 'Failed to run rules'
+    assert all(mule.storage.fetch(domain) is not None for domain in domains), 'Failed to store results'
+
+
+def test_mule_scan_many_limits_concurrency(mule):
+    mule.backend = SlowBackend()
+
+    with mule:
+        for _ in mule.scan_many([f'{i}.example.com' for i in range(20)], concurrency=3):
+            pass
+
+    assert 1 < mule.backend.peak <= 3, 'Did not respect concurrency limit'
+
+
+def test_mule_scan_many_updates_existing_result(mule, domain):
+    existing_result = Result(name=Domain(domain), tags={'existing'})
+
+    with mule:
+        mule.storage.store(existing_result)
+        result, = mule.scan_many([domain])
+
+    assert result is existing_result, 'Result changed'
+    assert 'existing' in result.tags, 'Lost existing data'
+
+
+@pytest.mark.parametrize('concurrency,chunk_size', [(1, 2), (2, 1)])
+def test_mule_scan_many_merges_duplicate_domains(mule, domain, concurrency, chunk_size):
+    mule.rules.register_any(lambda _, result: result.data.update(scans=result.data.get('scans', 0) + 1))
+
+    with mule:
+        mule.storage.store(Result(name=Domain(domain), tags={'existing'}))
+        results = [*mule.scan_many([domain, domain], concurrency=concurrency, chunk_size=chunk_size)]
+        stored = mule.storage.fetch(Domain(domain))
+
+    assert len(results) == 2
+    assert 'existing' in stored.tags, 'Lost existing data'
+    assert stored.data['scans'] == 2, 'Lost data of the first scan'
+
+
+def test_mule_scan_many_runs_batch_rules_per_domain(mule):
+    batches = []
+    mule.rules.register_batch(rule=lambda records, _: batches.append(len(records)))
+    mule.backend = SlowBackend()
+
+    with mule:
+        for _ in mule.scan_many(['a.example.com', 'b.example.com'], concurrency=2):
+            pass
+
+    assert batches == [1, 1], 'Batch rules did not run once per domain'
+
+
+def test_mule_scan_many_invalid_concurrency_raises(mule):
+    with pytest.raises(ValueError):
+        next(mule.scan_many(['example.com'], concurrency=0))
+
+
+class SlowAsyncBackend(AsyncBackend):
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    def scan(self, domain, *_):
+        pytest.fail('Called synchronous scan')
+
+    async def scan_async(self, domain, *_):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(.01)
+        self.active -= 1
+        yield Record(name=domain, type=RRType.TXT, data='test')
+
+
+def test_mule_scan_async_uses_async_backend(mule, domain, tag):
+    mule.backend = SlowAsyncBackend()
+
+    with mule:
+        result = asyncio.run(mule.scan_async(domain))
+
+    assert result.tags == {tag}, 'Failed to run rules'
+    assert mule.storage.fetch(Domain(domain)) is result, 'Failed to store result'
+
+
+def test_mule_scan_async_runs_sync_backend_in_executor(mule, domain, tag):
+    with mule:
+        result = asyncio.run(mule.scan_async(domain))
+
+    assert result.tags == {tag}, 'Failed to run rules'
+
+
+class ContextRule:
+
+    def __call__(self, record, result):
+        result.data['storage'] = type(self.context['storage']).__name__
+
+
+class DelayedAsyncBackend(AsyncBackend):
+
+    def scan(self, domain, *_):
+        pytest.fail('Called synchronous scan')
+
+    async def scan_async(self, domain, *_):
+        await asyncio.sleep(.01 if domain.startswith('fast') else .05)
+        yield Record(name=domain, type=RRType.TXT, data='test')
+
+
+def test_mule_concurrent_scan_async_share_context(mule):
+    mule.backend = DelayedAsyncBackend()
+    mule.rules.register(RRType.TXT, ContextRule())
+
+    async def scan():
+        return await asyncio.gather(mule.scan_async('fast.example.com'), mule.scan_async('slow.example.com'))
+
+    with mule:
+        results = asyncio.run(scan())
+
+    assert [result.data['storage'] for result in results] == ['DictStorage', 'DictStorage'], 'Lost context'
+    assert not any(hasattr(rule, 'context') for rule in mule.rules.all), 'Did not remove context'
+
+
+def test_mule_scan_many_async_limits_concurrency(mule, tag):
+    domains = [f'{i}.example.com' for i in range(20)]
+    mule.backend = SlowAsyncBackend()
+
+    async def collect():
+        return [result async for result in mule.scan_many_async(domains, concurrency=5)]
+
+    with mule:
+        results = asyncio.run(collect())
+
+    assert sorted(result.name for result in results) == sorted(domains), 'Failed to scan all domains'
+    assert all(result.tags == {tag} for result in results), 'Failed to run rules'
+    assert 1 < mule.backend.peak <= 5, 'Did not respect concurrency limit'
+
+
+class CountingStorage(DictStorage):
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def fetch(self, domain):
+        self.calls.append('fetch')
+        return super().fetch(domain)
+
+    def store(self, result):
+        self.calls.append('store')
+        return super().store(result)
+
+    def fetch_many(self, domains):
+        domains = [*domains]
+        self.calls.append(('fetch_many', len(domains)))
+        return super().fetch_many(domains)
+
+    def store_many(self, results):
+        results = [*results]
+        self.calls.append(('store_many', len(results)))
+        return super().store_many(results)
+
+
+def test_mule_scan_many_uses_batched_storage(mule):
+    mule.storage = CountingStorage()
+
+    with mule:
+        results = [*mule.scan_many([f'{i}.example.com' for i in range(5)], concurrency=2, chunk_size=2)]
+
+    assert len(results) == 5, 'Failed to scan all domains'
+    assert 'fetch' not in mule.storage.calls and 'store' not in mule.storage.calls, 'Used single item storage'
+    assert [c for c in mule.storage.calls if c[0] == 'fetch_many'] == [
+        ('fetch_many', 2),
+        ('fetch_many', 2),
+        ('fetch_many', 1),
+    ], 'Did not fetch in chunks'
+    assert sum(c[1] for c in mule.storage.calls if c[0] == 'store_many') == 5, 'Did not store all results'
+    assert all(c[1] <= 2 for c in mule.storage.calls if c[0] == 'store_many'), 'Stored too large chunks'
+
+
+def test_mule_scan_many_stores_completed_results_on_close(mule):
+    mule.backend = SlowBackend()
+
+    with mule:
+        iterator = mule.scan_many([f'{i}.example.com' for i in range(4)], concurrency=4, chunk_size=1)
+        first = next(iterator)
+        iterator.close()
+
+    assert mule.storage.fetch(first.name) is first, 'Failed to store yielded result'
+
+
+def test_mule_scan_many_invalid_chunk_size_raises(mule):
+    with pytest.raises(ValueError):
+        next(mule.scan_many(['example.com'], chunk_size=0))
@@ -0,0 +1,98 @@
+import io
+import json
+
+import pytest
+
+from dnsmule import Result, Domain, RRType, output
+from dnsmule.output import NDJSONWriter, JSONWriter
+
+
+class CountingStream(io.BytesIO):
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+        self.flushes = 0
+
+    def write(self, value):
+        self.writes += 1
+        return super().write(value)
+
+    def flush(self):
+        self.flushes += 1
+        return super().flush()
+
+
+@pytest.fixture
+def results():
+    yield [
+        Result(Domain(f'{i}.example.com'), types=[RRType.A], tags=['TAG'], data={'values': {1, 2}})
+        for i in range(5)
+    ]
+
+
+def test_ndjson_writes_one_result_per_line(results):
+    stream = io.BytesIO()
+    with NDJSONWriter(stream) as writer:
+        for result in results:
+            writer.write(result)
+
+    lines = stream.getvalue().decode().splitlines()
+
+    assert len(lines) == 5
+    assert json.loads(lines[0]) == {
+        'name': '0.example.com',
+        'types': ['A'],
+        'tags': ['TAG'],
+        'data': {'values': [1, 2]},
+    }
+
+
+def test_ndjson_buffers_by_count(results):
+    stream = CountingStream()
+    writer = NDJSONWriter(stream, flush_count=2, flush_interval=60)
+    for result in results:
+        writer.write(result)
+
+    assert stream.writes == 2, 'Did not buffer'
+    assert len(stream.getvalue().splitlines()) == 4
+
+    writer.flush()
+    assert len(stream.getvalue().splitlines()) == 5, 'Did not flush remaining'
+
+
+def test_ndjson_flushes_by_time(results, monkeypatch):
+    now = [0.]
+    monkeypatch.setattr(output, 'monotonic', lambda: now[0])
+    stream = CountingStream()
+    writer = NDJSONWriter(stream, flush_count=100, flush_interval=1)
+
+    writer.write(results[0])
+    assert stream.writes == 0, 'Flushed early'
+
+    now[0] = 2
+    writer.write(results[1])
+    assert stream.writes == 1, 'Did not flush after interval'
+
+
+def test_dumps_compact_without_orjson(monkeypatch):
+    monkeypatch.setattr(output, 'orjson', None)
+    assert output.dumps_compact({'a': [1, 'ä']}) == '{"a":[1,"ä"]}'.encode()
+
+
+def test_json_writer_indents(results):
+    stream = io.BytesIO()
+    with JSONWriter(stream) as writer:
+        writer.write(results[0])
+
+    assert json.loads(stream.getvalue())['name'] == '0.example.com'
+    assert b'\n    "name"' in stream.getvalue()
+
+
+def test_json_writer_flushes_every_result(results):
+    stream = CountingStream()
+    writer = JSONWriter(stream)
+    for result in results[:3]:
+        writer.write(result)
+
+    assert stream.flushes == 3, 'Did not flush every result'
@@ -0,0 +1,128 @@
+import json
+
+import pytest
+
+from dnsmule import load_config_from_file, Checkpoint, Domain, Result
+
+CONFIG = '''
+storage:
+  type: 'dict'
+backend:
+  type: 'data'
+  config:
+    %s
+rules:
+  - name: 'Match digits'
+    type: 'regex'
+    record: 'A'
+    config:
+      name: 'TEST'
+      regex: '\\d+'
+      label: 'label'
+'''
+
+
+@pytest.fixture
+def domains():
+    yield [f'{i}.example.com' for i in range(20)]
+
+
+@pytest.fixture
+def config(tmp_path, domains):
+    data = {
+        domain: [{'name': domain, 'type': 'A', 'data': '127.0.0.1'}]
+        for domain in domains
+    }
+    file = tmp_path / 'config.yml'
+    file.write_text(CONFIG % json.dumps(data))
+    yield file
+
+
+def test_scan_parallel_merges_results(config, domains):
+    mule = load_config_from_file(config)
+
+    with mule:
+        results = [*mule.scan_parallel(config, domains, workers=2, batch_size=3)]
+        stored = mule.storage.fetch_many(domains)
+
+    assert sorted(result.name for result in results) == sorted(domains)
+    assert all(result.tags == {'DNS::REGEX::TEST::LABEL'} for result in results), 'Did not run rules'
+    assert len(stored) == len(domains), 'Did not store results'
+
+
+def test_scan_parallel_updates_existing_results(config, domains):
+    mule = load_config_from_file(config)
+
+    with mule:
+        mule.storage.store(Result(Domain(domains[0]), tags=['EXISTING']))
+        results = {result.name: result for result in mule.scan_parallel(config, domains[:2], workers=1)}
+
+    assert results[domains[0]].tags == {'EXISTING', 'DNS::REGEX::TEST::LABEL'}, 'Did not merge existing'
+
+
+def test_scan_parallel_records_checkpoint(config, domains, tmp_path):
+    mule = load_config_from_file(config)
+    file = tmp_path / 'checkpoint.json'
+
+    with mule:
+        [*mule.scan_parallel(config, domains[:10], workers=2, batch_size=4, checkpoint=Checkpoint(file))]
+        resumed = [*mule.scan_parallel(config, domains, workers=2, checkpoint=Checkpoint(file, resume=True))]
+
+    assert sorted(result.name for result in resumed) == sorted(domains[10:]), 'Did not skip completed'
+
+
+def test_scan_parallel_checks_batch_size(config, domains):
+    mule = load_config_from_file(config)
+    with pytest.raises(ValueError):
+        [*mule.scan_parallel(config, domains, batch_size=0)]
+
+
+def test_scan_batch_returns_results_stored_by_rules(monkeypatch):
+    from dnsmule import DNSMule, DataBackend, Rules, RRType
+    from dnsmule import parallel
+
+    class StoringRule:
+
+        def __call__(self, record, result):
+            self.context['storage'].store(Result(Domain(f'related.{record.name}'), tags=['RELATED']))
+
+    rules = Rules()
+    rules.register(RRType.A, StoringRule())
+    backend = DataBackend(**{'example.com': [{'name': 'example.com', 'type': 'A', 'data': '127.0.0.1'}]})
+    worker = DNSMule(storage=parallel._ShardStorage(), backend=backend, rules=rules)
+    monkeypatch.setattr(parallel, '_worker', worker)
+
+    with worker:
+        results, written = parallel._scan_batch([Domain('example.com')], {})
+
+    assert [result.name for result in results] == ['example.com']
+    assert [(result.name, result.tags) for result in written] == [('related.example.com', {'RELATED'})]
+    assert not worker.storage.written, 'Kept writes between batches'
+
+
+TIMESTAMP_CONFIG = '''
+storage:
+  type: 'dict'
+backend:
+  type: 'data'
+  config:
+    %s
+rules:
+  - name: 'Timestamp'
+    type: 'timestamp'
+    record: 'A'
+'''
+
+
+def test_scan_parallel_merges_duplicate_domains_in_batches(tmp_path, domains):
+    data = {domains[0]: [{'name': domains[0], 'type': 'A', 'data': '127.0.0.1'}]}
+    file = tmp_path / 'timestamp.yml'
+    file.write_text(TIMESTAMP_CONFIG % json.dumps(data))
+    mule = load_config_from_file(file)
+
+    with mule:
+        results = [*mule.scan_parallel(file, [domains[0]] * 3, workers=2, batch_size=1)]
+        stored = mule.storage.fetch(Domain(domains[0]))
+
+    assert len(results) == 3
+    assert len(stored.data['scans']) == 3, 'Lost updates of concurrent batches'
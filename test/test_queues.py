@@ -0,0 +1,150 @@
+import json
+
+import pytest
+
+from dnsmule import load_config_from_file, Domain
+from dnsmule.queues import SQLiteQueue
+
+CONFIG = '''
+storage:
+  type: 'dict'
+backend:
+  type: 'data'
+  config:
+    %s
+queue:
+  type: 'sqlite'
+  config:
+    database: '%s'
+rules:
+  - name: 'Match digits'
+    type: 'regex'
+    record: 'A'
+    config:
+      name: 'TEST'
+      regex: '\\d+'
+      label: 'label'
+'''
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.]
+    monkeypatch.setattr('dnsmule.queues.db_sqlite.time', lambda: now[0])
+    yield now
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    with SQLiteQueue(database=str(tmp_path / 'queue.db'), visibility_timeout=10, max_attempts=2) as q:
+        yield q
+
+
+@pytest.fixture
+def domains():
+    yield [f'{i}.example.com' for i in range(20)]
+
+
+@pytest.fixture
+def mule(tmp_path, domains):
+    data = {
+        domain: [{'name': domain, 'type': 'A', 'data': '127.0.0.1'}]
+        for domain in domains
+    }
+    file = tmp_path / 'config.yml'
+    file.write_text(CONFIG % (json.dumps(data), tmp_path / 'mule.db'))
+    with load_config_from_file(file) as mule:
+        yield mule
+
+
+def test_queue_push_pull_ack(queue):
+    queue.push([Domain('a.example.com'), Domain('b.example.com')])
+    assert sorted(queue.pull(10)) == ['a.example.com', 'b.example.com']
+    assert queue.pull(10) == []
+    queue.ack([Domain('a.example.com'), Domain('b.example.com')])
+    queue.push([Domain('a.example.com')])
+    assert queue.pull(10) == ['a.example.com'], 'Acknowledged domains should be removed'
+
+
+def test_queue_push_ignores_duplicates(queue):
+    queue.push([Domain('a.example.com')])
+    assert queue.pull(1) == ['a.example.com']
+    queue.push([Domain('a.example.com')])
+    assert queue.pull(1) == [], 'Pulled domain should not be pushed again'
+
+
+def test_queue_pull_count(queue):
+    queue.push(Domain(f'{i}.example.com') for i in range(5))
+    assert len(queue.pull(3)) == 3
+    assert len(queue.pull(3)) == 2
+
+
+def test_queue_visibility_timeout(queue, clock):
+    queue.push([Domain('a.example.com')])
+    assert queue.pull(1) == ['a.example.com']
+    clock[0] += 5
+    assert queue.pull(1) == []
+    clock[0] += 5
+    assert queue.pull(1) == ['a.example.com'], 'Domain should be visible after the timeout'
+
+
+def test_queue_failed_after_max_attempts(queue, clock):
+    queue.push([Domain('a.example.com')])
+    assert queue.pull(1) == ['a.example.com']
+    clock[0] += 10
+    assert queue.pull(1) == ['a.example.com']
+    clock[0] += 10
+    assert queue.pull(1) == []
+    assert queue.failed() == ['a.example.com']
+
+
+def test_queue_release(queue):
+    queue.push([Domain('a.example.com')])
+    assert queue.pull(1) == ['a.example.com']
+    queue.release([Domain('a.example.com')])
+    assert queue.pull(1) == ['a.example.com'], 'Released domain should be visible immediately'
+
+
+def test_queue_shared_between_connections(tmp_path, clock):
+    database = str(tmp_path / 'queue.db')
+    with SQLiteQueue(database=database) as a, SQLiteQueue(database=database) as b:
+        a.push(Domain(f'{i}.example.com') for i in range(10))
+        first = a.pull(5)
+        second = b.pull(10)
+        assert len(first) == 5
+        assert len(second) == 5
+        assert not set(first) & set(second)
+
+
+def test_mule_loads_queue(mule):
+    assert isinstance(mule.queue, SQLiteQueue)
+
+
+def test_mule_scan_queue(mule, domains):
+    assert mule.enqueue(domains, batch_size=7) == len(domains)
+    results = [*mule.scan_queue(batch_size=3)]
+    assert sorted(result.name for result in results) == sorted(domains)
+    assert all(result is not None for result in mule.storage.fetch_many(domains))
+    assert mule.queue.pull(100) == [], 'Completed domains should be acknowledged'
+
+
+def test_mule_scan_queue_acks_completed_and_releases_rest_on_stop(mule, domains):
+    mule.enqueue(domains)
+    scan = mule.scan_queue(batch_size=5)
+    first = next(scan)
+    scan.close()
+    pulled = mule.queue.pull(100)
+    assert len(pulled) == len(domains) - 1, 'Did not release the rest of the batch'
+    assert first.name not in pulled, 'Did not acknowledge completed domain'
+
+
+def test_mule_scan_queue_releases_batch_on_failure(mule, domains, monkeypatch):
+    def fail(*_, **__):
+        raise RuntimeError('scan failed')
+        yield
+
+    mule.enqueue(domains)
+    monkeypatch.setattr(mule, 'scan_many', fail)
+    with pytest.raises(RuntimeError):
+        next(mule.scan_queue(batch_size=5))
+    assert len(mule.queue.pull(100)) == len(domains), 'Did not release failed batch'
@@ -47,3 +47,34 @@ def test_to_text(value, text):
 def test_to_str_and_repr():
     assert repr(RRType.A) == 'A'
     assert str(RRType.A) == 'A'
+
+
+def test_conversions_return_members():
+    for name, member in RRType.__members__.items():
+        assert RRType.make(int(member)) is member
+        assert RRType.from_text(name) is member
+        assert RRType.from_text(name.lower()) is member
+        assert RRType.to_text(int(member)) == name
+
+
+def test_from_text_str_derivative():
+    class Text(str):
+
+        def __hash__(self):
+            return 0
+
+    assert RRType.from_text(Text('a')) is RRType.A
+
+
+def test_make_unknown_returns_value():
+    assert RRType.make(65530) == 65530
+    assert not isinstance(RRType.make(65530), RRType)
+
+
+def test_lookup_tables_cover_every_member():
+    from dnsmule import rrtype
+    for name, member in RRType.__members__.items():
+        assert rrtype._MEMBER_BY_TEXT[name] is member
+        assert rrtype._MEMBER_BY_VALUE[int(member)] == member
+        assert rrtype._TEXT_BY_VALUE[int(member)] in RRType.__members__
+    assert len(rrtype._MEMBER_BY_VALUE) == len({int(member) for member in RRType})
@@ -2,7 +2,8 @@ import pathlib
 
 import pytest
 
-from dnsmule.utils import load_data, left_merge, extend_set, join_values, jsonize, extend_list
+from dnsmule.utils import load_data, load_stream, left_merge, extend_set, join_values, jsonize, extend_list, chunked, LRUCache, \
+    RateLimiter, OrderedSet
 
 
 def test_join_keys():
@@ -18,6 +19,16 @@ def test_join_keys():
     assert [*join_values(a, b)] == [(2, 'test'), (3, 'value')]
 
 
+@pytest.mark.parametrize('values,size,result', [
+    ([], 2, []),
+    ([1, 2, 3], 1, [[1], [2], [3]]),
+    ([1, 2, 3], 2, [[1, 2], [3]]),
+    ([1, 2, 3], 5, [[1, 2, 3]]),
+])
+def test_chunked(values, size, result):
+    assert [*chunked(iter(values), size)] == result
+
+
 @pytest.mark.parametrize('file', [
     'sample_1.csv',
     'sample_1.txt',
@@ -28,6 +39,32 @@ def test_load_file(file):
     assert [*load_data(file, limit=1)] == ['example.com']
     assert [*load_data(file, limit=2)] == ['example.com', 'a.example.com']
     assert [*load_data(file, limit=-2)] == ['example.com', 'a.example.com']
+    assert [*load_data(file, skip=1)] == ['a.example.com']
+    assert [*load_data(file, skip=1, limit=5)] == ['a.example.com']
+
+
+def test_load_stream_is_lazy():
+    read = []
+
+    def lines():
+        for i in range(10):
+            read.append(i)
+            yield f'{i}.example.com\n'
+
+    data = load_stream(lines(), skip=2, limit=3)
+
+    assert next(data) == '2.example.com'
+    assert read == [0, 1, 2], 'Read ahead'
+    assert [*data] == ['3.example.com', '4.example.com']
+    assert read == [0, 1, 2, 3, 4], 'Read past limit'
+
+
+def test_load_stream_skips_empty_lines():
+    assert [*load_stream(['a\n', '\n', '  \n', 'b'])] == ['a', 'b']
+
+
+def test_load_stream_csv():
+    assert [*load_stream(['1,a\n', '2, b\n'], csv=True)] == ['a', 'b']
 
 
 @pytest.mark.parametrize('a,b,result', [
@@ -195,3 +232,289 @@ def test_extend_list_adds_when_not_present():
     data = {}
     extend_list(data, 'a', 'b')
     assert data['a'] == ['b'], 'Failed to add value'
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None, 'Did not evict least recently used'
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats['evictions'] == 1
+
+
+def test_lru_cache_evicts_by_size():
+    cache = LRUCache(max_size=10)
+    cache.set('a', 1, size=6)
+    cache.set('b', 2, size=6)
+
+    assert len(cache) == 1, 'Did not evict by size'
+    assert cache.size == 6
+
+
+def test_lru_cache_expires(monkeypatch):
+    from dnsmule import utils
+    now = [0.]
+    monkeypatch.setattr(utils, 'time', lambda: now[0])
+    cache = LRUCache(ttl=5)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=20)
+    now[0] = 10
+
+    assert cache.get('a') is None, 'Did not expire'
+    assert cache.get('b') == 2, 'Did not respect entry ttl'
+    assert cache.entries() == [('b', 2, 20)]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    from dnsmule import utils
+    now = [100.]
+    monkeypatch.setattr(utils, 'monotonic', lambda: now[0])
+    yield now
+
+
+def test_rate_limiter_unlimited_does_not_wait():
+    limiter = RateLimiter()
+    for _ in range(1000):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.stats['waits'] == 0
+    assert limiter.stats['successes'] == 1000
+
+
+def test_rate_limiter_token_bucket(clock):
+    limiter = RateLimiter(rate=10, burst=2)
+    assert limiter._try_acquire() == 0
+    assert limiter._try_acquire() == 0
+    assert limiter._try_acquire() == pytest.approx(.1), 'Should wait for the next token'
+    clock[0] += .11
+    assert limiter._try_acquire() == 0
+    clock[0] += 10
+    assert limiter._try_acquire() == 0
+    assert limiter._try_acquire() == 0
+    assert limiter._try_acquire() > 0, 'Tokens should not exceed burst'
+
+
+def test_rate_limiter_limits_rate():
+    import time
+    limiter = RateLimiter(rate=200, burst=1)
+    start = time.monotonic()
+    for _ in range(11):
+        limiter.acquire()
+        limiter.release()
+    assert time.monotonic() - start >= .045
+    assert limiter.stats['waits'] == 10
+
+
+def test_rate_limiter_max_in_flight():
+    import threading
+    import time
+    limiter = RateLimiter(max_in_flight=2)
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def work():
+        limiter.acquire()
+        with lock:
+            active.append(None)
+            peak.append(len(active))
+        time.sleep(.01)
+        with lock:
+            active.pop()
+        limiter.release()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 2
+    assert limiter.stats['in_flight'] == 0
+
+
+def test_rate_limiter_max_in_flight_async():
+    import asyncio
+    limiter = RateLimiter(max_in_flight=1)
+    active = []
+    peak = []
+
+    async def work():
+        await limiter.acquire_async()
+        active.append(None)
+        peak.append(len(active))
+        await asyncio.sleep(.01)
+        active.pop()
+        limiter.release()
+
+    async def run():
+        await asyncio.gather(*(work() for _ in range(4)))
+
+    asyncio.run(run())
+    assert max(peak) == 1
+    assert limiter.stats['waits'] == 3
+
+
+def test_rate_limiter_adaptive_backoff_and_recovery(clock):
+    limiter = RateLimiter(rate=100, adaptive=True, window=10, max_failure_ratio=.2)
+    for i in range(10):
+        limiter.in_flight += 1
+        limiter.release(success=i % 2 == 0)
+    assert limiter.rate == 50
+    assert limiter.stats['backoffs'] == 1
+    for _ in range(10):
+        limiter.in_flight += 1
+        limiter.release()
+    assert limiter.rate == 60, 'Should recover additively'
+    for _ in range(100):
+        limiter.in_flight += 1
+        limiter.release()
+    assert limiter.rate == 100, 'Should not exceed the configured rate'
+
+
+def test_rate_limiter_adaptive_respects_min_rate():
+    limiter = RateLimiter(rate=100, min_rate=30, adaptive=True, window=1)
+    for _ in range(5):
+        limiter.in_flight += 1
+        limiter.release(success=False)
+    assert limiter.rate == 30
+
+
+def test_rate_limiter_adaptive_requires_rate():
+    with pytest.raises(ValueError):
+        RateLimiter(adaptive=True)
+
+
+def test_ordered_set_deduplicates_in_order():
+    values = OrderedSet([3, 1, 3, 2, 1])
+    assert values == [3, 1, 2]
+    assert values.add(4)
+    assert not values.add(1)
+    values.append(2)
+    values.extend([5, 3])
+    values += [6, 6]
+    assert values == [3, 1, 2, 4, 5, 6]
+    assert 5 in values
+    assert 7 not in values
+
+
+def test_ordered_set_unhashable_values():
+    values = OrderedSet([{'a': [1, 2]}, {'a': [1, 2]}, {'a': (1, 2)}, [1], {1}])
+    assert values == [{'a': [1, 2]}, {'a': (1, 2)}, [1], {1}]
+    assert {'a': [1, 2]} in values
+    assert [{'b': 1}] not in values
+
+
+def test_ordered_set_update_many():
+    values = OrderedSet()
+    values.update(['a', 'b'], ('b', 'c'), iter(['d', 'a']))
+    assert values == ['a', 'b', 'c', 'd']
+
+
+def test_ordered_set_mutation_keeps_keys():
+    values = OrderedSet([1, 2, 3, 4])
+    values.remove(2)
+    assert values.pop() == 4
+    del values[0]
+    assert values == [3]
+    assert 1 not in values
+    assert values.add(1)
+    values[0] = 1
+    assert values == [1]
+    values.insert(0, 1)
+    values.insert(0, 0)
+    assert values == [0, 1]
+    values *= 2
+    assert values == [0, 1]
+    values.clear()
+    assert values.add(0)
+
+
+def test_ordered_set_serializes_as_list():
+    import json
+    import pickle
+    values = OrderedSet(['a', {'b': 1}])
+    assert json.dumps(values) == '["a", {"b": 1}]'
+    assert jsonize(values).__class__ is list
+    copied = pickle.loads(pickle.dumps(values))
+    assert isinstance(copied, OrderedSet)
+    assert copied == values
+    assert not copied.add('a')
+
+
+def test_extend_set_converts_existing_list():
+    data = {'key': ['a', 'b', 'a']}
+    extend_set(data, 'key', 'c', 'b')
+    assert isinstance(data['key'], OrderedSet)
+    assert data['key'] == ['a', 'b', 'c']
+    target = data['key']
+    extend_set(data, 'key', 'd')
+    assert data['key'] is target, 'Should append in place'
+
+
+def test_extend_list_appends_in_place():
+    target = ['a']
+    data = {'a': target}
+    extend_list(data, 'a', 'b', 'c')
+    assert data['a'] is target, 'Should not copy the list'
+    assert target == ['a', 'b', 'c']
+
+
+def test_extend_list_converts_other_collections_once():
+    data = {'a': ('a',)}
+    extend_list(data, 'a', 'b')
+    assert data['a'] == ['a', 'b']
+    target = data['a']
+    extend_list(data, 'a', 'c')
+    assert data['a'] is target
+
+
+@pytest.mark.parametrize('existing,values,limit,result', [
+    ([1, 2, 3], [4], 3, [2, 3, 4]),
+    ([1], [2, 3, 4, 5], 2, [4, 5]),
+    ([1], [2], 5, [1, 2]),
+    ([1, 2], [3], 0, []),
+    (None, [1, 2, 3], 1, [3]),
+])
+def test_extend_list_limit(existing, values, limit, result):
+    data = {} if existing is None else {'a': existing}
+    extend_list(data, 'a', *values, limit=limit)
+    assert data['a'] == result
+
+
+@pytest.mark.parametrize('a,b,result', [
+    ((0,), [1, 2], [0, 1, 2]),
+    ((0,), 1, [0, 1]),
+    (frozenset({0}), [1], {0, 1}),
+    (frozenset({0}), 1, {0, 1}),
+    ([0], (1,), [0, 1]),
+])
+def test_left_merge_mutable(a, b, result):
+    value1 = {'value': a}
+    value2 = {'value': b}
+    left_merge(value1, value2, mutable=True)
+    assert value1['value'] == result
+    assert type(value1['value']) is type(result)
+    target = value1['value']
+    left_merge(value1, {'value': [2]}, mutable=True)
+    assert value1['value'] is target, 'Should merge in place after conversion'
+
+
+def test_left_merge_mutable_nested():
+    a = {'nested': {'value': (1,)}}
+    left_merge(a, {'nested': {'value': [2]}}, mutable=True)
+    assert a == {'nested': {'value': [1, 2]}}
+
+
+def test_left_merge_mutable_keeps_tuple_subclasses():
+    from collections import namedtuple
+    Pair = namedtuple('Pair', 'a b')
+    a = {'value': Pair(1, 2)}
+    left_merge(a, {'value': [3]}, mutable=True)
+    assert a['value'] == (1, 2, 3)